@@ -11,36 +11,37 @@ from preconditionUnit import preCondition
 class baseRuleBox():
     def __init__(self):
         self.uid = ""
-        self.primarySet = set()
-        self.secondarySet = set()
+        # Variable sets are bitsets over the driver's varTable
+        self.primarySet = 0
+        self.secondarySet = 0
         # head to store a tree
         self.head = None
         self.parent = []
         self.children = []
         self.properties = {
-            'source_variables': set(),
-            'target_variables': set(),
-            'conditional_variables': set(),
+            'source_variables': 0,
+            'target_variables': 0,
+            'conditional_variables': 0,
             # It would bee found in only sub-rules and rules
             'child_to_head': {}
         }
     
-    def fetch_value(self,ir_node,primary,secondary):
-        vars = ir_node.properties['source_variables'] + ir_node.properties['target_variables'] + ir_node.properties['conditional_variables']
-        for v in vars:
-            if v in primary:
-                self.primarySet.add(v)
-            elif v in secondary:
-                self.secondarySet.add(v)
+    def fetch_value(self,ir_node,table):
+        source = table.bits(ir_node.properties['source_variables'])
+        target = table.bits(ir_node.properties['target_variables'])
+        conditional = table.bits(ir_node.properties['conditional_variables'])
+        vars = source | target | conditional
+        self.primarySet = vars & table.primary
+        self.secondarySet = vars & table.secondary
         # Need to make a new IR Node here instead
         if str(ir_node)[:2] == 'AU':
-            self.head = AtomicUnit(ir_node.fileName)
+            self.head = AtomicUnit(ir_node.fileName,ir_node.ids)
         else:
-            self.head = preCondition(ir_node.fileName)
+            self.head = preCondition(ir_node.fileName,ir_node.ids)
         self.head.copyUnit(ir_node)
-        self.properties['source_variables'] = set(ir_node.properties['source_variables'])
-        self.properties['target_variables'] = set(ir_node.properties['target_variables'])
-        self.properties['conditional_variables'] = set(ir_node.properties['conditional_variables'])
+        self.properties['source_variables'] = source
+        self.properties['target_variables'] = target
+        self.properties['conditional_variables'] = conditional
         return
     
     def getUID(self):
@@ -3,7 +3,10 @@
 """
 
 import os
+import json
+from collections import deque
 import graphviz as gv
+from graph_render import render, wants_graph
 
 class ruleHelper():
     def __init__(self,file_name):
@@ -25,8 +28,8 @@ class ruleHelper():
         '''
         X = parent.secondarySet
         Y = withoutGoto.secondarySet
-        if len(X)>0 and len(Y)>0:
-            return not X.isdisjoint(Y)
+        if X and Y:
+            return X & Y != 0
         return True
     
     def if_mergable_none_goto(self,left,right,parent):
@@ -37,7 +40,7 @@ class ruleHelper():
         Y = right.primarySet
         P = left.secondarySet
         Q = right.secondarySet
-        if (X.isdisjoint(Y) and len(Y)>0 and len(X)>0) or (P.isdisjoint(Q) and len(P)>0 and len(Q)>0):
+        if (not X & Y and Y and X) or (not P & Q and P and Q):
             return False
         return True
     
@@ -75,17 +78,17 @@ class ruleHelper():
             except:
                 node.properties['child_to_head'][child] = right[0].head
         
-        node.primarySet = node.primarySet.union(left[0].primarySet)
-        node.secondarySet = node.secondarySet.union(left[0].secondarySet)
-        node.primarySet = node.primarySet.union(right[0].primarySet)
-        node.secondarySet = node.secondarySet.union(right[0].secondarySet)
+        node.primarySet |= left[0].primarySet
+        node.secondarySet |= left[0].secondarySet
+        node.primarySet |= right[0].primarySet
+        node.secondarySet |= right[0].secondarySet
         
-        node.properties['source_variables'] = node.properties['source_variables'].union(left[0].properties['source_variables'])        
-        node.properties['target_variables'] = node.properties['target_variables'].union(left[0].properties['target_variables'])        
-        node.properties['conditional_variables'] = node.properties['conditional_variables'].union(left[0].properties['conditional_variables'])
-        node.properties['source_variables'] = node.properties['source_variables'].union(right[0].properties['source_variables'])
-        node.properties['target_variables'] = node.properties['target_variables'].union(right[0].properties['target_variables'])
-        node.properties['conditional_variables'] = node.properties['conditional_variables'].union(right[0].properties['conditional_variables'])
+        node.properties['source_variables'] |= left[0].properties['source_variables']
+        node.properties['target_variables'] |= left[0].properties['target_variables']
+        node.properties['conditional_variables'] |= left[0].properties['conditional_variables']
+        node.properties['source_variables'] |= right[0].properties['source_variables']
+        node.properties['target_variables'] |= right[0].properties['target_variables']
+        node.properties['conditional_variables'] |= right[0].properties['conditional_variables']
         
         self.rules.append(node)
         node.head.properties['name'].add('rule')
@@ -139,17 +142,17 @@ class ruleHelper():
         withoutGoto.children[0][0].children[0][0].parent.append(node)
         node.properties['child_to_head'][withoutGoto.children[0][0].children[0][0]] = withoutGoto.children[0][0].head
 
-        node.primarySet = node.primarySet.union(withGoto.primarySet)
-        node.secondarySet = node.secondarySet.union(withGoto.secondarySet)
-        node.primarySet = node.primarySet.union(withoutGoto.primarySet)
-        node.secondarySet = node.secondarySet.union(withoutGoto.secondarySet)
+        node.primarySet |= withGoto.primarySet
+        node.secondarySet |= withGoto.secondarySet
+        node.primarySet |= withoutGoto.primarySet
+        node.secondarySet |= withoutGoto.secondarySet
 
-        node.properties['source_variables'] = node.properties['source_variables'].union(withGoto.properties['source_variables'])        
-        node.properties['target_variables'] = node.properties['target_variables'].union(withGoto.properties['target_variables'])        
-        node.properties['conditional_variables'] = node.properties['conditional_variables'].union(withGoto.properties['conditional_variables'])
-        node.properties['source_variables'] = node.properties['source_variables'].union(withoutGoto.properties['source_variables'])
-        node.properties['target_variables'] = node.properties['target_variables'].union(withoutGoto.properties['target_variables'])
-        node.properties['conditional_variables'] = node.properties['conditional_variables'].union(withoutGoto.properties['conditional_variables'])
+        node.properties['source_variables'] |= withGoto.properties['source_variables']
+        node.properties['target_variables'] |= withGoto.properties['target_variables']
+        node.properties['conditional_variables'] |= withGoto.properties['conditional_variables']
+        node.properties['source_variables'] |= withoutGoto.properties['source_variables']
+        node.properties['target_variables'] |= withoutGoto.properties['target_variables']
+        node.properties['conditional_variables'] |= withoutGoto.properties['conditional_variables']
 
         for cns in node.head.properties['name']:
             if cns in self.construct_logic.keys():
@@ -189,17 +192,17 @@ class ruleHelper():
         node.children = left.children[0][0].children
         node.properties['child_to_head'][left.children[0][0].children[0][0]] = left.children[0][0].head
         
-        node.primarySet = node.primarySet.union(left.primarySet)
-        node.secondarySet = node.secondarySet.union(left.secondarySet)
-        node.primarySet = node.primarySet.union(right.primarySet)
-        node.secondarySet = node.secondarySet.union(right.secondarySet)
+        node.primarySet |= left.primarySet
+        node.secondarySet |= left.secondarySet
+        node.primarySet |= right.primarySet
+        node.secondarySet |= right.secondarySet
         
-        node.properties['source_variables'] = node.properties['source_variables'].union(left.properties['source_variables'])        
-        node.properties['target_variables'] = node.properties['target_variables'].union(left.properties['target_variables'])        
-        node.properties['conditional_variables'] = node.properties['conditional_variables'].union(left.properties['conditional_variables'])
-        node.properties['source_variables'] = node.properties['source_variables'].union(right.properties['source_variables'])
-        node.properties['target_variables'] = node.properties['target_variables'].union(right.properties['target_variables'])
-        node.properties['conditional_variables'] = node.properties['conditional_variables'].union(right.properties['conditional_variables'])
+        node.properties['source_variables'] |= left.properties['source_variables']
+        node.properties['target_variables'] |= left.properties['target_variables']
+        node.properties['conditional_variables'] |= left.properties['conditional_variables']
+        node.properties['source_variables'] |= right.properties['source_variables']
+        node.properties['target_variables'] |= right.properties['target_variables']
+        node.properties['conditional_variables'] |= right.properties['conditional_variables']
 
         for cns in node.head.properties['name']:
             if cns in self.construct_logic.keys():
@@ -243,12 +246,12 @@ class ruleHelper():
             except:
                 node.properties['child_to_head'][child] = outChild[0].head
 
-        node.primarySet = node.primarySet.union(withRule[0].primarySet)
-        node.secondarySet = node.secondarySet.union(withRule[0].secondarySet)
+        node.primarySet |= withRule[0].primarySet
+        node.secondarySet |= withRule[0].secondarySet
 
-        node.properties['source_variables'] = node.properties['source_variables'].union(withRule[0].properties['source_variables'])
-        node.properties['target_variables'] = node.properties['target_variables'].union(withRule[0].properties['target_variables'])
-        node.properties['conditional_variables'] = node.properties['conditional_variables'].union(withRule[0].properties['conditional_variables'])
+        node.properties['source_variables'] |= withRule[0].properties['source_variables']
+        node.properties['target_variables'] |= withRule[0].properties['target_variables']
+        node.properties['conditional_variables'] |= withRule[0].properties['conditional_variables']
 
         for cns in node.head.properties['name']:
             if cns in self.construct_logic.keys():
@@ -259,23 +262,95 @@ class ruleHelper():
         self.rules.append(node)
         node.head.properties['name'].add('rule')
 
-    def _get_graph(self,node,visited,graph):
+    def _get_graph(self,node,visited,graph,units):
+        '''
+            Walk the IR units of a rule: units in pre-order (collected in units),
+            each edge once the child's sub-graph is walked. Draws into graph
+            unless it is None. Explicit stack, identity-set visited.
+        '''
         if node in visited:
             return
-        visited.append(node)
-        graph.node(name=str(node),label=node.value)
-        for child,label in node.properties['children']:
-            self._get_graph(child,visited,graph)
-            self.indirectly_addressed = self.indirectly_addressed.union(child.properties['name'])
+        self._add_node(graph,node,visited,units)
+        # frame: [unit, children iterator, (child, label) waiting for its edge]
+        stack = [[node,iter(node.properties['children']),None]]
+
+        while stack:
+            frame = stack[-1]
+            node,children,pending = frame
+            if pending is not None:
+                self._add_edge(graph,node,*pending)
+                frame[2] = None
+            for child,label in children:
+                if child in visited:
+                    self._add_edge(graph,node,child,label)
+                    continue
+                self._add_node(graph,child,visited,units)
+                frame[2] = (child,label)
+                stack.append([child,iter(child.properties['children']),None])
+                break
+            else:
+                stack.pop()
+
+    def _add_node(self,graph,node,visited,units):
+        visited.add(node)
+        units.append(node)
+        # Unit IDs are handed out here, in the same order whether drawn or not
+        name = str(node)
+        if graph is not None:
+            graph.node(name=name,label=node.value)
+
+    def _add_edge(self,graph,node,child,label):
+        self.indirectly_addressed = self.indirectly_addressed.union(child.properties['name'])
+        if graph is not None:
             graph.edge(str(node),str(child),label=label)
 
-    def get_graph_rules(self):
+    def _rule_json(self,number,rule,units,table):
+        starts = [_line(u.startLine) for u in units]
+        ends = [_line(u.endLine) for u in units]
+        starts = [n for n in starts if n is not None]
+        ends = [n for n in ends if n is not None]
+        return {
+            'id': 'rule_{}'.format(number),
+            'head': rule.head.getUID(),
+            'description': rule.head.value,
+            'start_line': min(starts) if starts else None,
+            'end_line': max(ends) if ends else None,
+            'constructs': sorted(rule.head.properties['name'] - {'rule','ruled'}),
+            'primary_variables': table.names(rule.primarySet),
+            'secondary_variables': table.names(rule.secondarySet),
+            'units': [
+                {
+                    'id': u.getUID(),
+                    'start_line': _line(u.startLine),
+                    'end_line': _line(u.endLine),
+                    'text': u.value
+                }
+                for u in units
+            ]
+        }
+
+    def get_graph_rules(self,table):
+        '''
+            Rule graphs (Rules/rule_N, drawn per the graph_render policy) and
+            Rules/RULES_<prog>.json, the structured rule list the BR JSON stage reads.
+            table: the driver's varTable, to name the rules' variables.
+        '''
+        draw = wants_graph()
+        rules = []
         for i in range(len(self.rules)):
             path = 'output/COBOL_{}/Rules/rule_{}'.format(self.file_name,i+1)
             name = 'cluster'+str(i)
-            graph = gv.Digraph(name=name,format='pdf')
-            self._get_graph(self.rules[i].head,[],graph)
-            graph.render(path)
+            graph = gv.Digraph(name=name,format='pdf') if draw else None
+            units = []
+            self._get_graph(self.rules[i].head,set(),graph,units)
+            if draw:
+                render(graph,path)
+            rules.append(self._rule_json(i+1,self.rules[i],units,table))
+
+        path = 'output/COBOL_{}/Rules/RULES_{}.json'.format(self.file_name,self.file_name)
+        os.makedirs(os.path.dirname(path),exist_ok=True)
+        with open(path,'w') as f:
+            f.write(json.dumps({'program': self.file_name,'rules': rules},indent=2))
     
     def can_form_rule(self,node):
         '''
@@ -394,12 +469,12 @@ class ruleHelper():
 
             node.head.properties['name'] = node.head.properties['name'].union(child.head.properties['name'])
 
-            node.primarySet = node.primarySet.union(child.primarySet)
-            node.secondarySet = node.secondarySet.union(child.secondarySet)
+            node.primarySet |= child.primarySet
+            node.secondarySet |= child.secondarySet
             
-            node.properties['source_variables'] = node.properties['source_variables'].union(child.properties['source_variables'])        
-            node.properties['target_variables'] = node.properties['target_variables'].union(child.properties['target_variables'])        
-            node.properties['conditional_variables'] = node.properties['conditional_variables'].union(child.properties['conditional_variables'])
+            node.properties['source_variables'] |= child.properties['source_variables']
+            node.properties['target_variables'] |= child.properties['target_variables']
+            node.properties['conditional_variables'] |= child.properties['conditional_variables']
             
             # prev = getLeaf(prev[0][0]).properties['children']
             prev = node.properties['child_to_head'][child.children[0][0]].properties['children']
@@ -455,12 +530,12 @@ class ruleHelper():
 
             node.head.properties['name'] = node.head.properties['name'].union(child.head.properties['name'])
 
-            node.primarySet = node.primarySet.union(child.primarySet)
-            node.secondarySet = node.secondarySet.union(child.secondarySet)
+            node.primarySet |= child.primarySet
+            node.secondarySet |= child.secondarySet
             
-            node.properties['source_variables'] = node.properties['source_variables'].union(child.properties['source_variables'])        
-            node.properties['target_variables'] = node.properties['target_variables'].union(child.properties['target_variables'])        
-            node.properties['conditional_variables'] = node.properties['conditional_variables'].union(child.properties['conditional_variables'])
+            node.properties['source_variables'] |= child.properties['source_variables']
+            node.properties['target_variables'] |= child.properties['target_variables']
+            node.properties['conditional_variables'] |= child.properties['conditional_variables']
             
             # prev = getLeaf(prev[0][0]).properties['children']
             prev = node.properties['child_to_head'][child.children[0][0]].properties['children']
@@ -498,17 +573,17 @@ class ruleHelper():
             self.rules.remove(child)
         node.head.properties['name'].add('rule')
         temp = node.head
-        visited = []
+        visited = set()
         while len(temp.properties['children']) > 0 and temp not in visited:
-            visited.append(temp)
+            visited.add(temp)
             temp = temp.properties['children'][0][0]
         temp.properties['children'].append((child.head,label))
         node.head.properties['name'] = node.head.properties['name'].union(child.head.properties['name'])
-        node.primarySet = node.primarySet.union(child.primarySet)
-        node.secondarySet = node.secondarySet.union(child.secondarySet)
-        node.properties['source_variables'] = node.properties['source_variables'].union(child.properties['source_variables'])        
-        node.properties['target_variables'] = node.properties['target_variables'].union(child.properties['target_variables'])        
-        node.properties['conditional_variables'] = node.properties['conditional_variables'].union(child.properties['conditional_variables'])
+        node.primarySet |= child.primarySet
+        node.secondarySet |= child.secondarySet
+        node.properties['source_variables'] |= child.properties['source_variables']
+        node.properties['target_variables'] |= child.properties['target_variables']
+        node.properties['conditional_variables'] |= child.properties['conditional_variables']
         return True
 
     def __make_one_in_branch__(self,node):
@@ -532,21 +607,21 @@ class ruleHelper():
                 self.rules.remove(child)
             node.head.properties['name'].add('rule')
             temp = node.head
-            visited = []
+            visited = set()
             while len(temp.properties['children']) > 0 and temp not in visited:
-                visited.append(temp)
+                visited.add(temp)
                 temp = temp.properties['children'][0][0]
             temp.properties['children'].append((child.head,label))
             node.head.properties['name'] = node.head.properties['name'].union(child.head.properties['name'])
-            node.primarySet = node.primarySet.union(child.primarySet)
-            node.secondarySet = node.secondarySet.union(child.secondarySet)
-            node.properties['source_variables'] = node.properties['source_variables'].union(child.properties['source_variables'])        
-            node.properties['target_variables'] = node.properties['target_variables'].union(child.properties['target_variables'])        
-            node.properties['conditional_variables'] = node.properties['conditional_variables'].union(child.properties['conditional_variables'])
+            node.primarySet |= child.primarySet
+            node.secondarySet |= child.secondarySet
+            node.properties['source_variables'] |= child.properties['source_variables']
+            node.properties['target_variables'] |= child.properties['target_variables']
+            node.properties['conditional_variables'] |= child.properties['conditional_variables']
         return node
 
     def _when_variable_based_merging_(self,node):
-        var = set()
+        var = 0
         new_children = []
         vec = []
         for child,_ in node.children:
@@ -554,14 +629,14 @@ class ruleHelper():
             ch = child.children[0][0]
 
             while ch.head.value != 'END-EVALUATE':
-                ch_vars = ch.primarySet.union(ch.secondarySet)
+                ch_vars = ch.primarySet | ch.secondarySet
                 ch = ch.children[0][0]
             
             self.__make_one_in_branch__(child)
-            var = var.intersection(ch_vars)
+            var &= ch_vars
             vec.append(child)
 
-            if len(var) == 0:
+            if var == 0:
                 new_children.append(vec)
                 vec = []
         
@@ -616,19 +691,19 @@ class ruleHelper():
         w_2 = child.properties['target_variables']
         r_2 = child.properties['source_variables']
         c_2 = child.properties['conditional_variables']
-        if len(w_1) == 0 and len(w_2) == 0 and len(r_1) == 0 and len(r_2) == 0 and len(c_1) == 0 and len(c_2) == 0:
+        if not (w_1 or w_2 or r_1 or r_2 or c_1 or c_2):
             return False
-        elif (w_1.intersection(r_2) or w_1.intersection(c_2)):
+        elif w_1 & r_2 or w_1 & c_2:
             # Written and then it is read for condition or similar
             self.merge_sequential_rules(node)
             return True
-        elif len(c_1)>0 and len(c_2)>0 and c_1.isdisjoint(c_2):
+        elif c_1 and c_2 and not c_1 & c_2:
             # c_1 intersection c_2 = phi
             return False
         elif c_1 == c_2 and (w_1 == w_2 or r_1 == r_2):
             self.merge_sequential_rules(node)
             return True
-        elif len(w_1) == 0 and len(w_2) == 0 and (r_1.issubset(r_2) or r_2.issubset(r_1)):
+        elif not w_1 and not w_2 and (r_1 | r_2 == r_2 or r_1 | r_2 == r_1):
             self.merge_sequential_rules(node)
             return True
         else:
@@ -646,17 +721,17 @@ class ruleHelper():
             self.rules.remove(child)
         node.head.properties['name'].add('rule')
         temp = node.head
-        visited = []
+        visited = set()
         while len(temp.properties['children']) > 0 and temp not in visited:
-            visited.append(temp)
+            visited.add(temp)
             temp = temp.properties['children'][0][0]
         temp.properties['children'].append((child.head,label))
         node.head.properties['name'] = node.head.properties['name'].union(child.head.properties['name'])
-        node.primarySet = node.primarySet.union(child.primarySet)
-        node.secondarySet = node.secondarySet.union(child.secondarySet)
-        node.properties['source_variables'] = node.properties['source_variables'].union(child.properties['source_variables'])        
-        node.properties['target_variables'] = node.properties['target_variables'].union(child.properties['target_variables'])        
-        node.properties['conditional_variables'] = node.properties['conditional_variables'].union(child.properties['conditional_variables'])
+        node.primarySet |= child.primarySet
+        node.secondarySet |= child.secondarySet
+        node.properties['source_variables'] |= child.properties['source_variables']
+        node.properties['target_variables'] |= child.properties['target_variables']
+        node.properties['conditional_variables'] |= child.properties['conditional_variables']
         
         for cns in node.head.properties['name']:
             if cns in self.construct_logic.keys():
@@ -666,11 +741,16 @@ class ruleHelper():
         
         self.rules.append(node)
 
+def _line(line):
+    try:
+        return int(line['Number'])
+    except (TypeError,ValueError):
+        return None
+
 def getLeaf(node):
-    q = []
+    q = deque()
     while len(node.properties['children']) != 0:
         for ch,_ in node.properties['children']:
                 q.append(ch)
-        node = q[0]
-        q.remove(node)
+        node = q.popleft()
     return node
\ No newline at end of file
@@ -1,5 +1,6 @@
 import os
 import graphviz as gv
+from graph_render import render, wants_graph
 
 class subRuleHelper():
     def __init__(self,file_name):
@@ -53,24 +54,24 @@ class subRuleHelper():
         lchild = node.children[0]
         rchild = node.children[1]
         node.children = []
-        visited = [node]
+        visited = {node}
         for curr,_ in [lchild,rchild]:
             prev = node
             while True:
                 x = curr.head.properties['name'].intersection({'goto','end-if'})
                 prev.head.properties['children'].append((curr.head,_))
                 curr.head.properties['parents'].append(prev.head)
-                node.primarySet = node.primarySet.union(curr.primarySet)
-                node.secondarySet = node.secondarySet.union(curr.secondarySet)
+                node.primarySet |= curr.primarySet
+                node.secondarySet |= curr.secondarySet
                 node.head.properties['name'] = node.head.properties['name'].union(curr.head.properties['name'])
-                node.properties['source_variables'] = node.properties['source_variables'].union(curr.properties['source_variables'])
-                node.properties['target_variables'] = node.properties['target_variables'].union(curr.properties['target_variables'])
-                node.properties['conditional_variables'] = node.properties['conditional_variables'].union(curr.properties['conditional_variables'])
+                node.properties['source_variables'] |= curr.properties['source_variables']
+                node.properties['target_variables'] |= curr.properties['target_variables']
+                node.properties['conditional_variables'] |= curr.properties['conditional_variables']
                 if len(x) > 0:
                     # It involves either go to or end-if
                     if curr not in visited:
                         node.children = node.children + curr.children
-                        visited.append(curr)
+                        visited.add(curr)
                         for child,l in curr.children:
                             child.parent.remove(curr)
                             child.parent.append(node)
@@ -79,24 +80,47 @@ class subRuleHelper():
                 else:
                     # It is a part of the unit nows
                     prev = curr
-                    visited.append(curr)
+                    visited.add(curr)
                     curr,_ = curr.children[0]
 
     def _get_graph(self,node,visited,graph):
+        '''
+            Draw the IR units of a sub-rule: nodes in pre-order, each edge once
+            the child's sub-graph is drawn. Explicit stack, identity-set visited.
+        '''
         if node in visited:
             return
-        visited.append(node)
+        visited.add(node)
         graph.node(name=str(node),label=node.value)
-        for child,label in node.properties['children']:
-            self._get_graph(child,visited,graph)
-            graph.edge(str(node),str(child),label=label)
+        # frame: [unit, children iterator, (child, label) waiting for its edge]
+        stack = [[node,iter(node.properties['children']),None]]
+
+        while stack:
+            frame = stack[-1]
+            node,children,pending = frame
+            if pending is not None:
+                graph.edge(str(node),str(pending[0]),label=pending[1])
+                frame[2] = None
+            for child,label in children:
+                if child in visited:
+                    graph.edge(str(node),str(child),label=label)
+                    continue
+                visited.add(child)
+                graph.node(name=str(child),label=child.value)
+                frame[2] = (child,label)
+                stack.append([child,iter(child.properties['children']),None])
+                break
+            else:
+                stack.pop()
         return
 
     def get_graph_sub_rules(self):
+        if not wants_graph():
+            return
         for i in range(len(self.subRules)):
             path = 'output/COBOL_{}/CUs/cu_{}'.format(self.file_name,i+1)
             name = 'cluster'+str(i)
             graph = gv.Digraph(name=name,format='pdf')
-            self._get_graph(self.subRules[i].head,[],graph)
-            graph.render(path)
+            self._get_graph(self.subRules[i].head,set(),graph)
+            render(graph,path)
         return
\ No newline at end of file
@@ -1,31 +1,45 @@
+import itertools
 import graphviz as gv
-
-cluster = 0
+from graph_render import render, wants_graph
 
 def make_graph(node):
+    if not wants_graph():
+        return
     g = gv.Digraph(format='pdf')
-    dfs(node,[],g)
+    # Numbers the per-box subgraphs of this graph only
+    dfs(node,set(),g,itertools.count())
     g.attr('node', shape='circle',filled='lightblue')
     g.attr('edge', color='black')
-    g.render('output/COBOL_{}/BRR_{}'.format(node.head.fileName,node.head.fileName))
+    render(g,'output/COBOL_{}/BRR_{}'.format(node.head.fileName,node.head.fileName))
     return
 
-def dfs(node,visited,g):
+def dfs(node,visited,g,clusters):
+    '''
+        Pre-order walk over the rule boxes: a box's cluster is drawn when it is
+        first reached and each edge is drawn just before its child is walked.
+    '''
     if node in visited:
         return
-    visited.append(node)
-    populate_cluster(node.head,g)
+    visited.add(node)
+    populate_cluster(node.head,g,clusters)
+    stack = [(node,iter(node.children))]
 
-    for child,_ in node.children:
-        g.edge(str(node.head),str(child.head),label=_)
-        dfs(child,visited,g)
+    while stack:
+        node,children = stack[-1]
+        for child,_ in children:
+            g.edge(str(node.head),str(child.head),label=_)
+            if child not in visited:
+                visited.add(child)
+                populate_cluster(child.head,g,clusters)
+                stack.append((child,iter(child.children)))
+                break
+        else:
+            stack.pop()
 
-def populate_cluster(node,g):
+def populate_cluster(node,g,clusters):
     visited = set()
     stack = [node]
-    global cluster
-    with g.subgraph(name='Node {}'.format(cluster)) as c1:
-        cluster+=1
+    with g.subgraph(name='Node {}'.format(next(clusters))) as c1:
         while stack:
             current_node = stack.pop()
             if current_node not in visited:
@@ -0,0 +1,30 @@
+"""
+    Interned variable table for the rule boxes.
+
+    Every variable name is given a bit position the first time it is seen, so a
+    box's variable sets are plain ints and merging two boxes is a bitwise or.
+"""
+
+class varTable():
+    def __init__(self,primary,secondary):
+        # variable name -> bit position
+        self.index = {}
+        self.primary = self.bits(primary)
+        # A variable the user gave as both stays primary
+        self.secondary = self.bits(secondary) & ~self.primary
+
+    def bits(self,names):
+        b = 0
+        for v in names:
+            i = self.index.get(v)
+            if i is None:
+                i = self.index[v] = len(self.index)
+            b |= 1 << i
+        return b
+
+    def names(self,bits):
+        '''
+            Variable names of a bitset, in the order they were first seen.
+        '''
+        return [v for v,i in self.index.items() if bits >> i & 1]
+
@@ -31,6 +31,7 @@ By default, we infer the DFG folder as a sibling of CFG:
 
 Usage:
     python build_dfg.py path/to/CFG_<name>.json
+    python build_dfg.py path/to/CFG_<name>.json --profile   # → <PROGRAM_NAME>/PROFILE/dfg.*
 
 """
 
@@ -44,6 +45,10 @@ from pruned_dfg_builder import (
     export_dfg_graph,
     get_dfg_connected_nodes,
 )
+# importable once pruned_dfg_builder has put the repo root on sys.path
+from graph_render import RENDER_MODES, set_render_mode
+from profiling import add_profile_argument, profiled, set_profile_modes
+from tracing import span
 
 
 def main():
@@ -54,7 +59,17 @@ def main():
         "cfg_json_path",
         help="Path to the COBREX CFG JSON file (e.g., CFG_ATM.json)",
     )
+    parser.add_argument(
+        "--render",
+        choices=RENDER_MODES,
+        default=None,
+        help="Graphviz policy (pdf, dot, deferred, off). Default: $COBREX_RENDER or pdf",
+    )
+    add_profile_argument(parser)
     args = parser.parse_args()
+    if args.render is not None:
+        set_render_mode(args.render)
+    set_profile_modes(args.profile)
 
     cfg_json_path = args.cfg_json_path
 
@@ -62,66 +77,70 @@ def main():
         print(f"ERROR: CFG JSON file not found: {cfg_json_path}")
         sys.exit(1)
 
-    print(f"[*] Building DFG from CFG JSON: {cfg_json_path}")
-
-    # 1. Build DFG in memory
-    cfg, dfg_edges = build_dfg_from_cfg_json(cfg_json_path)
-
-    print(f"[*] Loaded CFG with {len(cfg.nodes)} nodes")
-    print(f"[*] Built DFG with {len(dfg_edges)} edges")
-
-    # Show a few sample edges
-    if dfg_edges:
-        print("[*] Sample DFG edges (def_node -> use_node [var]):")
-        for e in dfg_edges[:20]:
-            print(f"    {e[0]} -> {e[1]}  [{e[2]}]")
-    else:
-        print("[!] No DFG edges were generated (check DEF/USE rules).")
-
-    # Compute connected nodes (nodes that participate in at least one DFG edge)
-    connected_nodes = get_dfg_connected_nodes(dfg_edges)
-    print(
-        f"[*] DFG connected nodes (participating in at least one edge): "
-        f"{len(connected_nodes)} / {len(cfg.nodes)}"
-    )
-
-    # 2. Derive DFG output paths from CFG path
-    cfg_dir = os.path.dirname(cfg_json_path)         # e.g., .../COBOL_ATM/CFG
-    base_dir = os.path.dirname(cfg_dir)             # e.g., .../COBOL_ATM
-    dfg_dir = os.path.join(base_dir, "DFG")
-    os.makedirs(dfg_dir, exist_ok=True)
-
-    cfg_filename = os.path.basename(cfg_json_path)   # e.g., CFG_ATM.json
-    core = cfg_filename
-    if core.startswith("CFG_"):
-        core = core[len("CFG_"):]                   # ATM.json
-    if core.endswith(".json"):
-        core = core[:-5]                            # ATM
-
-    # RAW (all nodes) base name
-    dfg_base_raw = f"DFG_{core}"                    # DFG_ATM
-    # PRUNED (only connected nodes) base name
-    dfg_base_pruned = f"DFG_{core}_pruned"          # DFG_ATM_pruned
-
-    json_out_raw = os.path.join(dfg_dir, dfg_base_raw + ".json")
-    json_out_pruned = os.path.join(dfg_dir, dfg_base_pruned + ".json")
-
-    pdf_prefix_raw = os.path.join(dfg_dir, dfg_base_raw)
-    pdf_prefix_pruned = os.path.join(dfg_dir, dfg_base_pruned)
-
-    # 3. Persist RAW DFG JSON + PDF/DOT (all CFG nodes)
-    print(f"[*] Writing RAW DFG JSON to: {json_out_raw}")
-    save_dfg_to_json(cfg, dfg_edges, json_out_raw)
-
-    print(f"[*] Rendering RAW DFG graph to: {pdf_prefix_raw}.pdf")
-    export_dfg_graph(cfg, dfg_edges, pdf_prefix_raw)
-
-    # 4. Persist PRUNED DFG JSON + PDF/DOT (only connected DFG nodes)
-    print(f"[*] Writing PRUNED DFG JSON to: {json_out_pruned}")
-    save_dfg_to_json(cfg, dfg_edges, json_out_pruned, node_filter=connected_nodes)
-
-    print(f"[*] Rendering PRUNED DFG graph to: {pdf_prefix_pruned}.pdf")
-    export_dfg_graph(cfg, dfg_edges, pdf_prefix_pruned, node_filter=connected_nodes)
+    prog_dir = os.path.dirname(os.path.dirname(os.path.abspath(cfg_json_path)))
+    with profiled(prog_dir, "dfg"), span("dfg", cfg=os.path.basename(cfg_json_path)) as sp:
+        print(f"[*] Building DFG from CFG JSON: {cfg_json_path}")
+
+        # 1. Build DFG in memory
+        cfg, dfg_edges = build_dfg_from_cfg_json(cfg_json_path)
+        sp.count(nodes=len(cfg.nodes), edges=len(dfg_edges))
+
+        print(f"[*] Loaded CFG with {len(cfg.nodes)} nodes")
+        print(f"[*] Built DFG with {len(dfg_edges)} edges")
+
+        # Show a few sample edges
+        if dfg_edges:
+            print("[*] Sample DFG edges (def_node -> use_node [var]):")
+            for e in dfg_edges[:20]:
+                print(f"    {e[0]} -> {e[1]}  [{e[2]}]")
+        else:
+            print("[!] No DFG edges were generated (check DEF/USE rules).")
+
+        # Compute connected nodes (nodes that participate in at least one DFG edge)
+        connected_nodes = get_dfg_connected_nodes(dfg_edges)
+        print(
+            f"[*] DFG connected nodes (participating in at least one edge): "
+            f"{len(connected_nodes)} / {len(cfg.nodes)}"
+        )
+
+        # 2. Derive DFG output paths from CFG path
+        cfg_dir = os.path.dirname(cfg_json_path)         # e.g., .../COBOL_ATM/CFG
+        base_dir = os.path.dirname(cfg_dir)             # e.g., .../COBOL_ATM
+        dfg_dir = os.path.join(base_dir, "DFG")
+        os.makedirs(dfg_dir, exist_ok=True)
+
+        cfg_filename = os.path.basename(cfg_json_path)   # e.g., CFG_ATM.json
+        core = cfg_filename
+        if core.startswith("CFG_"):
+            core = core[len("CFG_"):]                   # ATM.json
+        if core.endswith(".json"):
+            core = core[:-5]                            # ATM
+
+        # RAW (all nodes) base name
+        dfg_base_raw = f"DFG_{core}"                    # DFG_ATM
+        # PRUNED (only connected nodes) base name
+        dfg_base_pruned = f"DFG_{core}_pruned"          # DFG_ATM_pruned
+
+        json_out_raw = os.path.join(dfg_dir, dfg_base_raw + ".json")
+        json_out_pruned = os.path.join(dfg_dir, dfg_base_pruned + ".json")
+
+        pdf_prefix_raw = os.path.join(dfg_dir, dfg_base_raw)
+        pdf_prefix_pruned = os.path.join(dfg_dir, dfg_base_pruned)
+
+        with span("dfg.write"):
+            # 3. Persist RAW DFG JSON + PDF/DOT (all CFG nodes)
+            print(f"[*] Writing RAW DFG JSON to: {json_out_raw}")
+            save_dfg_to_json(cfg, dfg_edges, json_out_raw)
+
+            print(f"[*] Rendering RAW DFG graph to: {pdf_prefix_raw}.pdf")
+            export_dfg_graph(cfg, dfg_edges, pdf_prefix_raw)
+
+            # 4. Persist PRUNED DFG JSON + PDF/DOT (only connected DFG nodes)
+            print(f"[*] Writing PRUNED DFG JSON to: {json_out_pruned}")
+            save_dfg_to_json(cfg, dfg_edges, json_out_pruned, node_filter=connected_nodes)
+
+            print(f"[*] Rendering PRUNED DFG graph to: {pdf_prefix_pruned}.pdf")
+            export_dfg_graph(cfg, dfg_edges, pdf_prefix_pruned, node_filter=connected_nodes)
 
     print("[✓] Done.")
 
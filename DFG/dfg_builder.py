@@ -18,9 +18,16 @@ This is tailored for the A-COBREX / COBREX CFG format:
 """
 
 import json
+import os
+import sys
 from collections import defaultdict
 from graphviz import Digraph
 
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+from graph_render import render, wants_graph
+
 
 # ─────────────────────────────────────────────────────────────
 # Basic CFG data structures
@@ -431,7 +438,8 @@ def save_dfg_to_json(cfg: CFGGraph, dfg_edges, path):
 
 def export_dfg_graph(cfg: CFGGraph, dfg_edges, out_prefix):
     """
-    Build a Graphviz Digraph for the DFG and render to PDF.
+    Build a Graphviz Digraph for the DFG and render to PDF
+    (or DOT only / deferred / skipped, per COBREX_RENDER; see graph_render).
 
     To avoid port warnings with IDs like "ATM:10:24", we map each
     original node id to a safe id "n0", "n1", ... in the DOT graph.
@@ -443,6 +451,8 @@ def export_dfg_graph(cfg: CFGGraph, dfg_edges, out_prefix):
         DFG_ATM        (DOT source)
         DFG_ATM.pdf    (PDF graph)
     """
+    if not wants_graph():
+        return
     dot = Digraph(comment="COBOL DFG", format="pdf")
 
     # Map original ids -> safe DOT ids
@@ -467,7 +477,7 @@ def export_dfg_graph(cfg: CFGGraph, dfg_edges, out_prefix):
         safe_use = id_map[use_id]
         dot.edge(safe_def, safe_use, label=var)
 
-    dot.render(out_prefix, cleanup=False)
+    render(dot, out_prefix)
 
 
 # ─────────────────────────────────────────────────────────────
@@ -20,9 +20,17 @@ This is tailored for the A-COBREX / COBREX CFG format:
 """
 
 import json
+import os
+import sys
 from collections import defaultdict
 from graphviz import Digraph
 
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+from graph_render import render, wants_graph
+from tracing import span
+
 
 # ─────────────────────────────────────────────────────────────
 # Basic CFG data structures
@@ -466,7 +474,8 @@ def save_dfg_to_json(cfg: CFGGraph, dfg_edges, path, node_filter=None):
 
 def export_dfg_graph(cfg: CFGGraph, dfg_edges, out_prefix, node_filter=None):
     """
-    Build a Graphviz Digraph for the DFG and render to PDF.
+    Build a Graphviz Digraph for the DFG and render to PDF
+    (or DOT only / deferred / skipped, per COBREX_RENDER; see graph_render).
 
     To avoid port warnings with IDs like "ATM:10:24", we map each
     original node id to a safe id "n0", "n1", ... in the DOT graph.
@@ -481,6 +490,8 @@ def export_dfg_graph(cfg: CFGGraph, dfg_edges, out_prefix, node_filter=None):
         DFG_ATM        (DOT source)
         DFG_ATM.pdf    (PDF graph)
     """
+    if not wants_graph():
+        return
     dot = Digraph(comment="COBOL DFG", format="pdf")
 
     if node_filter is not None:
@@ -514,7 +525,7 @@ def export_dfg_graph(cfg: CFGGraph, dfg_edges, out_prefix, node_filter=None):
         safe_use = id_map[use_id]
         dot.edge(safe_def, safe_use, label=var)
 
-    dot.render(out_prefix, cleanup=False)
+    render(dot, out_prefix)
 
 
 # ─────────────────────────────────────────────────────────────
@@ -533,8 +544,12 @@ def build_dfg_from_cfg_json(cfg_json_path):
         cfg        (CFGGraph)
         dfg_edges  (list of (def_node_id, use_node_id, var))
     """
-    cfg = load_cfg_from_json(cfg_json_path)
-    annotate_defs_uses(cfg)
-    IN, OUT = reaching_definitions(cfg)
-    dfg_edges = build_dfg(cfg, IN)
+    with span("dfg.load"):
+        cfg = load_cfg_from_json(cfg_json_path)
+    with span("dfg.defs_uses"):
+        annotate_defs_uses(cfg)
+    with span("dfg.reaching_definitions"):
+        IN, OUT = reaching_definitions(cfg)
+    with span("dfg.edges"):
+        dfg_edges = build_dfg(cfg, IN)
     return cfg, dfg_edges
@@ -1,15 +1,18 @@
 # build_pdg.py
 #
 # CLI wrapper for pdg_builder:
-#   python build_pdg.py path/to/CFG_xxx.json [path/to/DFG_xxx.json]
+#   python build_pdg.py path/to/CFG_xxx.json [path/to/DFG_xxx.json] [--profile [MODES]]
 #
 # If DFG path is not provided, we try to infer it from the CFG path:
 #   .../CFG/CFG_FOO.json  -> .../DFG/DFG_FOO.json
 
-import sys
+import argparse
 import os
 
 from pdg_builder import build_pdg, export_pdg_graph
+# importable once pdg_builder has put the repo root on sys.path
+from profiling import add_profile_argument, profiled, set_profile_modes
+from tracing import span
 
 
 def infer_paths(cfg_json_path: str, dfg_json_path: str = None):
@@ -45,12 +48,20 @@ def infer_paths(cfg_json_path: str, dfg_json_path: str = None):
 
 
 def main():
-    if len(sys.argv) < 2:
-        print("Usage: python build_pdg.py path/to/CFG_xxx.json [path/to/DFG_xxx.json]")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(description="Build a PDG from a COBREX CFG JSON and its DFG.")
+    parser.add_argument("cfg_json_path", help="path/to/CFG_xxx.json")
+    parser.add_argument(
+        "dfg_json_path",
+        nargs="?",
+        default=None,
+        help="path/to/DFG_xxx.json (default: .../DFG/DFG_xxx.json next to CFG/)",
+    )
+    add_profile_argument(parser)
+    args = parser.parse_args()
+    set_profile_modes(args.profile)
 
-    cfg_json_path = sys.argv[1]
-    dfg_json_path_arg = sys.argv[2] if len(sys.argv) > 2 else None
+    cfg_json_path = args.cfg_json_path
+    dfg_json_path_arg = args.dfg_json_path
 
     dfg_json_path, pdg_json_path, pdg_pdf_prefix = infer_paths(
         cfg_json_path, dfg_json_path_arg
@@ -61,8 +72,16 @@ def main():
     print(f"PDG JSON (out): {pdg_json_path}")
     print(f"PDG PDF  (out): {pdg_pdf_prefix}.pdf")
 
-    pdg = build_pdg(cfg_json_path, dfg_json_path, pdg_json_path)
-    export_pdg_graph(pdg, pdg_pdf_prefix)
+    prog_dir = os.path.dirname(os.path.dirname(pdg_json_path))
+    with profiled(prog_dir, "pdg"), span("pdg", cfg=os.path.basename(cfg_json_path)) as sp:
+        pdg = build_pdg(cfg_json_path, dfg_json_path, pdg_json_path)
+        sp.count(
+            nodes=len(pdg["nodes"]),
+            data_edges=len(pdg["data_edges"]),
+            control_edges=len(pdg["control_edges"]),
+        )
+        with span("pdg.render"):
+            export_pdg_graph(pdg, pdg_pdf_prefix)
 
     print("PDG build complete.")
 
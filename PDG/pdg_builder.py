@@ -25,10 +25,17 @@
 
 import json
 import os
+import sys
 from typing import Dict, List, Tuple, Any
 
 from graphviz import Digraph
 
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+from graph_render import render, wants_graph
+from tracing import span
+
 
 # ─────────────────────────────────────────────────────────────
 # 0. Local CFG classes (copied from dfg_builder to avoid imports)
@@ -333,16 +340,20 @@ def build_pdg(cfg_json_path: str,
     Returns the PDG dict as well.
     """
     # 1. Load CFG + meta
-    cfg, meta = load_cfg_with_meta(cfg_json_path)
+    with span("pdg.load"):
+        cfg, meta = load_cfg_with_meta(cfg_json_path)
 
     # 2. Add EXIT and compute postdom / ipostdom / CDG
     exit_id = add_exit_node(cfg)
-    postdom = compute_postdominators(cfg, exit_id)
-    ipdom = compute_ipostdom(postdom, exit_id)
-    cdg_edges = build_cdg(cfg, ipdom, exit_id)
+    with span("pdg.postdominators"):
+        postdom = compute_postdominators(cfg, exit_id)
+    with span("pdg.cdg"):
+        ipdom = compute_ipostdom(postdom, exit_id)
+        cdg_edges = build_cdg(cfg, ipdom, exit_id)
 
     # 3. Load DDG (DFG) edges
-    ddg_edges = load_ddg_edges(dfg_json_path)
+    with span("pdg.ddg"):
+        ddg_edges = load_ddg_edges(dfg_json_path)
 
     # 4. Assemble PDG JSON
     nodes_json: List[Dict[str, Any]] = []
@@ -389,7 +400,7 @@ def build_pdg(cfg_json_path: str,
     }
 
     os.makedirs(os.path.dirname(pdg_json_path), exist_ok=True)
-    with open(pdg_json_path, "w") as f:
+    with span("pdg.write"), open(pdg_json_path, "w") as f:
         json.dump(pdg, f, indent=2)
 
     return pdg
@@ -401,9 +412,11 @@ def build_pdg(cfg_json_path: str,
 
 def export_pdg_graph(pdg: Dict[str, Any], out_prefix: str) -> None:
     """
-    Export PDG to Graphviz PDF.
+    Export PDG to Graphviz PDF (subject to the COBREX_RENDER policy in graph_render).
     We map COBOL node IDs (with colons) to n0, n1, ... to avoid port warnings.
     """
+    if not wants_graph():
+        return
     dot = Digraph(comment="COBOL PDG", format="pdf")
 
     nodes = pdg.get("nodes", [])
@@ -440,4 +453,4 @@ def export_pdg_graph(pdg: Dict[str, Any], out_prefix: str) -> None:
             continue
         dot.edge(src, dst, label=e.get("kind", "ctl"))
 
-    dot.render(out_prefix, cleanup=False)
+    render(dot, out_prefix)
@@ -1,26 +1,74 @@
 package com.example;
 
+import java.io.BufferedReader;
 import java.io.File;
 import java.io.FileWriter;
+import java.io.InputStreamReader;
+import java.io.PrintStream;
 
 import java.io.IOException;
 
-public class App 
+import io.proleap.cobol.asg.params.impl.CobolParserParamsImpl;
+import io.proleap.cobol.preprocessor.CobolPreprocessor;
+import io.proleap.cobol.preprocessor.impl.CobolPreprocessorImpl;
+
+/**
+ * ProLeap preprocessor entry point.
+ *
+ *   App <input.cbl>   preprocess one file into output/preprocessed.cbl
+ *   App --serve       long-lived worker: reads "input\toutput" lines on stdin,
+ *                     answers "OK\toutput" or "ERR\tmessage" on stdout
+ *
+ * The worker keeps the JVM and the parser warm, so a batch only pays the
+ * Maven / JVM startup once. Logging goes to stderr, stdout carries the replies.
+ */
+public class App
 {
+    private static String preprocess(CobolPreprocessor preprocessor, CobolParserParamsImpl params,
+                                     String input, String output) throws IOException
+    {
+        final String preProcessedInput = preprocessor.process(new File(input), params);
+
+        FileWriter outputFile = new FileWriter(output);
+        try {
+            outputFile.write(preProcessedInput);
+        } finally {
+            outputFile.close();
+        }
+        return output;
+    }
+
+    private static void serve(CobolPreprocessor preprocessor, CobolParserParamsImpl params) throws IOException
+    {
+        final BufferedReader in = new BufferedReader(new InputStreamReader(System.in, "UTF-8"));
+        final PrintStream out = new PrintStream(System.out, true, "UTF-8");
+
+        String line;
+        while ((line = in.readLine()) != null) {
+            if (line.trim().isEmpty()) {
+                continue;
+            }
+            final String[] parts = line.split("\t", 2);
+            try {
+                final String output = parts.length > 1 ? parts[1] : parts[0] + ".preprocessed";
+                out.println("OK\t" + preprocess(preprocessor, params, parts[0], output));
+            } catch (Exception e) {
+                out.println("ERR\t" + String.valueOf(e).replace('\n', ' ').replace('\t', ' '));
+            }
+        }
+    }
+
     public static void main( String[] args ) throws IOException
     {
-        
-        
-        final io.proleap.cobol.asg.params.impl.CobolParserParamsImpl params = new io.proleap.cobol.asg.params.impl.CobolParserParamsImpl();
-        
-		params.setFormat(io.proleap.cobol.preprocessor.CobolPreprocessor.CobolSourceFormatEnum.TANDEM);
-
-		File inputFile = new File(args[0]);
-		final String preProcessedInput = new io.proleap.cobol.preprocessor.impl.CobolPreprocessorImpl().process(inputFile, params);
-        
-
-        FileWriter outputFile = new FileWriter("output/preprocessed.cbl");
-        outputFile.write(preProcessedInput);
-        outputFile.close();
+        final CobolParserParamsImpl params = new CobolParserParamsImpl();
+		params.setFormat(CobolPreprocessor.CobolSourceFormatEnum.TANDEM);
+        final CobolPreprocessor preprocessor = new CobolPreprocessorImpl();
+
+        if (args.length > 0 && args[0].equals("--serve")) {
+            serve(preprocessor, params);
+            return;
+        }
+
+        preprocess(preprocessor, params, args[0], "output/preprocessed.cbl");
     }
 }
@@ -1,9 +1,15 @@
 from atomicUnit import AtomicUnit as AU
 from preconditionUnit import preCondition as PC
+from baseUnit import UnitIDs
 import json
 import os
 import graphviz as gv
 import sys
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+from graph_render import render, wants_graph
+from tracing import span
 sys.path.append('BR_Realisation/')
 from main import doBRR
 
@@ -13,6 +19,11 @@ class IR():
         self.fileName = ""
         self.rootNode = None
         self.allConstructs = []
+        # Numbering for the unit IDs of this build
+        self.ids = UnitIDs()
+        # Every unit made from the CFG, and absorbed unit -> unit it was merged into
+        self.units = []
+        self.mergedInto = {}
 
     def addConstruct(self,s):
         if s == "when" or s == "end-if" or s == "end-evaluate" or s == "exit":
@@ -26,16 +37,17 @@ class IR():
             self.addConstruct(node['name'])
             if node['name'] == "if" or node['name'] == "when" or node['name'] == "evaluate"  :
                 # Make a PC
-                pc = PC(self.fileName)
+                pc = PC(self.fileName,self.ids)
                 pc.setAttr(node)
                 id_to_obj[node['id']] = pc
             else:
                 # Make an AU
-                au = AU(self.fileName)
+                au = AU(self.fileName,self.ids)
                 au.setAttr(node)
                 id_to_obj[node['id']] = au
                 if node['name'] == "start":
                     self.rootNode = au
+        self.units = list(id_to_obj.values())
         return id_to_obj
     
     def fillChild(self,id_to_obj,edges):
@@ -52,32 +64,87 @@ class IR():
                 return True
         return False
     
-    def merge(self,parentNode,childNode):
-        parentNode.mergeNode(childNode)
+    def growBlock(self,head):
+        '''
+            Absorb the maximal straight-line chain below head into it in one pass.
 
-        for gChild,_ in childNode.properties['children']:
-            gChild.exchangeParent(childNode,parentNode)
+            A unit joins while the block's tail has a single child and that child
+            a single parent (plus the tag rules in checkMergable). Statement
+            texts and variables are collected and joined once per block, see
+            AtomicUnit.mergeChain.
+        '''
+        chain = []
+        absorbed = {head}
+        while True:
+            children = head.properties['children']
+            if len(children) != 1:
+                break
+            n,_ = children[0]
+            if not (self.checkMergable(head,n) and head.value != 'Begin') or n in absorbed:
+                break
+            absorbed.add(n)
+            chain.append(n)
+            # Grand-children keep pointing at n for now; only len(parents)
+            # matters while merging, so parents are rewritten once in resolveParents.
+            self.mergedInto[n] = head
+            head.properties['children'] = n.properties['children']
+            head.uniqueID = ""
+        if chain:
+            head.mergeChain(chain)
+        return
+
+    def _survivor(self,node):
+        root = node
+        while root in self.mergedInto:
+            root = self.mergedInto[root]
+        # Path compression, so long merge chains are only walked once
+        while node is not root:
+            nxt = self.mergedInto[node]
+            self.mergedInto[node] = root
+            node = nxt
+        return root
 
-        del childNode
+    def resolveParents(self):
+        '''
+            Point every parent entry at the unit that survived merging
+        '''
+        if not self.mergedInto:
+            return
+        for unit in self.units:
+            if unit in self.mergedInto:
+                continue
+            parents = unit.properties['parents']
+            for i,p in enumerate(parents):
+                if p in self.mergedInto:
+                    parents[i] = self._survivor(p)
         return
 
-    def dfs_run(self, node, visited=[]):
+    def dfs_run(self, node, visited=None):
+        '''
+            Form the RBBs: walk the graph depth first and grow a block from
+            every unit reached, before its children are explored.
+
+            Explicit stack instead of recursion (long paragraphs used to hit the
+            recursion limit); a frame is [node, children iterator].
+        '''
+        if visited is None:
+            visited = set()
         if node in visited:
             return
-        
-        visited.append(node)
 
-        while True:
-            flag = False
-            for n,_ in node.properties['children']:
-                if self.checkMergable(node,n) and node.value != 'Begin':
-                    self.merge(node,n)
-                    flag = True
+        visited.add(node)
+        self.growBlock(node)
+        stack = [[node,iter(node.properties['children'])]]
+
+        while stack:
+            for n,_ in stack[-1][1]:
+                if n not in visited:
+                    visited.add(n)
+                    self.growBlock(n)
+                    stack.append([n,iter(n.properties['children'])])
                     break
-                else:
-                    self.dfs_run(n,visited)
-            if flag == False:
-                break
+            else:
+                stack.pop()
         return
 
     def buildIR(self,cfg,fileName):
@@ -85,13 +152,15 @@ class IR():
             Function to build IR out of the given CFG
         '''
         self.fileName = fileName
+        self.ids = UnitIDs()
 
         # Step1: Make All nodes as corresponding AUs and/or PCs respectively
         id_to_obj = self.makeNodes(cfg['nodes'])
         # Step2: Fillup children values
         self.fillChild(id_to_obj,cfg['edges'])
         # Step3: Iterate over the tree and verify if nodes are mergable
-        self.dfs_run(self.rootNode,[])
+        self.dfs_run(self.rootNode)
+        self.resolveParents()
         return
     
     def getRelationName(self,parentNode,childNode):
@@ -104,15 +173,9 @@ class IR():
         else:
             return '{}_SUCCESSOR_{}'.format(str(parentNode)[:2],str(childNode)[:2])
 
-    def _build_json(self,node,ir_json,visited=[]):
-        if node in visited:
-            return
-        
-        visited.append(node)
-        # print(node)
-
+    def _json_node(self,node):
         # Design decision to keep it here or make it a method for BU
-        ir_json['nodes'].append({
+        return {
             'id': node.getUID(),
             'type': str(node)[:2],
             'label': '{}:{}:{}'.format(str(node)[:2],node.startLine['Number'],node.endLine['Number']),
@@ -122,19 +185,51 @@ class IR():
                 'endLineNumber': node.endLine['Number'],
                 'fileName': node.fileName
             }
-        })
-
-        for child,label in node.properties['children']:
-            self._build_json(child,ir_json,visited)
-            ir_json['edges'].append({
-                'id':'Link: {} : {}'.format(node.getUID(),child.getUID()),
-                'sourceUID': node.getUID(),
-                'targetUID': child.getUID(),
-                'relationName': self.getRelationName(node,child),
-                'properties' : {
-                    'label' : label
-                }
-            })
+        }
+
+    def _json_edge(self,node,child,label):
+        return {
+            'id':'Link: {} : {}'.format(node.getUID(),child.getUID()),
+            'sourceUID': node.getUID(),
+            'targetUID': child.getUID(),
+            'relationName': self.getRelationName(node,child),
+            'properties' : {
+                'label' : label
+            }
+        }
+
+    def _build_json(self,node,ir_json,visited=None):
+        '''
+            Depth first walk emitting nodes in pre-order and each edge once the
+            child's sub-graph is done (same order as the old recursive walk).
+            A frame is [node, children iterator, edge waiting for its child].
+        '''
+        if visited is None:
+            visited = set()
+        if node in visited:
+            return
+
+        visited.add(node)
+        ir_json['nodes'].append(self._json_node(node))
+        stack = [[node,iter(node.properties['children']),None]]
+
+        while stack:
+            frame = stack[-1]
+            node,children,pending = frame
+            if pending is not None:
+                ir_json['edges'].append(self._json_edge(node,*pending))
+                frame[2] = None
+            for child,label in children:
+                if child in visited:
+                    ir_json['edges'].append(self._json_edge(node,child,label))
+                    continue
+                visited.add(child)
+                ir_json['nodes'].append(self._json_node(child))
+                frame[2] = (child,label)
+                stack.append([child,iter(child.properties['children']),None])
+                break
+            else:
+                stack.pop()
 
         return
 
@@ -148,13 +243,15 @@ class IR():
             'edges': []
         }
 
-        self._build_json(self.rootNode,ir_json,[])
+        self._build_json(self.rootNode,ir_json)
         filename = self.fileName + "_IR.json"
         with open(path, 'w') as f:
-            json.dump(ir_json, f)
+            f.write(json.dumps(ir_json))
         return ir_json
     
     def getPDF(self,filepath,ir_json,format):
+        if not wants_graph():
+            return
 
         graph = gv.Digraph(name='cluster',format=format)
         for node in ir_json['nodes']:
@@ -165,22 +262,27 @@ class IR():
 
 
         # Need to think about the fix I did i.e. would it always generate a unique ID
-        graph.render(filepath)
+        render(graph,filepath)
         return
 
 def runIR(fileName):
     try:
         print('STAGE: RBB stage initiated.')
-        ir = IR()
-        with open('output/COBOL_{}/CFG/CFG_{}.json'.format(fileName,fileName)) as f:
-            cfg = json.load(f)
-        ir.buildIR(cfg,fileName)
-        output_directory = './output/COBOL_{}/RBB'.format(fileName)
-        if not os.path.isdir(output_directory):
-            cmd = 'mkdir ./output/COBOL_{}/RBB'.format(fileName)
-            os.system(cmd)
-        ir_json = ir.getJSON(os.path.join('output/COBOL_{}/RBB/'.format(fileName),'RBB_{}.json'.format(fileName)))
-        ir.getPDF(os.path.join('output/COBOL_{}/RBB/'.format(fileName),'RBB_{}'.format(fileName)),ir_json,'pdf')
+        with span('rbb') as sp:
+            ir = IR()
+            with open('output/COBOL_{}/CFG/CFG_{}.json'.format(fileName,fileName)) as f:
+                cfg = json.load(f)
+            sp.count(cfg_nodes=len(cfg['nodes']),cfg_edges=len(cfg['edges']))
+            with span('rbb.build'):
+                ir.buildIR(cfg,fileName)
+            output_directory = './output/COBOL_{}/RBB'.format(fileName)
+            if not os.path.isdir(output_directory):
+                cmd = 'mkdir ./output/COBOL_{}/RBB'.format(fileName)
+                os.system(cmd)
+            with span('rbb.write'):
+                ir_json = ir.getJSON(os.path.join('output/COBOL_{}/RBB/'.format(fileName),'RBB_{}.json'.format(fileName)))
+                ir.getPDF(os.path.join('output/COBOL_{}/RBB/'.format(fileName),'RBB_{}'.format(fileName)),ir_json,'pdf')
+            sp.count(nodes=len(ir_json['nodes']),edges=len(ir_json['edges']))
         print('STAGE: RBB stage successfully executed.')
         print('OUTPUT-RBB: COBREX-CLI/output/COBOL_{}/RBB\n'.format(fileName))
     except Exception as e:
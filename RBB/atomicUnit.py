@@ -1,35 +1,37 @@
 from baseUnit import Unit
 
-count = 0
-
 class AtomicUnit(Unit):
     '''
         Atomic Unit by definition is that peice of code which does not have any
         control flow transfer while execution
     '''
 
-    def __init__(self, fileName):
-        super().__init__(fileName)
+    def __init__(self, fileName, ids):
+        super().__init__(fileName, ids)
         # Any attributes specific to AU should be here and same for the methods
 
     def __str__(self):
         return 'AU {}'.format(self.getUID())
     
     def getUID(self):
-        global count
         if self.uniqueID == "":
-            self.uniqueID = '{} AU {} {} {}'.format(self.fileName,self.startLine['Number'],self.endLine['Number'],count)
-            count+=1
+            self.uniqueID = '{} AU {} {} {}'.format(self.fileName,self.startLine['Number'],self.endLine['Number'],self.ids.next('AU'))
         return self.uniqueID
     
-    def mergeNode(self,node):
+    def mergeChain(self,nodes):
+        '''
+            Merge a straight-line chain of units (in execution order) into this one.
+            Texts and variable lists are joined once for the whole chain.
+        '''
         self.uniqueID = ""
-        self.setEndLine(node.endLine['ID'],node.endLine['Number'])
-        self.value += '\n'
-        self.value += node.value
-        self.properties['name'] = self.properties['name'].union(node.properties['name'])
-        self.properties['children'] = node.properties['children']
-        self.properties['source_variables'] = list(set(self.properties['source_variables'] + node.properties['source_variables']))
-        self.properties['target_variables'] = list(set(self.properties['target_variables'] + node.properties['target_variables']))
-        self.properties['conditional_variables'] = list(set(self.properties['conditional_variables'] + node.properties['conditional_variables']))
+        last = nodes[-1]
+        self.setEndLine(last.endLine['ID'],last.endLine['Number'])
+        self.value = '\n'.join([self.value] + [node.value for node in nodes])
+        self.properties['name'] = self.properties['name'].union(*[node.properties['name'] for node in nodes])
+        self.properties['children'] = last.properties['children']
+        for key in ('source_variables','target_variables','conditional_variables'):
+            merged = dict.fromkeys(self.properties[key])
+            for node in nodes:
+                merged.update(dict.fromkeys(node.properties[key]))
+            self.properties[key] = list(merged)
         return
\ No newline at end of file
@@ -1,11 +1,27 @@
+import itertools
+
+class UnitIDs():
+    '''
+        Running numbers used in unit IDs. One is made per IR build, so the IDs
+        only depend on the program being built and separate builds (or threads)
+        never share a counter. AUs and PCs are numbered separately.
+    '''
+
+    def __init__(self):
+        self.counters = {'AU': itertools.count(), 'PC': itertools.count()}
+
+    def next(self,kind):
+        return next(self.counters[kind])
 
 class Unit():
 
-    __slots__ = ["uniqueID","fileName","startLine","endLine","value","properties","variables"]
+    __slots__ = ["uniqueID","fileName","startLine","endLine","value","properties","variables","ids"]
 
-    def __init__(self,fileName):
+    def __init__(self,fileName,ids):
         self.uniqueID = ""
         self.fileName = fileName
+        # UnitIDs of the IR build this unit belongs to
+        self.ids = ids
         self.startLine = {
             'ID': "",
             'Number': 0
@@ -0,0 +1,337 @@
+#!/usr/bin/env python
+"""
+Copybook resolution with a cache and a program -> copybook dependency graph.
+
+Programs in one portfolio share the same few dozen copybooks. The resolver
+reads and scans each copybook once per (path, mtime, size). It then inlines
+`COPY name.` statements from that cache, so cobc never looks a copybook up
+again. Only the statement itself is replaced; code sharing its first or
+last line (`01 CUST-REC.  COPY CUSTREC.`) is kept. The scans are kept on disk too (<cache-dir>/copybooks.json), so a
+later run does not re-read copybooks that did not change.
+
+Every expansion records which copybooks a program pulled in
+(<cache-dir>/deps.json). A program is stale when the program or any copybook
+it used has changed. Changing one copybook therefore invalidates only the
+programs that include it.
+
+    resolver = CopybookResolver(["copybooks"], cache_dir="output/.cpycache")
+    text = resolver.expand("prog.cbl")      # COPYs inlined, deps recorded
+    resolver.is_stale("prog.cbl")           # False until something changes
+    resolver.save()
+
+COPY ... REPLACING is not inlined. The statement is left in place for cobc
+and the dependency is still recorded. `EXEC SQL INCLUDE x END-EXEC` is only
+recorded, because it belongs to the SQL precompiler.
+
+    python copybook_cache.py --copybooks copybooks --cache-dir C  prog.cbl ...
+    python copybook_cache.py --cache-dir C --affected copybooks/SQLCA.cpy
+"""
+
+from __future__ import annotations
+
+import argparse
+import bisect
+import json
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+DEFAULT_COPYBOOK_DIRS = [Path(__file__).resolve().parent / "copybooks"]
+COPYBOOK_SUFFIXES = ("", ".cpy", ".CPY", ".cbl", ".CBL", ".cob", ".COB", ".copy")
+
+# the COPY verb, not part of a hyphenated name such as WS-COPY
+_COPY_WORD_RE = re.compile(r"(?<![\w-])COPY(?![\w-])", re.IGNORECASE)
+# COPY name [OF|IN lib] [REPLACING ...] .   (name may be quoted)
+_COPY_RE = re.compile(
+    r"(?<![\w-])COPY\s+(?P<name>\"[^\"]+\"|'[^']+'|[A-Za-z0-9_$#@-]+)"
+    r"(?:\s+(?:OF|IN)\s+[A-Za-z0-9_$#@-]+)?"
+    r"(?P<replacing>\s+REPLACING\b.*?)?\s*\.",
+    re.IGNORECASE | re.DOTALL,
+)
+_INCLUDE_RE = re.compile(
+    r"\bEXEC\s+SQL\s+INCLUDE\s+(?P<name>[A-Za-z0-9_$#@-]+)",
+    re.IGNORECASE,
+)
+
+# bump when _scan's output changes, so cached copybook scans are redone
+_SCAN_VERSION = 2
+
+
+def _stamp(path: Path) -> Tuple[int, int]:
+    st = path.stat()
+    return st.st_mtime_ns, st.st_size
+
+
+def _code_area(line: str) -> str:
+    """Columns 8-72 of a fixed-format line, or '' for comments/debug lines."""
+    if len(line) > 6 and line[6] in "*/Dd":
+        return ""
+    return line[7:72] if len(line) > 7 else ""
+
+
+def _scan(lines: List[str]) -> List[dict]:
+    """
+    Find COPY / SQL INCLUDE statements in a source.
+
+    Returns dicts with name, kind ("copy" / "include"), replacing flag, the
+    first/last line index the statement spans, the column of COPY on the
+    first line (start_col) and the column just past the terminating period
+    on the last line (end_col), so code sharing those lines can be kept.
+    """
+    found = []
+    n = len(lines)
+    i, col = 0, 7
+    while i < n:
+        code = _code_area(lines[i])
+        if col == 7 and "INCLUDE" in code.upper():
+            m = _INCLUDE_RE.search(code)
+            if m:
+                found.append({"name": m.group("name"), "kind": "include",
+                              "replacing": False, "start": i, "end": i,
+                              "start_col": 7 + m.start(), "end_col": 7 + m.end()})
+        word = _COPY_WORD_RE.search(code, col - 7)
+        if word is None:
+            i, col = i + 1, 7
+            continue
+        # a COPY statement ends at the first period; gather lines until then
+        j = i
+        buf = code
+        offsets = [0]  # where each gathered line's code area starts in buf
+        while "." not in buf[word.start():] and j + 1 < n:
+            j += 1
+            buf += " "
+            offsets.append(len(buf))
+            buf += _code_area(lines[j])
+        m = _COPY_RE.match(buf, word.start())
+        if m is None:
+            col = 7 + word.end()
+            continue
+        k = bisect.bisect_right(offsets, m.end() - 1) - 1
+        end_col = 7 + m.end() - offsets[k]
+        found.append({"name": m.group("name").strip("\"'"), "kind": "copy",
+                      "replacing": bool(m.group("replacing")),
+                      "start": i, "end": i + k,
+                      "start_col": 7 + word.start(), "end_col": end_col})
+        # another statement may follow on the line the period is on
+        i, col = i + k, end_col
+    return found
+
+
+class CopybookResolver:
+    """
+    Finds copybooks on a search path, caches their text and scanned
+    COPY statements by (path, mtime, size), and records which copybooks each
+    expanded program used. Safe to share between threads.
+    """
+
+    def __init__(self, search_dirs: Optional[Iterable] = None,
+                 cache_dir: Optional[os.PathLike] = None):
+        dirs = DEFAULT_COPYBOOK_DIRS if search_dirs is None else search_dirs
+        self.search_dirs = [Path(d).resolve() for d in dirs]
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self._lock = threading.Lock()
+        # resolved path -> {"stamp": [mtime_ns, size], "lines": [...], "refs": [...]}
+        self._copybooks: Dict[str, dict] = {}
+        # program path -> {"stamp": [...], "copybooks": {path: [mtime_ns, size]}}
+        self._deps: Dict[str, dict] = {}
+        self._names: Dict[str, Optional[str]] = {}
+        self.hits = 0
+        self.misses = 0
+        if self.cache_dir is not None:
+            self._load()
+
+    # ---------------- persistence ----------------
+
+    def _load(self) -> None:
+        for attr, fname in (("_copybooks", "copybooks.json"), ("_deps", "deps.json")):
+            path = self.cache_dir / fname
+            if path.exists():
+                try:
+                    setattr(self, attr, json.loads(path.read_text()))
+                except (OSError, ValueError) as e:
+                    print(f"[COPYBOOK][WARN] Ignoring unreadable cache {path}: {e!r}")
+
+    def save(self) -> None:
+        """Write the copybook cache and the dependency graph to cache_dir."""
+        if self.cache_dir is None:
+            return
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            payloads = (("copybooks.json", self._copybooks), ("deps.json", self._deps))
+            for fname, data in payloads:
+                tmp = self.cache_dir / (fname + ".tmp")
+                tmp.write_text(json.dumps(data))
+                os.replace(tmp, self.cache_dir / fname)
+
+    # ---------------- lookup ----------------
+
+    def find(self, name: str) -> Optional[Path]:
+        """Resolve a COPY name to a file on the search path (None if absent)."""
+        key = name.upper()
+        if key in self._names:
+            hit = self._names[key]
+            return Path(hit) if hit else None
+        result = None
+        for d in self.search_dirs:
+            for base in (name, name.upper(), name.lower()):
+                for suffix in COPYBOOK_SUFFIXES:
+                    cand = d / (base + suffix)
+                    if cand.is_file():
+                        result = cand.resolve()
+                        break
+                if result:
+                    break
+            if result:
+                break
+        self._names[key] = str(result) if result else None
+        return result
+
+    def load(self, path: Path) -> dict:
+        """Cached {"stamp", "lines", "refs"} for a copybook; re-read if it changed."""
+        key = str(Path(path).resolve())
+        stamp = list(_stamp(Path(key)))
+        with self._lock:
+            entry = self._copybooks.get(key)
+            if (entry is not None and entry["stamp"] == stamp
+                    and entry.get("scan") == _SCAN_VERSION):
+                self.hits += 1
+                return entry
+        lines = Path(key).read_text(errors="ignore").splitlines(keepends=True)
+        entry = {"stamp": stamp, "lines": lines, "refs": _scan(lines), "scan": _SCAN_VERSION}
+        with self._lock:
+            self.misses += 1
+            self._copybooks[key] = entry
+        return entry
+
+    # ---------------- expansion ----------------
+
+    def expand(self, program: os.PathLike) -> str:
+        """
+        Return the program text with every plain COPY inlined (recursively),
+        and record the program's copybook dependencies.
+        """
+        program = Path(program).resolve()
+        lines = program.read_text(errors="ignore").splitlines(keepends=True)
+        used: Dict[str, list] = {}
+        out = self._expand_lines(lines, used, stack=set())
+        with self._lock:
+            self._deps[str(program)] = {"stamp": list(_stamp(program)), "copybooks": used}
+        return "".join(out)
+
+    def _expand_lines(self, lines: List[str], used: Dict[str, list],
+                      stack: Set[str], refs: Optional[List[dict]] = None) -> List[str]:
+        refs = _scan(lines) if refs is None else refs
+        # the end line of an inlined COPY is rewritten with the statement blanked
+        lines = list(lines)
+        out: List[str] = []
+        pos = 0
+        for ref in refs:
+            path = self.find(ref["name"])
+            if path is None:
+                continue
+            entry = self.load(path)
+            used[str(path)] = entry["stamp"]
+            if ref["kind"] != "copy" or ref["replacing"] or str(path) in stack:
+                # leave it for cobc / the SQL precompiler; still walk its deps
+                self._collect(entry, used, stack | {str(path)})
+                continue
+            start, end = ref["start"], ref["end"]
+            out.extend(lines[pos:start])
+            # code before COPY on its first line, e.g. "01 CUST-REC." in
+            # "01 CUST-REC.  COPY CUSTREC."
+            head = lines[start][:ref["start_col"]]
+            if _code_area(head).strip():
+                out.append(head.rstrip() + "\n")
+            out.extend(self._expand_lines(entry["lines"], used,
+                                          stack | {str(path)}, entry["refs"]))
+            if out and not out[-1].endswith("\n"):
+                out[-1] += "\n"
+            # code after the period on its last line, kept in its columns
+            tail = " " * ref["end_col"] + lines[end][ref["end_col"]:]
+            if _code_area(tail).strip():
+                lines[end] = tail
+                pos = end
+            else:
+                pos = end + 1
+        out.extend(lines[pos:])
+        return out
+
+    def _collect(self, entry: dict, used: Dict[str, list], stack: Set[str]) -> None:
+        for ref in entry["refs"]:
+            path = self.find(ref["name"])
+            if path is None or str(path) in stack:
+                continue
+            sub = self.load(path)
+            used[str(path)] = sub["stamp"]
+            self._collect(sub, used, stack | {str(path)})
+
+    # ---------------- dependency graph ----------------
+
+    def tracked(self, program: os.PathLike) -> bool:
+        """True if the program's dependencies have been recorded."""
+        return str(Path(program).resolve()) in self._deps
+
+    def dependencies(self, program: os.PathLike) -> List[str]:
+        entry = self._deps.get(str(Path(program).resolve()))
+        return sorted(entry["copybooks"]) if entry else []
+
+    def programs_including(self, copybook: os.PathLike) -> List[str]:
+        """Programs whose last expansion used this copybook."""
+        key = str(Path(copybook).resolve())
+        return sorted(p for p, e in self._deps.items() if key in e["copybooks"])
+
+    def is_stale(self, program: os.PathLike) -> bool:
+        """True if the program was never expanded, or it or a copybook changed."""
+        program = Path(program).resolve()
+        entry = self._deps.get(str(program))
+        if entry is None or not program.exists():
+            return True
+        if entry["stamp"] != list(_stamp(program)):
+            return True
+        for cpy, stamp in entry["copybooks"].items():
+            p = Path(cpy)
+            if not p.exists() or list(_stamp(p)) != stamp:
+                return True
+        return False
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Expand COPY statements through a cached copybook resolver."
+    )
+    parser.add_argument("programs", nargs="*", type=Path,
+                        help="COBOL programs to expand")
+    parser.add_argument("--copybooks", nargs="*", type=Path, default=None,
+                        help="Copybook directories (default: ./copybooks)")
+    parser.add_argument("--cache-dir", type=Path, required=True,
+                        help="Where copybooks.json / deps.json are kept")
+    parser.add_argument("--out-dir", type=Path, default=None,
+                        help="Write expanded programs here as <stem>.cbl")
+    parser.add_argument("--affected", type=Path, default=None,
+                        help="Print the programs that include this copybook and exit")
+    args = parser.parse_args(argv)
+
+    resolver = CopybookResolver(args.copybooks, cache_dir=args.cache_dir)
+
+    if args.affected is not None:
+        for prog in resolver.programs_including(args.affected):
+            print(prog)
+        return 0
+
+    if args.out_dir is not None:
+        args.out_dir.mkdir(parents=True, exist_ok=True)
+    for prog in args.programs:
+        text = resolver.expand(prog)
+        deps = resolver.dependencies(prog)
+        print(f"[COPYBOOK] {prog}: {len(deps)} copybook(s)")
+        if args.out_dir is not None:
+            (args.out_dir / f"{prog.stem}.cbl").write_text(text)
+    resolver.save()
+    print(f"[COPYBOOK] cache hits={resolver.hits} misses={resolver.misses}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
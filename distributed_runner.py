@@ -0,0 +1,419 @@
+#!/usr/bin/env python
+"""
+Run the pipeline as (program, stage) jobs claimed by workers on any number
+of machines from one shared SQLite queue (job_queue.py).
+
+Job kinds, each enqueued by the one before it when it completes:
+
+    static   extractor.py via run_all_projects_static.run_extractor_for_file
+    br       BR JSON + ProgramIndex + BR_REP        (best-effort, as in the driver)
+    prompts  BR_PROMPTS/<mode>/; enqueues one file job per mode and one
+             rule job per prompt
+    rule     one rule-level summary
+    file     one file-level summary; claimable once all its rule jobs have
+             finished (done or finally failed)
+
+Workers prefer the latest stage (file > rule > prompts > br > static), so
+programs finish instead of every worker piling onto extraction. A claimed
+job is leased; a heartbeat thread renews the lease while the handler runs.
+If a worker dies, its job is re-queued once the lease expires. Failed jobs
+are retried with backoff, up to --max-attempts.
+
+Outputs go through the same functions, output layout and checkpoint
+journal as mtp_full_pipeline_all_projects.py. A later sequential run skips
+everything the workers finished, and evaluation is left to
+score_summaries.py.
+
+    # once, on any machine
+    python distributed_runner.py seed --projects-root data/project_clean \\
+        --output-root output --model llama3.1
+
+    # on each machine (repository root, output/ on a shared filesystem)
+    python distributed_runner.py worker --queue output/job_queue.sqlite
+
+    # several workers on this machine, e.g. for local testing
+    python distributed_runner.py local --queue output/job_queue.sqlite --workers 4
+
+    python distributed_runner.py status --queue output/job_queue.sqlite
+    python distributed_runner.py requeue --queue output/job_queue.sqlite --failed
+
+Paths are stored in the queue as given to `seed`, so every machine must see
+the repository and the output root at the same (e.g. relative) paths.
+"""
+
+from __future__ import annotations
+
+import argparse
+import subprocess
+import sys
+import time
+import traceback
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from job_queue import (
+    DEFAULT_LEASE,
+    Heartbeat,
+    Job,
+    JobQueue,
+    LeaseLost,
+    NewJob,
+    PermanentFailure,
+    default_worker_id,
+)
+from mtp_full_pipeline_all_projects import (
+    _output_done,
+    _summarise_rule_prompt,
+    build_br_index,
+    build_prompts,
+    discover_cobol_files,
+    ensure_static_pipeline_for_program,
+    generate_file_level_summaries_for_program,
+    program_id_for_file,
+    read_cobol_source,
+    resolve_prog_out_dir,
+    rule_prompt_entries,
+)
+from pipeline_journal import JOURNAL_NAME, PipelineJournal, sha256_text
+from run_all_projects_static import run_extractor_for_file
+from summarizer.mocktail_config import DEFAULT_MOCKTAIL_MODES
+from tracing import TRACE_FORMATS, enable_tracing, span
+
+QUEUE_NAME = "job_queue.sqlite"
+JOB_KINDS = ("static", "br", "prompts", "rule", "file")
+PRIORITY = {"static": 0, "br": 10, "prompts": 20, "rule": 30, "file": 40}
+
+
+@dataclass
+class RunConfig:
+    """Run-wide settings written by `seed` into the queue's meta table."""
+
+    projects_root: Path
+    output_root: Path
+    modes: List[str]
+    model: str
+    overwrite_llm: bool
+    journal: Optional[Path]
+    max_attempts: int
+
+    @classmethod
+    def from_meta(cls, meta: Dict[str, object]) -> "RunConfig":
+        return cls(
+            projects_root=Path(meta["projects_root"]),
+            output_root=Path(meta["output_root"]),
+            modes=list(meta["modes"]),
+            model=meta["model"],
+            overwrite_llm=bool(meta["overwrite_llm"]),
+            journal=Path(meta["journal"]) if meta.get("journal") else None,
+            max_attempts=int(meta["max_attempts"]),
+        )
+
+
+def _job(cfg: RunConfig, kind: str, key: str, payload: dict, **kwargs) -> NewJob:
+    return NewJob(key=f"{kind}:{key}", kind=kind, payload=payload,
+                  priority=PRIORITY[kind], max_attempts=cfg.max_attempts, **kwargs)
+
+
+# ---------------------------------------------------------------------------
+# Job handlers: payload -> follow-up jobs (raise to fail the job)
+# ---------------------------------------------------------------------------
+
+class Worker:
+    def __init__(self, queue: JobQueue, worker_id: str, kinds: Optional[List[str]] = None,
+                 lease: float = DEFAULT_LEASE, poll: float = 2.0):
+        self.queue = queue
+        self.id = worker_id
+        self.kinds = kinds
+        self.lease = lease
+        self.poll = poll
+        self.cfg = RunConfig.from_meta(queue.meta())
+        # shared file, one in-memory view per worker; the queue already
+        # guarantees a unit is claimed by one worker at a time
+        self.journal = PipelineJournal(self.cfg.journal) if self.cfg.journal else None
+        self.handlers: Dict[str, Callable[[dict], List[NewJob]]] = {
+            "static": self.run_static,
+            "br": self.run_br,
+            "prompts": self.run_prompts,
+            "rule": self.run_rule,
+            "file": self.run_file,
+        }
+
+    def _journal(self, payload: dict) -> Optional[PipelineJournal]:
+        return self.journal.scope(payload["project"]) if self.journal is not None else None
+
+    def run_static(self, p: dict) -> List[NewJob]:
+        if not run_extractor_for_file(Path(p["cbl"]), p["project"], self.cfg.output_root):
+            raise RuntimeError(f"extractor.py failed for {p['cbl']}")
+        return [_job(self.cfg, "br", p["unit"], p)]
+
+    def run_br(self, p: dict) -> List[NewJob]:
+        prog = p["prog"]
+        prog_out_dir = resolve_prog_out_dir(self.cfg.output_root, p["project"], prog)
+        if not ensure_static_pipeline_for_program(prog, Path(p["cbl"]), prog_out_dir):
+            raise PermanentFailure(f"no static outputs at {prog_out_dir}")
+        build_br_index(prog, prog_out_dir, self._journal(p))
+        return [_job(self.cfg, "prompts", p["unit"], dict(p, prog_out_dir=str(prog_out_dir)))]
+
+    def run_prompts(self, p: dict) -> List[NewJob]:
+        prog, prog_out_dir = p["prog"], Path(p["prog_out_dir"])
+        build_prompts(prog, prog_out_dir, self.cfg.modes, self._journal(p))
+
+        cobol_source = read_cobol_source(prog, Path(p["cbl"]))
+        jobs: List[NewJob] = []
+        for mode in self.cfg.modes:
+            entries = rule_prompt_entries(prog, prog_out_dir, mode, cobol_source,
+                                          self.cfg.overwrite_llm)
+            if not entries:
+                print(f"[RULE][WARN] No prompts for {prog} mode={mode}")
+                continue
+            file_key = f"{p['unit']}:{mode}"
+            jobs.append(_job(self.cfg, "file", file_key, dict(p, mode=mode),
+                             children=len(entries)))
+            for br_safe, prompt_path in entries:
+                jobs.append(_job(
+                    self.cfg, "rule", f"{file_key}:{br_safe}",
+                    dict(p, mode=mode, br=br_safe, prompt=str(prompt_path)),
+                    parent=f"file:{file_key}",
+                ))
+        return jobs
+
+    def run_rule(self, p: dict) -> List[NewJob]:
+        prog, mode, br_safe = p["prog"], p["mode"], p["br"]
+        mode_out = Path(p["prog_out_dir"]) / "LLM" / "rule_level" / mode
+        mode_out.mkdir(parents=True, exist_ok=True)
+        out_path = mode_out / f"RULE_SUMMARY_{prog}_{br_safe}_{mode}.txt"
+        journal = self._journal(p)
+        prompt = Path(p["prompt"]).read_text(encoding="utf-8")
+        if not self.cfg.overwrite_llm and _output_done(journal, prog, "rule", mode, br_safe, out_path,
+                                                       sha256_text(prompt)):
+            return []
+        if not _summarise_rule_prompt(prog, br_safe, mode, prompt, self.cfg.model, out_path, journal):
+            raise RuntimeError(f"LLM call failed for {prog} {br_safe} mode={mode}")
+        return []
+
+    def run_file(self, p: dict) -> List[NewJob]:
+        prog, mode, prog_out_dir = p["prog"], p["mode"], Path(p["prog_out_dir"])
+        generate_file_level_summaries_for_program(
+            prog=prog,
+            prog_out_dir=prog_out_dir,
+            modes=[mode],
+            model=self.cfg.model,
+            overwrite=self.cfg.overwrite_llm,
+            journal=self._journal(p),
+        )
+        out_path = prog_out_dir / "LLM" / "file_level" / f"FILE_SUMMARY_{prog}_{mode}.txt"
+        if not out_path.is_file():
+            raise RuntimeError(f"no file-level summary for {prog} mode={mode}")
+        return []
+
+    # -- main loop -----------------------------------------------------------
+
+    def run(self, exit_when_idle: bool = True) -> int:
+        """Claim and run jobs; returns how many this worker completed."""
+        done = 0
+        # jobs that can still lead to work of our kinds: ours and earlier stages
+        upstream = None
+        if self.kinds:
+            last = max(PRIORITY[k] for k in self.kinds)
+            upstream = [k for k in JOB_KINDS if PRIORITY[k] <= last]
+        print(f"[WORKER] {self.id} started (kinds={self.kinds or 'all'}, lease={self.lease:.0f}s)")
+        while True:
+            job = self.queue.claim(self.id, self.kinds, self.lease)
+            if job is None:
+                if exit_when_idle and self.queue.unfinished(upstream) == 0:
+                    break
+                # running jobs may still enqueue follow-ups (or expire)
+                time.sleep(self.poll)
+                continue
+            if self.run_job(job):
+                done += 1
+        print(f"[WORKER] {self.id} finished: {done} job(s) completed")
+        return done
+
+    def run_job(self, job: Job) -> bool:
+        print(f"[WORKER] {self.id} → {job.key} (attempt {job.attempts}/{job.max_attempts})")
+        error = None
+        permanent = False
+        follow_ups: List[NewJob] = []
+        with Heartbeat(self.queue, job, self.id, self.lease) as hb, \
+                span("job", kind=job.kind, key=job.key, attempt=job.attempts) as sp:
+            try:
+                follow_ups = self.handlers[job.kind](job.payload)
+            except PermanentFailure as e:
+                error, permanent = str(e), True
+            except KeyboardInterrupt:
+                self._fail(job, "worker interrupted")
+                raise
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+                traceback.print_exc()
+            if error:
+                sp.fail(error)
+
+        if hb.lost:
+            print(f"[WORKER][WARN] Lease on {job.key} expired while running; result discarded")
+            return False
+        if error:
+            state = self._fail(job, error, permanent)
+            print(f"[WORKER][ERR] {job.key}: {error} → {state}")
+            return False
+        try:
+            self.queue.complete(job, self.id, follow_ups)
+        except LeaseLost:
+            print(f"[WORKER][WARN] Lease on {job.key} lost before completion")
+            return False
+        return True
+
+    def _fail(self, job: Job, error: str, permanent: bool = False) -> str:
+        try:
+            return self.queue.fail(job, self.id, error, permanent)
+        except LeaseLost:
+            return "lease lost"
+
+
+# ---------------------------------------------------------------------------
+# Commands
+# ---------------------------------------------------------------------------
+
+def seed(queue: JobQueue, cfg: RunConfig, skip_static: bool) -> int:
+    """One static (or, with skip_static, br) job per COBOL file; returns how many are new."""
+    queue.set_meta({
+        "projects_root": str(cfg.projects_root),
+        "output_root": str(cfg.output_root),
+        "modes": cfg.modes,
+        "model": cfg.model,
+        "overwrite_llm": cfg.overwrite_llm,
+        "journal": str(cfg.journal) if cfg.journal else None,
+        "max_attempts": cfg.max_attempts,
+    })
+    kind = "br" if skip_static else "static"
+    jobs = []
+    for project, cbl_path in sorted(discover_cobol_files(cfg.projects_root)):
+        prog = program_id_for_file(project, cbl_path, cfg.projects_root)
+        unit = f"{project}/{prog}"
+        jobs.append(_job(cfg, kind, unit, {
+            "project": project, "prog": prog, "cbl": str(cbl_path), "unit": unit,
+        }))
+    added = queue.enqueue(jobs)
+    print(f"[SEED] {len(jobs)} program(s) under {cfg.projects_root}, {added} new {kind} job(s)")
+    return added
+
+
+def print_status(queue: JobQueue) -> None:
+    counts = queue.counts()
+    states = ("pending", "blocked", "running", "done", "failed")
+    print(f"{'kind':<10}" + "".join(f"{s:>9}" for s in states))
+    for kind in JOB_KINDS:
+        row = counts.get(kind, {})
+        print(f"{kind:<10}" + "".join(f"{row.get(s, 0):>9}" for s in states))
+
+    now = time.time()
+    running = queue.running()
+    if running:
+        print(f"\nRunning ({len(running)}):")
+        for row in running:
+            print(f"  {row['key']:<50} {row['worker']:<24} "
+                  f"{now - row['started']:>7.0f}s, last beat {now - row['heartbeat']:.0f}s ago")
+    failures = queue.failures()
+    if failures:
+        print(f"\nFailed (latest {len(failures)}):")
+        for row in failures:
+            print(f"  {row['key']:<50} x{row['attempts']}  {row['error']}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Distributed pipeline runner: seed a shared job queue, run workers."
+    )
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p_seed = sub.add_parser("seed", help="Create / extend the queue from a projects root")
+    p_seed.add_argument("--projects-root", type=Path, required=True)
+    p_seed.add_argument("--output-root", type=Path, required=True)
+    p_seed.add_argument("--queue", type=Path, default=None,
+                        help=f"SQLite queue (default: <output-root>/{QUEUE_NAME})")
+    p_seed.add_argument("--modes", nargs="+", default=list(DEFAULT_MOCKTAIL_MODES))
+    p_seed.add_argument("--model", default="llama3.1")
+    p_seed.add_argument("--overwrite-llm", action="store_true")
+    p_seed.add_argument("--skip-static", action="store_true",
+                        help="Start at BR/index (static outputs already exist)")
+    p_seed.add_argument("--max-attempts", type=int, default=3)
+    p_seed.add_argument("--journal", type=Path, default=None,
+                        help=f"Checkpoint journal (default: <output-root>/{JOURNAL_NAME})")
+    p_seed.add_argument("--no-journal", action="store_true")
+
+    for name, help_text in (("worker", "Claim and run jobs until the queue is drained"),
+                            ("local", "Start several workers on this machine")):
+        p = sub.add_parser(name, help=help_text)
+        p.add_argument("--queue", type=Path, required=True)
+        p.add_argument("--kinds", nargs="+", choices=JOB_KINDS, default=None,
+                       help="Only claim these job kinds (e.g. rule file on GPU hosts)")
+        p.add_argument("--lease", type=float, default=DEFAULT_LEASE,
+                       help="Seconds a job stays claimed without a heartbeat")
+        p.add_argument("--trace", type=Path, default=None)
+        p.add_argument("--trace-format", choices=TRACE_FORMATS, default="jsonl")
+        if name == "worker":
+            p.add_argument("--id", default=None, help="Worker id (default: host:pid)")
+            p.add_argument("--keep-alive", action="store_true",
+                           help="Keep polling after the queue is drained")
+        else:
+            p.add_argument("--workers", type=int, default=4)
+
+    p_status = sub.add_parser("status", help="Job counts, running jobs, failures")
+    p_status.add_argument("--queue", type=Path, required=True)
+
+    p_requeue = sub.add_parser("requeue", help="Retry failed jobs")
+    p_requeue.add_argument("--queue", type=Path, required=True)
+    p_requeue.add_argument("--failed", action="store_true", required=True)
+    p_requeue.add_argument("--kinds", nargs="+", choices=JOB_KINDS, default=None)
+
+    args = parser.parse_args(argv)
+
+    if args.cmd == "seed":
+        queue = JobQueue(args.queue or args.output_root / QUEUE_NAME)
+        journal = None if args.no_journal else (args.journal or args.output_root / JOURNAL_NAME)
+        cfg = RunConfig(args.projects_root, args.output_root, args.modes, args.model,
+                        args.overwrite_llm, journal, args.max_attempts)
+        seed(queue, cfg, args.skip_static)
+        print(f"[SEED] Queue: {queue.path}")
+        return 0
+
+    if not args.queue.is_file():
+        print(f"[QUEUE] {args.queue} does not exist (run `seed` first)")
+        return 1
+    queue = JobQueue(args.queue)
+
+    if args.cmd == "status":
+        print_status(queue)
+        return 0
+
+    if args.cmd == "requeue":
+        n = queue.requeue_failed(args.kinds)
+        print(f"[QUEUE] {n} failed job(s) re-queued")
+        return 0
+
+    if args.trace is not None:
+        enable_tracing(args.trace, args.trace_format)
+
+    if args.cmd == "worker":
+        Worker(queue, args.id or default_worker_id(), args.kinds, args.lease).run(
+            exit_when_idle=not args.keep_alive
+        )
+        return 0
+
+    # local: N worker processes sharing the queue
+    base = [sys.executable, __file__, "worker", "--queue", str(args.queue),
+            "--lease", str(args.lease)]
+    if args.kinds:
+        base += ["--kinds", *args.kinds]
+    procs = [subprocess.Popen(base + ["--id", f"{default_worker_id()}.{i}"])
+             for i in range(args.workers)]
+    codes = [proc.wait() for proc in procs]
+    print()
+    print_status(queue)
+    return max(codes)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
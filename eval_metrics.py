@@ -0,0 +1,194 @@
+# eval_metrics.py
+"""
+Corpus-level lexical metrics for file-level summaries (ROUGE-1/2/L, BLEU).
+
+All (prediction, reference) pairs are tokenised once into integer ids over a
+shared vocabulary. N-gram counts are held as sparse (pairs x n-gram vocab)
+matrices, so clipped overlaps for the whole corpus are one element-wise
+minimum + row sum per n. ROUGE-L uses a bit-parallel LCS over the same
+integer ids (one big-int mask per reference token), which avoids building an
+O(len(pred) * len(ref)) DP table per pair.
+
+Usage:
+    from eval_metrics import score_corpus
+
+    scores = score_corpus(preds, refs)
+    scores["rouge1_f1"]   # numpy array, one score per pair
+
+Tokenisation is the same as the old per-file `rouge1_f1` helper
+(lower-case + whitespace split), and `rouge1_f1` here returns exactly the
+same value as that helper did.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, List, Sequence
+
+import numpy as np
+from scipy import sparse
+
+METRIC_NAMES = ("rouge1_f1", "rouge2_f1", "rougeL_f1", "bleu")
+BLEU_MAX_N = 4
+
+
+# ---------------------------------------------------------------------------
+# Tokenisation / vocabulary
+# ---------------------------------------------------------------------------
+
+def _tokens(text: str) -> List[str]:
+    return [t for t in text.lower().split() if t]
+
+
+def _encode(texts: Sequence[str], vocab: Dict[str, int]) -> List[List[int]]:
+    setdefault = vocab.setdefault
+    return [[setdefault(tok, len(vocab)) for tok in _tokens(text)] for text in texts]
+
+
+def _clipped_overlaps(
+    pred_ids: List[List[int]],
+    ref_ids: List[List[int]],
+    vocab_size: int,
+    max_n: int,
+) -> Dict[int, np.ndarray]:
+    """
+    Clipped n-gram overlap per pair, for n = 1..max_n.
+
+    Predictions and references are flattened into one id array. The n-gram
+    id of the window starting at position i is derived from its (n-1)-gram
+    id and the next token via np.unique, so n-gram vocabularies are built
+    without any per-token Python work. Windows that cross a document
+    boundary are dropped.
+    """
+    n_pairs = len(pred_ids)
+    docs = pred_ids + ref_ids
+    lengths = np.array([len(d) for d in docs], dtype=np.int64)
+    flat = np.fromiter((t for d in docs for t in d), dtype=np.int64, count=int(lengths.sum()))
+    doc_of = np.repeat(np.arange(len(docs), dtype=np.int64), lengths)
+
+    overlaps: Dict[int, np.ndarray] = {}
+    gram = flat.copy()            # id of the n-gram starting at each position (-1: none)
+    n_grams = vocab_size
+    for n in range(1, max_n + 1):
+        if n > 1:
+            starts = np.arange(max(len(flat) - n + 1, 0))
+            valid = (gram[starts] >= 0) & (doc_of[starts] == doc_of[starts + n - 1])
+            starts = starts[valid]
+            keys = gram[starts] * vocab_size + flat[starts + n - 1]
+            uniq, inverse = np.unique(keys, return_inverse=True)
+            gram = np.full(len(flat), -1, dtype=np.int64)
+            gram[starts] = inverse
+            n_grams = len(uniq)
+
+        has = gram >= 0
+        rows = doc_of[has]
+        cols = gram[has]
+        is_pred = rows < n_pairs
+        shape = (n_pairs, max(n_grams, 1))
+
+        # Duplicate (row, col) entries are summed on conversion -> n-gram counts.
+        pred_m = sparse.csr_matrix(
+            (np.ones(int(is_pred.sum()), dtype=np.int64), (rows[is_pred], cols[is_pred])),
+            shape=shape,
+        )
+        ref_m = sparse.csr_matrix(
+            (np.ones(int((~is_pred).sum()), dtype=np.int64),
+             (rows[~is_pred] - n_pairs, cols[~is_pred])),
+            shape=shape,
+        )
+        overlaps[n] = np.asarray(pred_m.minimum(ref_m).sum(axis=1)).ravel().astype(np.float64)
+
+    return overlaps
+
+
+# ---------------------------------------------------------------------------
+# Metric kernels
+# ---------------------------------------------------------------------------
+
+def _f1(overlap: np.ndarray, pred_len: np.ndarray, ref_len: np.ndarray) -> np.ndarray:
+    f1 = np.zeros_like(overlap)
+    ok = (pred_len > 0) & (ref_len > 0)
+    precision = np.divide(overlap, pred_len, out=np.zeros_like(overlap), where=ok)
+    recall = np.divide(overlap, ref_len, out=np.zeros_like(overlap), where=ok)
+    denom = precision + recall
+    nz = ok & (denom > 0)
+    f1[nz] = 2 * precision[nz] * recall[nz] / denom[nz]
+    return f1
+
+
+def _lcs_length(pred: List[int], ref: List[int]) -> int:
+    """Bit-parallel LCS length (Hyyrö 2004) over integer token ids."""
+    m = len(ref)
+    if not pred or not m:
+        return 0
+    masks: Dict[int, int] = {}
+    for i, tok in enumerate(ref):
+        masks[tok] = masks.get(tok, 0) | (1 << i)
+    full = (1 << m) - 1
+    v = full
+    for tok in pred:
+        u = v & masks.get(tok, 0)
+        v = ((v + u) | (v - u)) & full
+    return m - bin(v).count("1")
+
+
+def score_corpus(
+    preds: Sequence[str],
+    refs: Sequence[str],
+) -> Dict[str, np.ndarray]:
+    """
+    Score every (preds[i], refs[i]) pair. Returns metric name -> array of
+    per-pair scores (see METRIC_NAMES).
+
+    BLEU is sentence-level BLEU-4 with add-one smoothing on the 2..4-gram
+    precisions (Lin & Och, 2004), so short summaries do not collapse to 0.
+    """
+    if len(preds) != len(refs):
+        raise ValueError(f"preds/refs length mismatch: {len(preds)} != {len(refs)}")
+
+    n_pairs = len(preds)
+    if n_pairs == 0:
+        return {name: np.zeros(0) for name in METRIC_NAMES}
+
+    vocab: Dict[str, int] = {}
+    pred_ids = _encode(preds, vocab)
+    ref_ids = _encode(refs, vocab)
+
+    pred_len = np.array([len(x) for x in pred_ids], dtype=np.float64)
+    ref_len = np.array([len(x) for x in ref_ids], dtype=np.float64)
+
+    overlaps = _clipped_overlaps(pred_ids, ref_ids, len(vocab), BLEU_MAX_N)
+
+    def _n_total(lengths: np.ndarray, n: int) -> np.ndarray:
+        return np.maximum(lengths - (n - 1), 0)
+
+    scores: Dict[str, np.ndarray] = {
+        "rouge1_f1": _f1(overlaps[1], pred_len, ref_len),
+        "rouge2_f1": _f1(overlaps[2], _n_total(pred_len, 2), _n_total(ref_len, 2)),
+    }
+
+    lcs = np.array(
+        [_lcs_length(p, r) for p, r in zip(pred_ids, ref_ids)], dtype=np.float64
+    )
+    scores["rougeL_f1"] = _f1(lcs, pred_len, ref_len)
+
+    log_p = np.zeros(n_pairs)
+    for n in range(1, BLEU_MAX_N + 1):
+        smooth = 0.0 if n == 1 else 1.0
+        num = overlaps[n] + smooth
+        den = _n_total(pred_len, n) + smooth
+        with np.errstate(divide="ignore", invalid="ignore"):
+            log_p += np.log(np.where(den > 0, num / np.where(den > 0, den, 1), 0.0))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        brevity = np.where(
+            pred_len >= ref_len, 1.0, np.exp(1.0 - ref_len / np.where(pred_len > 0, pred_len, 1))
+        )
+        bleu = brevity * np.exp(log_p / BLEU_MAX_N)
+    bleu[(pred_len == 0) | (ref_len == 0) | (overlaps[1] == 0)] = 0.0
+    scores["bleu"] = np.nan_to_num(bleu)
+
+    return scores
+
+
+def rouge1_f1(pred: str, ref: str) -> float:
+    """Single-pair ROUGE-1 F1 (thin wrapper over score_corpus)."""
+    return float(score_corpus([pred], [ref])["rouge1_f1"][0])
@@ -8,11 +8,16 @@ This module contains functions used by flask server to extract business rules,
 convert json to dot format, and generating graph file
 """
 
+import os
+import shutil
 import sys
+import tempfile
 from pathlib import Path
 
 from preprocessor import preprocess
 from ParsingUnit.main import extractor
+from profiling import add_profile_argument, profiled, set_profile_modes
+from tracing import span
 
 # -------------------------------------------------------------------
 # Ensure RBB modules (IRBuilder, CFGBuilder) are importable
@@ -64,6 +69,26 @@ def _fallback_make_clean_output(src_path: Path, clean_path: Path) -> None:
 
 
 def extract_business_rules(file_path: Path):
+    """
+    Traced entry point; see _extract_business_rules.
+    """
+    # The preprocessed source is private to this run (not ./clean_output.cbl),
+    # so several extractor.py processes can share a working directory.
+    fd, tmp = tempfile.mkstemp(prefix="clean_{}_".format(Path(file_path).stem),
+                               suffix=".cbl", dir=".")
+    os.close(fd)
+    clean_output = Path(tmp)
+    try:
+        with span("program", prog=Path(file_path).stem, source=str(file_path)) as sp:
+            result = _extract_business_rules(file_path, clean_output)
+            if result is None:
+                sp.fail("static extraction failed")
+            return result
+    finally:
+        clean_output.unlink(missing_ok=True)
+
+
+def _extract_business_rules(file_path: Path, clean_output: Path):
     """
     Main entry point: preprocess COBOL, run the parser/IR/CFG/BR extraction
     and print locations of generated artefacts.
@@ -80,19 +105,27 @@ def extract_business_rules(file_path: Path):
         return None
 
     file_name = file_path.stem
-    clean_output = Path("clean_output.cbl")
 
     print("STAGE: Parsing stage intialised.")
 
     # --------------------------
     # 1. Preprocess with fallback
     # --------------------------
+    # A batch run may already have preprocessed this program
+    # (preprocessor.preprocess_batch); reuse that instead of running cobc again.
+    batch_dir = os.environ.get("COBREX_PREPROCESSED_DIR")
+    batch_output = Path(batch_dir) / "{}.cbl".format(file_name) if batch_dir else None
+
     try:
-        # Your existing preprocessor – may fail when SQLCA copybook is missing
-        preprocess(str(file_path))
-        if not clean_output.exists():
-            # Some preprocessor versions write `output.i` then copy; be defensive
-            raise FileNotFoundError("clean_output.cbl was not created by preprocess()")
+        with span("preprocess", batch=batch_output is not None and batch_output.exists()):
+            if batch_output is not None and batch_output.exists():
+                shutil.copyfile(batch_output, clean_output)
+            else:
+                # Your existing preprocessor – may fail when SQLCA copybook is missing
+                preprocess(str(file_path), str(clean_output))
+            if not clean_output.stat().st_size:
+                # Some preprocessor versions write `output.i` then copy; be defensive
+                raise FileNotFoundError("{} was not written by preprocess()".format(clean_output))
     except Exception as e:
         # This is where your current run dies on SQLCA/output.i.
         print("WARNING: Preprocessing failed, using fallback sanitization.")
@@ -115,12 +148,14 @@ def extract_business_rules(file_path: Path):
     try:
         # This is directly from your existing code pattern:
         #   extractor(preprocessed_file_path, file_name, file_path, 'output')
-        cfg_json, cyclomatic_complexity = extractor(
-            str(preprocessed_file_path),  # preprocessed COBOL
-            file_name,                    # program name
-            str(file_path),               # original path
-            "output",                     # root output folder
-        )
+        with span("parse") as sp:
+            cfg_json, cyclomatic_complexity = extractor(
+                str(preprocessed_file_path),  # preprocessed COBOL
+                file_name,                    # program name
+                str(file_path),               # original path
+                "output",                     # root output folder
+            )
+            sp.count(cyclomatic_complexity=cyclomatic_complexity)
     except Exception as e:
         print("ERROR: Parsing stage Failed.")
         print("Cause of error:", repr(e))
@@ -165,7 +200,8 @@ def extract_business_rules(file_path: Path):
 
     try:
         # If graphBuilder fails, we just log and move on.
-        graphBuilder(file_name)
+        with span("cfg_graph"):
+            graphBuilder(file_name)
     except Exception as e:
         print("WARNING: CFG / graph building failed.")
         print("Cause of error:", repr(e))
@@ -207,15 +243,23 @@ def extract_business_rules(file_path: Path):
 
 
 if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        print("ERROR: File path not specified.")
-        print("Supported Format :: python3 extractor.py <input-file-path>")
-        sys.exit(1)
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        usage="python3 extractor.py <input-file-path> [--profile [MODES]]",
+        description="COBREX static extraction for one COBOL program.",
+    )
+    parser.add_argument("file_path", type=Path, help="COBOL source file")
+    add_profile_argument(parser)
+    args = parser.parse_args()
+    set_profile_modes(args.profile)
 
-    file_path = Path(sys.argv[1])
+    file_path = args.file_path
 
     if not file_path.exists():
         print("ERROR: File does not exists!")
         sys.exit(1)
 
-    extract_business_rules(file_path)
+    # profiles land next to the program's other artefacts
+    with profiled(Path("output") / "COBOL_{}".format(file_path.stem), "extractor"):
+        extract_business_rules(file_path)
@@ -0,0 +1,416 @@
+#!/usr/bin/env python3
+"""
+Synthetic COBOL programs and matching COBREX CFGs for scaling benchmarks.
+
+The Benchmarksuite/ programs are far too small for quadratic behaviour
+(postdominators, reaching definitions, paragraph assignment, the BRR walks)
+to show. This generator writes programs of any size. For every requested
+size it emits both
+
+  <out-dir>/SYN<SIZE>.cbl           fixed-format COBOL source
+  <out-dir>/CFG_SYN<SIZE>.json      COBREX CFG of that source
+
+so the pipeline can start from the source (cobc + parser) or skip straight
+to the CFG (run_benchmarks.py starts CFG inputs at the RBB stage). The CFG
+uses the node tags and edge labels the RBB / BRR stages act on:
+
+  if            -> "true" / "false" branches joined at an end-if node
+  evaluate      -> "when" edges to one when node per branch, joined at end-evaluate
+  perform until -> "iteration" edge into the body, body loops back to the perform
+  perform PARA  -> "procedure call" edge to the paragraph, which returns to the perform
+
+Knobs (all deterministic for a given --seed):
+
+  --statements     CFG nodes per program, e.g. 1k 10k 100k (one program each)
+  --paragraphs     paragraphs besides MAIN-PARA (default: statements / 200)
+  --max-depth      maximum nesting of IF / EVALUATE / PERFORM blocks
+  --branch-rate    share of statements that open a nested block
+  --loop-rate      share of those blocks that are PERFORM UNTIL loops
+  --evaluate-rate  share of the remaining blocks that are EVALUATEs (rest: IF)
+  --evaluate-fanout  WHEN branches per EVALUATE (plus WHEN OTHER)
+  --variables      size of the shared variable pool (smaller = more reuse)
+  --nested-loops   allow PERFORM UNTIL inside another loop body; off by
+                   default because BR_Realisation's perform_loop_merge fails
+                   on such loops
+
+Usage:
+
+    python gen_synthetic_inputs.py --statements 1k 10k 100k --out-dir output/synthetic
+    python run_benchmarks.py output/synthetic/CFG_SYN*.json --render off --scaling
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+
+DEFAULT_OUT_DIR = Path("output") / "synthetic"
+
+# columns 8-72 of a fixed-format line
+INDENT = " " * 7
+MAX_INDENT = 28
+
+
+def parse_size(token: str) -> int:
+    """'1k' -> 1000, '2.5k' -> 2500, '1m' -> 1000000, '300' -> 300."""
+    t = token.strip().lower()
+    scale = 1
+    if t.endswith("k"):
+        scale, t = 1000, t[:-1]
+    elif t.endswith("m"):
+        scale, t = 1000000, t[:-1]
+    value = int(float(t) * scale)
+    if value < 10:
+        raise argparse.ArgumentTypeError(f"need at least 10 statements, got {token!r}")
+    return value
+
+
+def size_label(n: int) -> str:
+    if n % 1000000 == 0:
+        return f"{n // 1000000}M"
+    if n % 1000 == 0:
+        return f"{n // 1000}K"
+    return str(n)
+
+
+class SynthConfig:
+    def __init__(self, statements: int, paragraphs: Optional[int] = None,
+                 max_depth: int = 3, branch_rate: float = 0.15,
+                 loop_rate: float = 0.25, evaluate_rate: float = 0.3,
+                 evaluate_fanout: int = 3, variables: int = 50,
+                 nested_loops: bool = False, seed: int = 0):
+        self.statements = statements
+        self.paragraphs = statements // 200 if paragraphs is None else paragraphs
+        self.max_depth = max_depth
+        self.branch_rate = branch_rate
+        self.loop_rate = loop_rate
+        self.evaluate_rate = evaluate_rate
+        self.evaluate_fanout = max(1, evaluate_fanout)
+        self.variables = max(2, variables)
+        self.nested_loops = nested_loops
+        self.seed = seed
+
+
+# ---------------------------------------------------------------------------
+# 1. Program structure
+#
+# A block is a list of items:
+#   ("stmt", tag, text, source_vars, target_vars)
+#   ("if", cond_vars, text, then_block, else_block)
+#   ("eval", var, [when_block, ...])          last block is WHEN OTHER
+#   ("loop", counter, limit, body_block)
+#   ("call", paragraph_index)
+# Every item costs the CFG nodes it will emit, so budgets are node counts.
+# ---------------------------------------------------------------------------
+
+class ProgramShape:
+    def __init__(self, cfg: SynthConfig):
+        self.cfg = cfg
+        self.rng = random.Random(cfg.seed)
+        self.vars = [f"WS-V{i:05d}" for i in range(cfg.variables)]
+        self.loop_counters: List[str] = []
+
+    def _var(self) -> str:
+        return self.rng.choice(self.vars)
+
+    def _simple(self) -> tuple:
+        a, b = self._var(), self._var()
+        kind = self.rng.randrange(5)
+        if kind == 0:
+            return ("stmt", "move", f"MOVE {a} TO {b}", [a], [b])
+        if kind == 1:
+            lit = self.rng.randrange(1, 1000)
+            return ("stmt", "move", f"MOVE {lit} TO {b}", [], [b])
+        if kind == 2:
+            return ("stmt", "add", f"ADD {a} TO {b}", [a], [b])
+        if kind == 3:
+            c = self._var()
+            return ("stmt", "compute", f"COMPUTE {c} = {a} + {b}", [a, b], [c])
+        return ("stmt", "display", f"DISPLAY {a}", [], [a])
+
+    def block(self, budget: int, depth: int, in_loop: bool = False) -> List[tuple]:
+        """Items costing about `budget` CFG nodes, nested at most max_depth deep."""
+        items: List[tuple] = []
+        cfg, rng = self.cfg, self.rng
+        while budget > 0:
+            nest = (
+                depth < cfg.max_depth
+                and budget >= 4
+                and rng.random() < cfg.branch_rate
+            )
+            if not nest:
+                items.append(self._simple())
+                budget -= 1
+                continue
+
+            # a nested block gets a random share of what is left
+            inner = rng.randint(2, max(2, min(budget - 2, budget // 2 + 2)))
+            r = rng.random()
+            if r < cfg.loop_rate and in_loop and not cfg.nested_loops:
+                # draw again from the non-loop kinds
+                r = cfg.loop_rate + rng.random() * (1 - cfg.loop_rate)
+            if r < cfg.loop_rate:
+                counter = f"WS-I{len(self.loop_counters):05d}"
+                self.loop_counters.append(counter)
+                body = self.block(inner - 1, depth + 1, True)
+                body.append(("stmt", "add", f"ADD 1 TO {counter}", [], [counter]))
+                items.append(("loop", counter, rng.randrange(2, 50), body))
+                budget -= inner + 1
+            elif r < cfg.loop_rate + (1 - cfg.loop_rate) * cfg.evaluate_rate:
+                fanout = cfg.evaluate_fanout + 1
+                per_when = max(1, (inner - 2 - fanout) // fanout)
+                whens = [self.block(per_when, depth + 1, in_loop) for _ in range(fanout)]
+                items.append(("eval", self._var(), whens))
+                budget -= 2 + fanout * (1 + per_when)
+            else:
+                a, b = self._var(), self._var()
+                op = rng.choice([">", "<", "=", "NOT ="])
+                then_budget = max(1, (inner - 2) // 2)
+                else_budget = inner - 2 - then_budget if rng.random() < 0.6 else 0
+                items.append((
+                    "if", [a, b], f"IF {a} {op} {b}",
+                    self.block(then_budget, depth + 1, in_loop),
+                    self.block(else_budget, depth + 1, in_loop),
+                ))
+                budget -= 2 + then_budget + else_budget
+        return items
+
+    def build(self) -> Tuple[List[tuple], List[List[tuple]]]:
+        """MAIN-PARA's block (with one PERFORM per paragraph) and the paragraph blocks."""
+        cfg = self.cfg
+        n_para = cfg.paragraphs
+        # start, main paragraph header, stop run, and per paragraph: header + its perform
+        fixed = 3 + 2 * n_para
+        body_budget = max(n_para + 1, cfg.statements - fixed)
+        main_budget = max(1, body_budget // (n_para + 1))
+        para_budget = max(1, (body_budget - main_budget) // n_para) if n_para else 0
+
+        main = self.block(main_budget, 0)
+        paras = [self.block(para_budget, 0) for _ in range(n_para)]
+        for i in range(n_para):
+            main.insert(self.rng.randrange(len(main) + 1), ("call", i))
+        return main, paras
+
+
+# ---------------------------------------------------------------------------
+# 2. COBOL text + COBREX CFG emission
+# ---------------------------------------------------------------------------
+
+class Emitter:
+    def __init__(self, prog: str):
+        self.prog = prog
+        self.lines: List[str] = []
+        self.nodes: List[dict] = []
+        self.edges: List[dict] = []
+        self.calls: List[Tuple[str, int]] = []
+
+    def line(self, text: str, depth: int = 0) -> int:
+        pad = min(4 + 3 * depth, MAX_INDENT)
+        self.lines.append(INDENT + " " * pad + text)
+        return len(self.lines)
+
+    def node(self, tag: str, text: str, line: int, src=(), tgt=(), cond=()) -> str:
+        uid = f"{self.prog}_{len(self.nodes)}"
+        self.nodes.append({
+            "id": uid,
+            "name": tag,
+            "entityType": "Statement",
+            "properties": {
+                "uniqueId": uid,
+                "stmtText": text,
+                "tag": tag,
+                "stmtStartLineNumber": line,
+                "stmtEndLineNumber": line,
+                "source_variables": list(src),
+                "target_variables": list(tgt),
+                "conditional_variables": list(cond),
+            },
+        })
+        return uid
+
+    def edge(self, src: str, dst: str, label: str = "") -> None:
+        self.edges.append({"sourceUniqueId": src, "targetUniqueId": dst, "label": label})
+
+    def connect(self, exits: List[Tuple[str, str]], dst: str) -> None:
+        for src, label in exits:
+            self.edge(src, dst, label)
+
+    def block(self, items: List[tuple], depth: int,
+              exits: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+        """Emit items after `exits`; returns the exits dangling after the block."""
+        for item in items:
+            exits = self.item(item, depth, exits)
+        return exits
+
+    def item(self, item: tuple, depth: int,
+             exits: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+        kind = item[0]
+        if kind == "stmt":
+            _, tag, text, src, tgt = item
+            uid = self.node(tag, text, self.line(text, depth), src, tgt)
+            self.connect(exits, uid)
+            return [(uid, "")]
+
+        if kind == "if":
+            _, cond, text, then_items, else_items = item
+            uid = self.node("if", text, self.line(text, depth), cond=cond)
+            self.connect(exits, uid)
+            out = self.block(then_items, depth + 1, [(uid, "true")])
+            if else_items:
+                self.line("ELSE", depth)
+                out += self.block(else_items, depth + 1, [(uid, "false")])
+            else:
+                out.append((uid, "false"))
+            end = self.node("end-if", "END-IF", self.line("END-IF", depth))
+            self.connect(out, end)
+            return [(end, "")]
+
+        if kind == "eval":
+            _, var, whens = item
+            text = f"EVALUATE {var}"
+            uid = self.node("evaluate", text, self.line(text, depth), cond=[var])
+            self.connect(exits, uid)
+            out: List[Tuple[str, str]] = []
+            for i, when_items in enumerate(whens):
+                wtext = "WHEN OTHER" if i == len(whens) - 1 else f"WHEN {i + 1}"
+                wid = self.node("when", wtext, self.line(wtext, depth + 1), cond=[var])
+                self.edge(uid, wid, "when")
+                out += self.block(when_items, depth + 2, [(wid, "")])
+            end = self.node("end-evaluate", "END-EVALUATE", self.line("END-EVALUATE", depth))
+            self.connect(out, end)
+            return [(end, "")]
+
+        if kind == "loop":
+            _, counter, limit, body = item
+            text = f"PERFORM UNTIL {counter} > {limit}"
+            uid = self.node("perform", text, self.line(text, depth), cond=[counter])
+            self.connect(exits, uid)
+            # the iteration edge first: the BRR perform checks look at children[0]
+            body_exits = self.block(body, depth + 1, [(uid, "iteration")])
+            self.connect(body_exits, uid)
+            self.line("END-PERFORM", depth)
+            return [(uid, "")]
+
+        if kind == "call":
+            _, para = item
+            text = f"PERFORM PARA-{para:05d}"
+            uid = self.node("perform", text, self.line(text, depth))
+            self.connect(exits, uid)
+            self.calls.append((uid, para))
+            return [(uid, "")]
+
+        raise ValueError(f"unknown item {kind!r}")
+
+    def program(self, main: List[tuple], paras: List[List[tuple]], shape: ProgramShape) -> None:
+        self.lines += [
+            INDENT + "IDENTIFICATION DIVISION.",
+            INDENT + f"PROGRAM-ID. {self.prog}.",
+            INDENT + "DATA DIVISION.",
+            INDENT + "WORKING-STORAGE SECTION.",
+        ]
+        for name in shape.vars + shape.loop_counters:
+            self.lines.append(INDENT + f"01 {name} PIC S9(9) VALUE 0.")
+        proc_line = len(self.lines) + 1
+        self.lines.append(INDENT + "PROCEDURE DIVISION.")
+
+        start = self.node("start", "START", proc_line)
+        head_line = len(self.lines) + 1
+        self.lines.append(INDENT + "MAIN-PARA.")
+        head = self.node("paragraphName", "MAIN-PARA.", head_line)
+        self.edge(start, head)
+        exits = self.block(main, 0, [(head, "")])
+        stop = self.node("stop", "STOP RUN", self.line("STOP RUN."))
+        self.connect(exits, stop)
+
+        heads = []
+        tails = []
+        for i, items in enumerate(paras):
+            name = f"PARA-{i:05d}."
+            line = len(self.lines) + 1
+            self.lines.append(INDENT + name)
+            pid = self.node("paragraphName", name, line)
+            heads.append(pid)
+            tails.append(self.block(items, 0, [(pid, "")]))
+            self.lines[-1] += "."
+
+        # fall-through edges of the PERFORMs were added while emitting MAIN-PARA,
+        # so "procedure call" is each perform's second child, where the BRR
+        # perform check looks for it
+        for perform, para in self.calls:
+            self.edge(perform, heads[para], "procedure call")
+            self.connect(tails[para], perform)
+
+    def source(self) -> str:
+        return "\n".join(self.lines) + "\n"
+
+    def cfg_json(self) -> dict:
+        return {"nodes": self.nodes, "edges": self.edges}
+
+
+def generate(prog: str, cfg: SynthConfig) -> Tuple[str, dict]:
+    """(COBOL source, COBREX CFG dict) for one synthetic program."""
+    shape = ProgramShape(cfg)
+    main, paras = shape.build()
+    em = Emitter(prog)
+    em.program(main, paras, shape)
+    return em.source(), em.cfg_json()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Generate synthetic COBOL sources and COBREX CFG JSONs."
+    )
+    parser.add_argument("--statements", nargs="+", type=parse_size,
+                        default=[parse_size(s) for s in ("1k", "10k", "100k")],
+                        help="Program sizes in CFG nodes, e.g. 1k 10k 100k (default)")
+    parser.add_argument("--out-dir", type=Path, default=DEFAULT_OUT_DIR,
+                        help=f"Output directory (default: {DEFAULT_OUT_DIR})")
+    parser.add_argument("--prefix", default="SYN",
+                        help="Program name prefix; the size is appended (default: SYN)")
+    parser.add_argument("--paragraphs", type=int, default=None,
+                        help="Paragraphs besides MAIN-PARA (default: statements / 200)")
+    parser.add_argument("--max-depth", type=int, default=3,
+                        help="Maximum nesting depth of IF/EVALUATE/PERFORM (default: 3)")
+    parser.add_argument("--branch-rate", type=float, default=0.15,
+                        help="Share of statements that open a nested block (default: 0.15)")
+    parser.add_argument("--loop-rate", type=float, default=0.25,
+                        help="Share of nested blocks that are PERFORM UNTIL loops (default: 0.25)")
+    parser.add_argument("--evaluate-rate", type=float, default=0.3,
+                        help="Share of non-loop blocks that are EVALUATEs (default: 0.3)")
+    parser.add_argument("--evaluate-fanout", type=int, default=3,
+                        help="WHEN branches per EVALUATE, plus WHEN OTHER (default: 3)")
+    parser.add_argument("--variables", type=int, default=50,
+                        help="Shared variable pool size (default: 50)")
+    parser.add_argument("--nested-loops", action="store_true",
+                        help="Allow PERFORM UNTIL loops inside loop bodies")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (default: 0)")
+    parser.add_argument("--no-source", action="store_true",
+                        help="Only write the CFG JSONs")
+    args = parser.parse_args(argv)
+
+    args.out_dir.mkdir(parents=True, exist_ok=True)
+    for n in args.statements:
+        prog = f"{args.prefix}{size_label(n)}"
+        cfg = SynthConfig(
+            n, paragraphs=args.paragraphs, max_depth=args.max_depth,
+            branch_rate=args.branch_rate, loop_rate=args.loop_rate,
+            evaluate_rate=args.evaluate_rate, evaluate_fanout=args.evaluate_fanout,
+            variables=args.variables, nested_loops=args.nested_loops,
+            seed=args.seed,
+        )
+        source, cfg_json = generate(prog, cfg)
+        cfg_path = args.out_dir / f"CFG_{prog}.json"
+        cfg_path.write_text(json.dumps(cfg_json))
+        if not args.no_source:
+            (args.out_dir / f"{prog}.cbl").write_text(source)
+        print(f"[SYNTH] {prog}: {len(cfg_json['nodes'])} nodes, "
+              f"{len(cfg_json['edges'])} edges, {source.count(chr(10))} lines -> {cfg_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,169 @@
+#!/usr/bin/env python
+"""
+Rendering policy for every Graphviz graph the static stages write
+(RBB, sub-rules, rules, BRR, DFG, PDG).
+
+The policy is read from the COBREX_RENDER environment variable, so it also
+reaches extractor.py / build_dfg.py / build_pdg.py when they run as
+subprocesses:
+
+  pdf       render the PDF right away (default; what the stages always did)
+  dot       write the DOT source only, never run `dot`
+  deferred  write the DOT source and queue the PDF; the queue is rendered
+            later by a process pool (`python graph_render.py`)
+  off       build and write no graphs at all (the BR stage reads
+            Rules/RULES_<prog>.json, not the rule DOT sources)
+
+Deferred jobs are appended as JSON lines to COBREX_RENDER_QUEUE
+(default: output/render_queue.jsonl). Each line is written with a single
+append, so several extractor processes can share one queue.
+
+Usage:
+
+    COBREX_RENDER=deferred python run_all_projects_static.py
+    python graph_render.py --workers 8          # render the queued PDFs
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List
+
+RENDER_MODES = ("pdf", "dot", "deferred", "off")
+DEFAULT_RENDER_MODE = "pdf"
+DEFAULT_QUEUE = Path("output") / "render_queue.jsonl"
+
+
+def render_mode() -> str:
+    mode = os.environ.get("COBREX_RENDER", DEFAULT_RENDER_MODE).strip().lower()
+    if mode not in RENDER_MODES:
+        print(f"[RENDER][WARN] Unknown COBREX_RENDER={mode!r}, using {DEFAULT_RENDER_MODE!r}")
+        return DEFAULT_RENDER_MODE
+    return mode
+
+
+def set_render_mode(mode: str) -> None:
+    """Select the policy for this process and every subprocess it starts."""
+    if mode not in RENDER_MODES:
+        raise ValueError(f"render mode must be one of {RENDER_MODES}, got {mode!r}")
+    os.environ["COBREX_RENDER"] = mode
+
+
+def queue_path() -> Path:
+    return Path(os.environ.get("COBREX_RENDER_QUEUE", str(DEFAULT_QUEUE)))
+
+
+def wants_graph() -> bool:
+    """Whether a stage should build its graph at all."""
+    return render_mode() != "off"
+
+
+def render(graph, path: str) -> None:
+    """
+    Write `graph` (a graphviz Digraph) to `path` according to the policy.
+    In "pdf" mode this is exactly graph.render(path).
+    """
+    mode = render_mode()
+    if mode == "pdf":
+        graph.render(path)
+    elif mode == "off":
+        return
+    else:
+        source = graph.save(path)
+        if mode == "deferred":
+            _enqueue(
+                {
+                    "source": str(Path(source).resolve()),
+                    "format": graph.format,
+                    "engine": graph.engine,
+                }
+            )
+
+
+def _enqueue(job: Dict[str, str], queue: Path | None = None) -> None:
+    queue = queue or queue_path()
+    queue.parent.mkdir(parents=True, exist_ok=True)
+    with queue.open("a", encoding="utf-8") as f:
+        f.write(json.dumps(job) + "\n")
+
+
+def _render_job(job: Dict[str, str]) -> str:
+    import graphviz
+
+    return graphviz.render(job["engine"], job["format"], job["source"])
+
+
+def drain_queue(queue: Path, workers: int = 4) -> int:
+    """
+    Render every queued job with a process pool. Returns the number of
+    failed jobs; those are put back on the queue, as are jobs appended
+    while draining.
+    """
+    if not queue.exists():
+        print(f"[RENDER] No render queue at {queue}")
+        return 0
+
+    # Take the current queue; later appends go to a fresh file.
+    taken = queue.with_name(queue.name + f".{os.getpid()}")
+    os.replace(queue, taken)
+
+    jobs: Dict[str, Dict[str, str]] = {}
+    with taken.open(encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                job = json.loads(line)
+                jobs[job["source"]] = job      # last request per source wins
+
+    pending: List[Dict[str, str]] = []
+    for job in jobs.values():
+        if Path(job["source"]).exists():
+            pending.append(job)
+        else:
+            print(f"[RENDER][WARN] DOT source vanished, skipping: {job['source']}")
+
+    print(f"[RENDER] Rendering {len(pending)} graphs with {workers} workers")
+    failed = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(_render_job, job): job for job in pending}
+        for fut in as_completed(futures):
+            try:
+                fut.result()
+            except Exception as e:
+                failed += 1
+                print(f"[RENDER][WARN] {futures[fut]['source']}: {e}")
+                _enqueue(futures[fut], queue)
+
+    taken.unlink()
+    print(f"[RENDER] Done ({failed} failed)")
+    return failed
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Render the Graphviz jobs queued by COBREX_RENDER=deferred."
+    )
+    parser.add_argument(
+        "--queue",
+        type=Path,
+        default=None,
+        help=f"Render queue (default: $COBREX_RENDER_QUEUE or {DEFAULT_QUEUE})",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 4,
+        help="Parallel `dot` processes (default: CPU count)",
+    )
+    args = parser.parse_args(argv)
+
+    failed = drain_queue(args.queue or queue_path(), workers=args.workers)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,355 @@
+"""
+SQLite job queue with leases, heartbeats and dependency counters.
+
+Workers on any number of processes or machines share one database file.
+Each worker claims the best ready job inside a BEGIN IMMEDIATE transaction,
+holds it under a lease that a heartbeat thread keeps extending, and then
+completes or fails it. Jobs whose lease expired (a worker died or lost its
+network share) go back to pending on the next claim, and failed jobs retry
+with backoff until max_attempts.
+
+A job may name a `parent` job and start `blocked` on N unfinished children:
+each child that finishes (done or finally failed) decrements its parent's
+counter, and the parent becomes claimable at zero. The pipeline uses this to
+start a program's file-level merge once its last rule summary lands.
+
+On a network filesystem, SQLite's locking is only as good as the share's
+fcntl locks; NFSv4 and most cluster filesystems are fine, but avoid WAL
+mode there (this module keeps SQLite's default rollback journal).
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id           INTEGER PRIMARY KEY,
+    key          TEXT NOT NULL UNIQUE,
+    kind         TEXT NOT NULL,
+    payload      TEXT NOT NULL,
+    priority     INTEGER NOT NULL DEFAULT 0,
+    state        TEXT NOT NULL DEFAULT 'pending',   -- pending / running / done / failed
+    blocked      INTEGER NOT NULL DEFAULT 0,        -- unfinished children
+    parent       TEXT,                              -- key of the job this one unblocks
+    attempts     INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 3,
+    not_before   REAL NOT NULL DEFAULT 0,
+    worker       TEXT,
+    lease_until  REAL,
+    heartbeat    REAL,
+    error        TEXT,
+    created      REAL NOT NULL,
+    started      REAL,
+    finished     REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (state, blocked, priority);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+DEFAULT_LEASE = 120.0
+RETRY_BACKOFF = 30.0
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+@dataclass
+class Job:
+    id: int
+    key: str
+    kind: str
+    payload: dict
+    attempts: int
+    max_attempts: int
+
+
+@dataclass
+class NewJob:
+    """A job to enqueue; `children` is how many jobs will name it as parent."""
+
+    key: str
+    kind: str
+    payload: dict
+    priority: int = 0
+    parent: Optional[str] = None
+    children: int = 0
+    max_attempts: int = 3
+
+
+class LeaseLost(RuntimeError):
+    """The job's lease expired and another worker may own it now."""
+
+
+class PermanentFailure(RuntimeError):
+    """Raised by a job handler when retrying cannot help (e.g. missing inputs)."""
+
+
+class JobQueue:
+    def __init__(self, path: Path, timeout: float = 60.0):
+        self.path = Path(path)
+        self.timeout = timeout
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as db:
+            db.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        # one short-lived connection per operation: safe across threads and forks
+        db = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+        db.row_factory = sqlite3.Row
+        return db
+
+    def _transaction(self):
+        return _Transaction(self._connect())
+
+    # -- configuration shared by all workers ---------------------------------
+
+    def set_meta(self, values: Dict[str, object]) -> None:
+        with self._transaction() as db:
+            db.executemany(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                [(k, json.dumps(v)) for k, v in values.items()],
+            )
+
+    def meta(self) -> Dict[str, object]:
+        with self._connect() as db:
+            return {row["key"]: json.loads(row["value"])
+                    for row in db.execute("SELECT key, value FROM meta")}
+
+    # -- producers -----------------------------------------------------------
+
+    def enqueue(self, jobs: Iterable[NewJob]) -> int:
+        """Insert jobs whose key is new; returns how many were added."""
+        with self._transaction() as db:
+            return self._insert(db, jobs)
+
+    @staticmethod
+    def _insert(db: sqlite3.Connection, jobs: Iterable[NewJob]) -> int:
+        now = time.time()
+        added = 0
+        for job in jobs:
+            cur = db.execute(
+                "INSERT OR IGNORE INTO jobs (key, kind, payload, priority, blocked, parent,"
+                " max_attempts, created) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job.key, job.kind, json.dumps(job.payload), job.priority, job.children,
+                 job.parent, job.max_attempts, now),
+            )
+            added += cur.rowcount
+        return added
+
+    # -- workers -------------------------------------------------------------
+
+    def claim(self, worker: str, kinds: Optional[Sequence[str]] = None,
+              lease: float = DEFAULT_LEASE) -> Optional[Job]:
+        """Take the highest-priority ready job (optionally of `kinds`), or None."""
+        now = time.time()
+        with self._transaction() as db:
+            self._expire_leases(db, now)
+            sql = ("SELECT * FROM jobs WHERE state = 'pending' AND blocked <= 0"
+                   " AND not_before <= ?")
+            params: List[object] = [now]
+            if kinds:
+                sql += f" AND kind IN ({', '.join('?' * len(kinds))})"
+                params += list(kinds)
+            row = db.execute(sql + " ORDER BY priority DESC, id LIMIT 1", params).fetchone()
+            if row is None:
+                return None
+            db.execute(
+                "UPDATE jobs SET state = 'running', worker = ?, attempts = attempts + 1,"
+                " lease_until = ?, heartbeat = ?, started = ? WHERE id = ?",
+                (worker, now + lease, now, now, row["id"]),
+            )
+        return Job(row["id"], row["key"], row["kind"], json.loads(row["payload"]),
+                   row["attempts"] + 1, row["max_attempts"])
+
+    def _expire_leases(self, db: sqlite3.Connection, now: float) -> None:
+        expired = db.execute(
+            "SELECT id, key, parent, attempts, max_attempts, worker FROM jobs"
+            " WHERE state = 'running' AND lease_until < ?", (now,),
+        ).fetchall()
+        for row in expired:
+            # the job itself did not fail: retry it straight away
+            self._retry_or_fail(db, row, f"lease expired (worker {row['worker']})", now,
+                                backoff=False)
+
+    def heartbeat(self, job: Job, worker: str, lease: float = DEFAULT_LEASE) -> None:
+        now = time.time()
+        with self._transaction() as db:
+            cur = db.execute(
+                "UPDATE jobs SET lease_until = ?, heartbeat = ?"
+                " WHERE id = ? AND worker = ? AND state = 'running'",
+                (now + lease, now, job.id, worker),
+            )
+            if cur.rowcount == 0:
+                raise LeaseLost(job.key)
+
+    def complete(self, job: Job, worker: str, follow_ups: Iterable[NewJob] = ()) -> None:
+        """Mark done, unblock the parent and enqueue follow-ups in one transaction."""
+        with self._transaction() as db:
+            row = db.execute(
+                "SELECT parent FROM jobs WHERE id = ? AND worker = ? AND state = 'running'",
+                (job.id, worker),
+            ).fetchone()
+            if row is None:
+                raise LeaseLost(job.key)
+            db.execute(
+                "UPDATE jobs SET state = 'done', finished = ?, error = NULL, lease_until = NULL"
+                " WHERE id = ?", (time.time(), job.id),
+            )
+            self._unblock(db, row["parent"])
+            self._insert(db, follow_ups)
+
+    def fail(self, job: Job, worker: str, error: str, permanent: bool = False) -> str:
+        """Retry later (unless `permanent`) or give up; returns the job's new state."""
+        with self._transaction() as db:
+            row = db.execute(
+                "SELECT id, key, parent, attempts, max_attempts, worker FROM jobs"
+                " WHERE id = ? AND worker = ? AND state = 'running'", (job.id, worker),
+            ).fetchone()
+            if row is None:
+                raise LeaseLost(job.key)
+            return self._retry_or_fail(db, row, error, time.time(), retry=not permanent)
+
+    def _retry_or_fail(self, db: sqlite3.Connection, row, error: str, now: float,
+                       retry: bool = True, backoff: bool = True) -> str:
+        if retry and row["attempts"] < row["max_attempts"]:
+            delay = RETRY_BACKOFF * row["attempts"] if backoff else 0.0
+            db.execute(
+                "UPDATE jobs SET state = 'pending', worker = NULL, lease_until = NULL,"
+                " error = ?, not_before = ? WHERE id = ?",
+                (error, now + delay, row["id"]),
+            )
+            return "pending"
+        db.execute(
+            "UPDATE jobs SET state = 'failed', lease_until = NULL, error = ?, finished = ?"
+            " WHERE id = ?", (error, now, row["id"]),
+        )
+        # a parent waits for finished children, successful or not
+        self._unblock(db, row["parent"])
+        return "failed"
+
+    @staticmethod
+    def _unblock(db: sqlite3.Connection, parent: Optional[str]) -> None:
+        if parent:
+            db.execute("UPDATE jobs SET blocked = blocked - 1 WHERE key = ?", (parent,))
+
+    # -- inspection ----------------------------------------------------------
+
+    def counts(self) -> Dict[str, Dict[str, int]]:
+        """kind -> state -> count (blocked pending jobs count as 'blocked')."""
+        out: Dict[str, Dict[str, int]] = {}
+        with self._connect() as db:
+            for row in db.execute(
+                "SELECT kind, CASE WHEN state = 'pending' AND blocked > 0 THEN 'blocked'"
+                " ELSE state END AS st, COUNT(*) AS n FROM jobs GROUP BY kind, st"
+            ):
+                out.setdefault(row["kind"], {})[row["st"]] = row["n"]
+        return out
+
+    def unfinished(self, kinds: Optional[Sequence[str]] = None) -> int:
+        """Pending (including blocked / backing off) plus running jobs."""
+        sql = "SELECT COUNT(*) FROM jobs WHERE state IN ('pending', 'running')"
+        params: List[object] = []
+        if kinds:
+            sql += f" AND kind IN ({', '.join('?' * len(kinds))})"
+            params += list(kinds)
+        with self._connect() as db:
+            return db.execute(sql, params).fetchone()[0]
+
+    def running(self) -> List[sqlite3.Row]:
+        with self._connect() as db:
+            return db.execute(
+                "SELECT key, worker, attempts, started, heartbeat, lease_until FROM jobs"
+                " WHERE state = 'running' ORDER BY started"
+            ).fetchall()
+
+    def failures(self, limit: int = 20) -> List[sqlite3.Row]:
+        with self._connect() as db:
+            return db.execute(
+                "SELECT key, attempts, error FROM jobs WHERE state = 'failed'"
+                " ORDER BY finished DESC LIMIT ?", (limit,),
+            ).fetchall()
+
+    def requeue_failed(self, kinds: Optional[Sequence[str]] = None) -> int:
+        """
+        Give failed jobs a fresh set of attempts. Their parents were already
+        unblocked, so a parent that has not run yet is blocked again.
+        """
+        with self._transaction() as db:
+            sql = "SELECT id, parent FROM jobs WHERE state = 'failed'"
+            params: List[object] = []
+            if kinds:
+                sql += f" AND kind IN ({', '.join('?' * len(kinds))})"
+                params += list(kinds)
+            rows = db.execute(sql, params).fetchall()
+            for row in rows:
+                db.execute(
+                    "UPDATE jobs SET state = 'pending', attempts = 0, not_before = 0,"
+                    " worker = NULL, error = NULL WHERE id = ?", (row["id"],),
+                )
+                if row["parent"]:
+                    db.execute(
+                        "UPDATE jobs SET blocked = blocked + 1"
+                        " WHERE key = ? AND state = 'pending'", (row["parent"],),
+                    )
+            return len(rows)
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT (ROLLBACK on error) on a private connection."""
+
+    def __init__(self, db: sqlite3.Connection):
+        self.db = db
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.db.execute("BEGIN IMMEDIATE")
+        return self.db
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            self.db.execute("ROLLBACK" if exc_type else "COMMIT")
+        finally:
+            self.db.close()
+        return False
+
+
+class Heartbeat:
+    """Extends a claimed job's lease every lease/3 seconds until stopped."""
+
+    def __init__(self, queue: JobQueue, job: Job, worker: str, lease: float):
+        self.queue, self.job, self.worker, self.lease = queue, job, worker, lease
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self) -> "Heartbeat":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        return False
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.lease / 3):
+            try:
+                self.queue.heartbeat(self.job, self.worker, self.lease)
+            except LeaseLost:
+                self.lost = True
+                return
+            except sqlite3.Error as e:
+                # transient (locked / share hiccup): the next beat may succeed
+                print(f"[QUEUE][WARN] heartbeat for {self.job.key} failed: {e}")
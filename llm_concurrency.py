@@ -0,0 +1,485 @@
+#!/usr/bin/env python
+"""
+Per-model limits on in-flight LLM requests, fixed or adaptive (AIMD).
+
+ollama_utils.generate_text_with_stats and LocalLLMClient.generate_with_stats
+(hence generate_text / call_llm) take a slot before each request:
+
+    with llm_slot(model) as slot:
+        ...request...
+        slot.observe(stats)        # token counts sharpen the latency signal
+
+The policy comes from COBREX_LLM_CONCURRENCY, so it is inherited like
+COBREX_RENDER / COBREX_TRACE:
+
+    unset / off     no limit (callers' own thread pools decide)
+    N               at most N requests per model in flight
+    adaptive[:MAX]  AIMD between 1 and MAX (default 8) requests per model
+
+LocalLLMClient keeps a separate limit per (model, server URL), since each
+server of an LLMClientPool has its own capacity.
+
+The adaptive limit grows by one per round trip while it is the bottleneck
+(every slot busy), and shrinks multiplicatively, at most once per round
+trip, on an error or timeout, when a request takes more than half the
+client timeout, or when the latency per unit of work (generated tokens
+plus a fraction of the prompt tokens) exceeds `tolerance` times the best
+seen recently. That last signal rises as soon as Ollama starts queueing or
+splitting its compute across too many requests, so throughput settles near
+the server's capacity. Time spent waiting for a slot is reported as the
+request's queue_wait_s in the telemetry sidecars.
+
+    python llm_concurrency.py simulate                      # adaptive vs. a simulated server
+    python llm_concurrency.py simulate --policy 16 --parallel 4 --max-queue 8
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, Optional, Tuple
+
+from llm_telemetry import LLMCallStats
+
+DEFAULT_ADAPTIVE_MAX = 8
+# prefill is roughly an order of magnitude cheaper per token than generation
+PREFILL_WEIGHT = 0.1
+# LocalLLMClient's requests.post timeout
+REQUEST_TIMEOUT_S = 600.0
+
+
+def concurrency_policy() -> str:
+    return os.environ.get("COBREX_LLM_CONCURRENCY", "").strip().lower() or "off"
+
+
+def set_llm_concurrency(policy: Optional[str]) -> None:
+    """Apply `policy` to this process and every subprocess it starts (None: keep)."""
+    if policy is not None:
+        parse_policy(policy)
+        os.environ["COBREX_LLM_CONCURRENCY"] = policy
+
+
+def parse_policy(policy: str) -> Tuple[str, int]:
+    """'off' -> ('off', 0), '4' -> ('fixed', 4), 'adaptive:16' -> ('adaptive', 16)."""
+    policy = policy.strip().lower()
+    if policy in ("", "off", "0"):
+        return "off", 0
+    if policy.startswith("adaptive"):
+        _, _, cap = policy.partition(":")
+        if cap and not (cap.isdigit() and int(cap) > 0):
+            raise ValueError(f"adaptive cap must be a positive integer, got {policy!r}")
+        return "adaptive", int(cap) if cap else DEFAULT_ADAPTIVE_MAX
+    if policy.isdigit():
+        return "fixed", int(policy)
+    raise ValueError(f"LLM concurrency must be off, N or adaptive[:MAX], got {policy!r}")
+
+
+def policy_arg(value: str) -> str:
+    try:
+        parse_policy(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+    return value
+
+
+def work_units(stats: Optional[LLMCallStats]) -> float:
+    """Generated tokens plus weighted prompt tokens (chars / 4 when not reported)."""
+    if stats is None:
+        return 1.0
+    if stats.eval_count is not None or stats.prompt_eval_count is not None:
+        units = (stats.eval_count or 0) + PREFILL_WEIGHT * (stats.prompt_eval_count or 0)
+    else:
+        units = (stats.response_chars + PREFILL_WEIGHT * stats.prompt_chars) / 4
+    return max(units, 1.0)
+
+
+# ---------------------------------------------------------------------------
+# Limits
+# ---------------------------------------------------------------------------
+
+@dataclass
+class LimitStats:
+    requests: int = 0
+    errors: int = 0
+    decreases: int = 0
+    latency_s: float = 0.0
+    units: float = 0.0
+    max_in_flight: int = 0
+    first_start: Optional[float] = None
+    last_end: Optional[float] = None
+    # (time.perf_counter(), limit) after every change
+    history: List[Tuple[float, float]] = field(default_factory=list)
+
+
+class ConcurrencyLimit:
+    """A fixed limit; AdaptiveLimit overrides _on_success / _on_error."""
+
+    def __init__(self, model: str, limit: float):
+        self.model = model
+        self.limit = float(limit)
+        self.in_flight = 0
+        self.stats = LimitStats(history=[(time.perf_counter(), self.limit)])
+        self._cond = threading.Condition()
+
+    def acquire(self) -> Tuple[float, int]:
+        """Wait for a free slot; returns (start time, requests in flight including this one)."""
+        with self._cond:
+            self._cond.wait_for(lambda: self.in_flight < max(int(self.limit), 1))
+            self.in_flight += 1
+            now = time.perf_counter()
+            if self.stats.first_start is None:
+                self.stats.first_start = now
+            self.stats.max_in_flight = max(self.stats.max_in_flight, self.in_flight)
+            return now, self.in_flight
+
+    def release(self, started: float, in_flight: int, latency_s: float, units: float,
+                error: Optional[BaseException]) -> None:
+        with self._cond:
+            self.in_flight -= 1
+            s = self.stats
+            s.requests += 1
+            s.last_end = time.perf_counter()
+            if error is not None:
+                s.errors += 1
+                self._on_error(started)
+            else:
+                s.latency_s += latency_s
+                s.units += units
+                self._on_success(started, in_flight, latency_s, units)
+            self._cond.notify_all()
+
+    def _on_success(self, started: float, in_flight: int, latency_s: float, units: float) -> None:
+        pass
+
+    def _on_error(self, started: float) -> None:
+        pass
+
+    def _set_limit(self, limit: float) -> None:
+        self.limit = limit
+        self.stats.history.append((time.perf_counter(), limit))
+
+    def summary(self) -> Dict[str, object]:
+        s = self.stats
+        ok = max(s.requests - s.errors, 1)
+        elapsed = (s.last_end or 0) - (s.first_start or 0)
+        return {
+            "model": self.model,
+            "limit": round(self.limit, 2),
+            "max_in_flight": s.max_in_flight,
+            "requests": s.requests,
+            "errors": s.errors,
+            "decreases": s.decreases,
+            "mean_latency_s": s.latency_s / ok,
+            "units_per_s": s.units / elapsed if elapsed > 0 else None,
+        }
+
+
+class AdaptiveLimit(ConcurrencyLimit):
+    """
+    AIMD: +1/limit per saturated success (about +1 per round trip), x`backoff`
+    on congestion, at most once per round trip (only requests started after
+    the last decrease can trigger the next).
+    """
+
+    def __init__(self, model: str, max_limit: int = DEFAULT_ADAPTIVE_MAX,
+                 min_limit: int = 1, backoff: float = 0.7, tolerance: float = 2.0,
+                 baseline_drift: float = 0.005, timeout_s: float = REQUEST_TIMEOUT_S):
+        super().__init__(model, min_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.tolerance = tolerance
+        self.baseline_drift = baseline_drift
+        self.timeout_s = timeout_s
+        # best recent latency per work unit; drifts up slowly so it follows
+        # lasting changes (another model loaded, longer prompts)
+        self.baseline: Optional[float] = None
+        self._last_decrease = 0.0
+
+    def _on_success(self, started: float, in_flight: int, latency_s: float, units: float) -> None:
+        cost = latency_s / units
+        if self.baseline is None or cost < self.baseline:
+            self.baseline = cost
+        else:
+            self.baseline = min(cost, self.baseline * (1 + self.baseline_drift))
+
+        if latency_s > 0.5 * self.timeout_s or cost > self.tolerance * self.baseline:
+            self._decrease(started)
+        elif in_flight >= int(self.limit) and self.limit < self.max_limit:
+            self._set_limit(min(self.limit + 1 / self.limit, float(self.max_limit)))
+
+    def _on_error(self, started: float) -> None:
+        self._decrease(started)
+
+    def _decrease(self, started: float) -> None:
+        if started < self._last_decrease:
+            return  # sent under the previous limit
+        self._last_decrease = time.perf_counter()
+        self.stats.decreases += 1
+        self._set_limit(max(self.limit * self.backoff, float(self.min_limit)))
+
+
+# ---------------------------------------------------------------------------
+# Slots
+# ---------------------------------------------------------------------------
+
+class _NullSlot:
+    """What llm_slot() returns while the policy is off."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def observe(self, stats: LLMCallStats):
+        return self
+
+
+NULL_SLOT = _NullSlot()
+
+
+class Slot:
+    __slots__ = ("limit", "units", "_started", "_in_flight")
+
+    def __init__(self, limit: ConcurrencyLimit):
+        self.limit = limit
+        self.units = 1.0
+
+    def observe(self, stats: LLMCallStats) -> "Slot":
+        self.units = work_units(stats)
+        return self
+
+    def __enter__(self) -> "Slot":
+        self._started, self._in_flight = self.limit.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.limit.release(self._started, self._in_flight,
+                           time.perf_counter() - self._started, self.units, exc)
+        return False
+
+
+_limits: Dict[Tuple[str, str], ConcurrencyLimit] = {}
+_limits_lock = threading.Lock()
+
+
+def get_limit(model: str, policy: Optional[str] = None,
+              endpoint: Optional[str] = None) -> Optional[ConcurrencyLimit]:
+    """
+    This process's limit for `model` (on `endpoint`, when requests go to
+    several servers) under `policy` (default: the environment's).
+    """
+    policy = policy or concurrency_policy()
+    kind, value = parse_policy(policy)
+    if kind == "off":
+        return None
+    name = f"{model}@{endpoint}" if endpoint else model
+    with _limits_lock:
+        limit = _limits.get((policy, name))
+        if limit is None:
+            limit = AdaptiveLimit(name, value) if kind == "adaptive" else ConcurrencyLimit(name, value)
+            _limits[(policy, name)] = limit
+        return limit
+
+
+def llm_slot(model: str, endpoint: Optional[str] = None):
+    """A slot for one request to `model`; a no-op unless COBREX_LLM_CONCURRENCY is set."""
+    limit = get_limit(model, endpoint=endpoint)
+    return NULL_SLOT if limit is None else Slot(limit)
+
+
+def report() -> int:
+    """Print one line per model limited in this process; returns how many."""
+    with _limits_lock:
+        limits = list(_limits.values())
+    for limit in limits:
+        s = limit.summary()
+        rate = f"{s['units_per_s']:.1f}" if s["units_per_s"] else "-"
+        print(f"[LLM-CONCURRENCY] {s['model']}: limit {s['limit']} (max in flight "
+              f"{s['max_in_flight']}), {s['requests']} requests, {s['errors']} errors, "
+              f"{s['decreases']} decreases, mean latency {s['mean_latency_s']:.2f}s, "
+              f"{rate} tokens/s")
+    return len(limits)
+
+
+# ---------------------------------------------------------------------------
+# Simulated local server
+# ---------------------------------------------------------------------------
+
+class ServerBusy(RuntimeError):
+    """Stand-in for Ollama's 503 when its request queue is full."""
+
+
+class SimulatedServer:
+    """
+    An Ollama-like server in-process: `parallel` requests run at once
+    (OLLAMA_NUM_PARALLEL), others wait in a queue of at most `max_queue`
+    (OLLAMA_MAX_QUEUE, beyond which requests fail). Running requests share
+    the compute: aggregate generation speed grows linearly up to `knee`
+    concurrent requests and is flat at `peak_tok_s` after that. Requests
+    whose total latency would exceed `timeout_s` fail with TimeoutError
+    after the timeout, like requests.post(timeout=...).
+    """
+
+    def __init__(self, parallel: int = 4, knee: int = 4, peak_tok_s: float = 4000.0,
+                 max_queue: int = 64, timeout_s: float = 5.0):
+        self.parallel = parallel
+        self.knee = knee
+        self.peak_tok_s = peak_tok_s
+        self.max_queue = max_queue
+        self.timeout_s = timeout_s
+        self._lock = threading.Lock()
+        self._queue: Deque[threading.Event] = deque()  # FIFO, like Ollama's
+        self._running = 0
+
+    def _start(self) -> int:
+        """Wait for a slot in arrival order; returns how many requests are running."""
+        with self._lock:
+            if self._running < self.parallel and not self._queue:
+                self._running += 1
+                return self._running
+            if len(self._queue) >= self.max_queue:
+                raise ServerBusy("server busy, please try again (queue full)")
+            turn = threading.Event()
+            self._queue.append(turn)
+        if not turn.wait(self.timeout_s):
+            with self._lock:
+                if turn in self._queue:
+                    self._queue.remove(turn)
+                    raise TimeoutError("read timed out while queued")
+        # a finishing request handed its slot over
+        with self._lock:
+            return self._running
+
+    def _finish(self) -> None:
+        with self._lock:
+            if self._queue:
+                self._queue.popleft().set()
+            else:
+                self._running -= 1
+
+    def generate(self, model: str, prompt_tokens: int, tokens: int) -> LLMCallStats:
+        t0 = time.perf_counter()
+        stats = LLMCallStats(model=model, backend="simulated")
+        k = self._start()
+        try:
+            per_request = self.peak_tok_s * min(k, self.knee) / self.knee / k
+            service = (tokens + PREFILL_WEIGHT * prompt_tokens) / per_request
+            remaining = self.timeout_s - (time.perf_counter() - t0)
+            if service > remaining:
+                time.sleep(max(remaining, 0.0))
+                raise TimeoutError("read timed out")
+            time.sleep(service)
+        finally:
+            self._finish()
+        stats.latency_s = time.perf_counter() - t0
+        stats.prompt_eval_count = prompt_tokens
+        stats.eval_count = tokens
+        stats.total_duration_s = stats.eval_duration_s = service
+        return stats
+
+
+def simulate(server: SimulatedServer, policy: str, clients: int, requests: int,
+             tokens: int = 100, prompt_tokens: int = 1000) -> Dict[str, object]:
+    """`clients` threads send `requests` calls through a limit under `policy`."""
+    model = "sim"
+    kind, value = parse_policy(policy)
+    limit: Optional[ConcurrencyLimit] = None
+    if kind == "adaptive":
+        limit = AdaptiveLimit(model, value, timeout_s=server.timeout_s)
+    elif kind == "fixed":
+        limit = ConcurrencyLimit(model, value)
+    sent = iter(range(requests))
+    sent_lock = threading.Lock()
+    done: List[Tuple[float, int]] = []  # (end time, tokens)
+    errors = [0]
+
+    def client() -> None:
+        while True:
+            with sent_lock:
+                if next(sent, None) is None:
+                    return
+            slot = Slot(limit) if limit is not None else NULL_SLOT
+            try:
+                with slot:
+                    stats = server.generate(model, prompt_tokens, tokens)
+                    slot.observe(stats)
+            except (ServerBusy, TimeoutError):
+                with sent_lock:
+                    errors[0] += 1
+                continue
+            with sent_lock:
+                done.append((time.perf_counter(), tokens))
+
+    t0 = time.perf_counter()
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - t0
+
+    # steady state: the second half of the completions
+    done.sort()
+    half = done[len(done) // 2:]
+    steady = (sum(n for _, n in half[1:]) / (half[-1][0] - half[0][0])
+              if len(half) > 2 and half[-1][0] > half[0][0] else 0.0)
+    result: Dict[str, object] = {
+        "policy": policy,
+        "wall_s": wall,
+        "completed": len(done),
+        "errors": errors[0],
+        "steady_tok_s": steady,
+        # generated tokens per second with the server's compute fully used
+        "capacity_tok_s": server.peak_tok_s * tokens / (tokens + PREFILL_WEIGHT * prompt_tokens),
+    }
+    if limit is not None:
+        late = [v for ts, v in limit.stats.history if ts >= t0 + wall / 2] or [limit.limit]
+        result["settled_limit"] = statistics.median(late)
+        result["max_in_flight"] = limit.stats.max_in_flight
+    return result
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="LLM concurrency control tools.")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p_sim = sub.add_parser("simulate", help="Drive a limit against a simulated Ollama server")
+    p_sim.add_argument("--policy", nargs="+", type=policy_arg, default=["adaptive:32"],
+                       help="Policies to compare, e.g. adaptive:32 1 4 32 off")
+    p_sim.add_argument("--clients", type=int, default=48, help="Caller threads")
+    p_sim.add_argument("--requests", type=int, default=400)
+    p_sim.add_argument("--tokens", type=int, default=100, help="Generated tokens per request")
+    p_sim.add_argument("--prompt-tokens", type=int, default=1000)
+    p_sim.add_argument("--parallel", type=int, default=4, help="Server slots (OLLAMA_NUM_PARALLEL)")
+    p_sim.add_argument("--knee", type=int, default=4,
+                       help="Concurrency at which server throughput stops growing")
+    p_sim.add_argument("--peak-tok-s", type=float, default=4000.0)
+    p_sim.add_argument("--max-queue", type=int, default=64)
+    p_sim.add_argument("--timeout", type=float, default=1.0, help="Client timeout, seconds")
+
+    args = parser.parse_args(argv)
+    print(f"{'policy':<14} {'wall s':>7} {'done':>6} {'errors':>7} {'tok/s':>8} "
+          f"{'% cap':>6} {'limit':>6} {'max in flight':>14}")
+    for policy in args.policy:
+        server = SimulatedServer(args.parallel, args.knee, args.peak_tok_s,
+                                 args.max_queue, args.timeout)
+        r = simulate(server, policy, args.clients, args.requests, args.tokens, args.prompt_tokens)
+        limit = f"{r['settled_limit']:.1f}" if "settled_limit" in r else "-"
+        print(f"{policy:<14} {r['wall_s']:>7.2f} {r['completed']:>6} {r['errors']:>7} "
+              f"{r['steady_tok_s']:>8.0f} {100 * r['steady_tok_s'] / r['capacity_tok_s']:>6.0f} "
+              f"{limit:>6} {r.get('max_in_flight', '-'):>14}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
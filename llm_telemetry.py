@@ -0,0 +1,275 @@
+#!/usr/bin/env python
+"""
+Per-request LLM telemetry and its roll-ups.
+
+ollama_utils.generate_text_with_stats and
+LocalLLMClient.generate_with_stats return an LLMCallStats next to the
+text: Ollama's own counters (prompt_eval_count, eval_count, load /
+prompt-eval / eval / total durations) plus what the client saw, namely
+end-to-end latency and the time the request waited in a client-side queue
+before it was sent.
+
+The summarisation drivers store one sidecar per summary:
+
+    LLM/rule_level/<mode>/RULE_SUMMARY_<PROG>_<BR>_<MODE>.telemetry.json
+    LLM/file_level/FILE_SUMMARY_<PROG>_<MODE>.telemetry.json
+
+and this script rolls them up per program, mode and model:
+
+    python llm_telemetry.py rollup output                      # tables by mode / model
+    python llm_telemetry.py rollup output --csv output/llm_telemetry.csv
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import re
+import sys
+import time
+from collections import defaultdict
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+TELEMETRY_SUFFIX = ".telemetry.json"
+ROLLUP_KEYS = ("program", "mode", "model", "level")
+
+ROLLUP_FIELDS = [
+    "calls", "errors",
+    "prompt_tokens", "mean_prompt_tokens", "eval_tokens", "mean_eval_tokens",
+    "mean_latency_s", "p95_latency_s", "mean_queue_wait_s", "load_s",
+    "prefill_tok_s", "gen_tok_s",
+]
+
+
+@dataclass
+class LLMCallStats:
+    """One LLM request. Durations are seconds; None when the backend did not report them."""
+
+    model: str
+    backend: str
+    started_at: float = field(default_factory=time.time)
+    latency_s: float = 0.0
+    queue_wait_s: float = 0.0
+    prompt_chars: int = 0
+    response_chars: int = 0
+    prompt_eval_count: Optional[int] = None
+    eval_count: Optional[int] = None
+    load_duration_s: Optional[float] = None
+    prompt_eval_duration_s: Optional[float] = None
+    eval_duration_s: Optional[float] = None
+    total_duration_s: Optional[float] = None
+    error: Optional[str] = None
+
+    @property
+    def prefill_tok_s(self) -> Optional[float]:
+        return _rate(self.prompt_eval_count, self.prompt_eval_duration_s)
+
+    @property
+    def gen_tok_s(self) -> Optional[float]:
+        return _rate(self.eval_count, self.eval_duration_s)
+
+    @property
+    def server_overhead_s(self) -> Optional[float]:
+        """Latency not accounted for by Ollama: transport plus server-side queueing."""
+        if self.total_duration_s is None:
+            return None
+        return max(self.latency_s - self.total_duration_s, 0.0)
+
+    def to_json(self) -> dict:
+        data = asdict(self)
+        data["prefill_tok_s"] = self.prefill_tok_s
+        data["gen_tok_s"] = self.gen_tok_s
+        data["server_overhead_s"] = self.server_overhead_s
+        return data
+
+
+def _rate(tokens: Optional[int], seconds: Optional[float]) -> Optional[float]:
+    if not tokens or not seconds:
+        return None
+    return tokens / seconds
+
+
+def apply_api_counters(stats: LLMCallStats, data: dict) -> LLMCallStats:
+    """Copy the counters of an /api/generate response (durations in ns)."""
+    stats.prompt_eval_count = data.get("prompt_eval_count")
+    stats.eval_count = data.get("eval_count")
+    for key in ("load_duration", "prompt_eval_duration", "eval_duration", "total_duration"):
+        if data.get(key) is not None:
+            setattr(stats, f"{key}_s", data[key] / 1e9)
+    return stats
+
+
+_GO_DURATION = re.compile(r"(\d+(?:\.\d+)?)(ns|us|µs|ms|s|m|h)")
+_GO_UNITS = {"ns": 1e-9, "us": 1e-6, "µs": 1e-6, "ms": 1e-3, "s": 1.0, "m": 60.0, "h": 3600.0}
+_VERBOSE_LINE = re.compile(
+    r"^\s*(total duration|load duration|prompt eval count|prompt eval duration|"
+    r"eval count|eval duration):\s*(\S+)",
+    re.MULTILINE,
+)
+
+
+def parse_go_duration(text: str) -> Optional[float]:
+    """'1m2.5s' / '246.253ms' / '5.6µs' -> seconds."""
+    parts = _GO_DURATION.findall(text)
+    if not parts:
+        return None
+    return sum(float(n) * _GO_UNITS[unit] for n, unit in parts)
+
+
+def apply_verbose_counters(stats: LLMCallStats, stderr: str) -> LLMCallStats:
+    """Copy the counters `ollama run --verbose` prints to stderr."""
+    for name, value in _VERBOSE_LINE.findall(stderr):
+        attr = name.replace(" ", "_")
+        if attr.endswith("count"):
+            digits = re.match(r"\d+", value)
+            if digits:
+                setattr(stats, attr, int(digits.group()))
+        else:
+            setattr(stats, f"{attr}_s", parse_go_duration(value))
+    return stats
+
+
+# ---------------------------------------------------------------------------
+# Sidecars
+# ---------------------------------------------------------------------------
+
+def telemetry_path(out_path: Path) -> Path:
+    """RULE_SUMMARY_X.txt -> RULE_SUMMARY_X.telemetry.json (summary globs match *.txt only)."""
+    out_path = Path(out_path)
+    return out_path.with_name(out_path.stem + TELEMETRY_SUFFIX)
+
+
+def write_telemetry(out_path: Path, stats: LLMCallStats, **context) -> Path:
+    """Store `stats` next to the summary at `out_path`, tagged with program / mode / level / unit."""
+    path = telemetry_path(out_path)
+    record = dict(context)
+    record.update(stats.to_json())
+    path.write_text(json.dumps(record, indent=2), encoding="utf-8")
+    return path
+
+
+def iter_telemetry(roots: Iterable[Path]) -> Iterator[dict]:
+    for root in roots:
+        for path in sorted(Path(root).rglob(f"*{TELEMETRY_SUFFIX}")):
+            try:
+                yield json.loads(path.read_text(encoding="utf-8"))
+            except (OSError, ValueError) as e:
+                print(f"[TELEMETRY][WARN] Skipping {path}: {e}")
+
+
+# ---------------------------------------------------------------------------
+# Roll-ups
+# ---------------------------------------------------------------------------
+
+def _p95(values: List[float]) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(0.95 * len(ordered)), len(ordered) - 1)]
+
+
+def _sum(records: List[dict], key: str) -> float:
+    return sum(r.get(key) or 0 for r in records)
+
+
+def summarise_group(records: List[dict]) -> Dict[str, object]:
+    ok = [r for r in records if not r.get("error")]
+    latencies = [r["latency_s"] for r in ok] or [0.0]
+    prompt_tokens = _sum(ok, "prompt_eval_count")
+    eval_tokens = _sum(ok, "eval_count")
+    n = max(len(ok), 1)
+    return {
+        "calls": len(records),
+        "errors": len(records) - len(ok),
+        "prompt_tokens": int(prompt_tokens),
+        "mean_prompt_tokens": prompt_tokens / n,
+        "eval_tokens": int(eval_tokens),
+        "mean_eval_tokens": eval_tokens / n,
+        "mean_latency_s": sum(latencies) / len(latencies),
+        "p95_latency_s": _p95(latencies),
+        "mean_queue_wait_s": _sum(records, "queue_wait_s") / max(len(records), 1),
+        "load_s": _sum(ok, "load_duration_s"),
+        "prefill_tok_s": _rate(prompt_tokens, _sum(ok, "prompt_eval_duration_s")),
+        "gen_tok_s": _rate(eval_tokens, _sum(ok, "eval_duration_s")),
+    }
+
+
+def rollup(records: Sequence[dict], keys: Sequence[str]) -> List[Dict[str, object]]:
+    """One row per distinct combination of `keys`, sorted by prompt tokens."""
+    groups: Dict[Tuple, List[dict]] = defaultdict(list)
+    for rec in records:
+        groups[tuple(rec.get(k) for k in keys)].append(rec)
+    rows = []
+    for values, group in groups.items():
+        row: Dict[str, object] = dict(zip(keys, values))
+        row.update(summarise_group(group))
+        rows.append(row)
+    return sorted(rows, key=lambda r: -r["prompt_tokens"])
+
+
+def write_rollup_csv(records: Sequence[dict], out_csv: Path,
+                     keys: Sequence[str] = ROLLUP_KEYS) -> None:
+    out_csv.parent.mkdir(parents=True, exist_ok=True)
+    with out_csv.open("w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=[*keys, *ROLLUP_FIELDS])
+        writer.writeheader()
+        writer.writerows(rollup(records, keys))
+    print(f"[TELEMETRY] Roll-up ({', '.join(keys)}) -> {out_csv}")
+
+
+def _fmt(value, width: int, digits: int = 2) -> str:
+    if value is None:
+        return f"{'-':>{width}}"
+    if isinstance(value, float):
+        return f"{value:>{width}.{digits}f}"
+    return f"{value:>{width}}"
+
+
+def print_rollup(records: Sequence[dict], key: str) -> None:
+    print(f"{key:<20} {'calls':>6} {'err':>4} {'prompt tok':>11} {'mean':>8} "
+          f"{'gen tok':>9} {'lat s':>7} {'p95 s':>7} {'queue s':>8} "
+          f"{'prefill/s':>10} {'gen/s':>7}")
+    for row in rollup(records, (key,)):
+        print(f"{str(row[key]):<20} {row['calls']:>6} {row['errors']:>4} "
+              f"{row['prompt_tokens']:>11} {_fmt(row['mean_prompt_tokens'], 8, 0)} "
+              f"{row['eval_tokens']:>9} {_fmt(row['mean_latency_s'], 7)} "
+              f"{_fmt(row['p95_latency_s'], 7)} {_fmt(row['mean_queue_wait_s'], 8)} "
+              f"{_fmt(row['prefill_tok_s'], 10, 1)} {_fmt(row['gen_tok_s'], 7, 1)}")
+    print()
+
+
+def report(roots: Iterable[Path], out_csv: Optional[Path] = None,
+           by: Sequence[str] = ("mode", "model")) -> int:
+    """Print roll-ups for each key in `by` (and write the full CSV); returns the record count."""
+    records = list(iter_telemetry(roots))
+    if not records:
+        return 0
+    for key in by:
+        print_rollup(records, key)
+    if out_csv is not None:
+        write_rollup_csv(records, out_csv)
+    return len(records)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Roll up LLM telemetry sidecars.")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p_roll = sub.add_parser("rollup", help="Per program / mode / model roll-ups")
+    p_roll.add_argument("roots", nargs="+", type=Path, help="e.g. output")
+    p_roll.add_argument("--by", nargs="+", default=["mode", "model"],
+                        choices=ROLLUP_KEYS,
+                        help="Tables to print, one per key (default: mode model)")
+    p_roll.add_argument("--csv", type=Path, default=None,
+                        help="Write one row per (program, mode, model, level)")
+
+    args = parser.parse_args(argv)
+    if not report(args.roots, args.csv, args.by):
+        print(f"[TELEMETRY] No *{TELEMETRY_SUFFIX} under {[str(r) for r in args.roots]}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
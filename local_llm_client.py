@@ -1,7 +1,14 @@
 # local_llm_client.py
 
+import os
+import threading
+import time
+
 import requests
-from typing import Optional
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple, Union
+
+from llm_concurrency import REQUEST_TIMEOUT_S, llm_slot
+from llm_telemetry import LLMCallStats, apply_api_counters
 
 
 class LocalLLMClient:
@@ -15,6 +22,7 @@ class LocalLLMClient:
     Usage:
       client = LocalLLMClient()
       text = client.generate("llama3.1", prompt)
+      text, stats = client.generate_with_stats("llama3.1", prompt)
     """
 
     def __init__(self, base_url: str = "http://localhost:11434"):
@@ -26,9 +34,26 @@ class LocalLLMClient:
         prompt: str,
         temperature: float = 0.2,
         max_tokens: Optional[int] = None,
+        format: Optional[Union[str, Dict[str, Any]]] = None,
     ) -> str:
+        """Call the local model and return the generated text."""
+        return self.generate_with_stats(
+            model, prompt, temperature=temperature, max_tokens=max_tokens, format=format,
+        )[0]
+
+    def generate_with_stats(
+        self,
+        model: str,
+        prompt: str,
+        temperature: float = 0.2,
+        max_tokens: Optional[int] = None,
+        format: Optional[Union[str, Dict[str, Any]]] = None,
+        queued_at: Optional[float] = None,
+    ) -> Tuple[str, LLMCallStats]:
         """
-        Call the local model and return the generated text.
+        Call the local model and return the generated text plus the
+        request's telemetry (Ollama's token counts / durations, latency,
+        and the queue wait since `queued_at`, a time.perf_counter() value).
 
         For Ollama, the endpoint is POST /api/generate with:
           {
@@ -36,6 +61,12 @@ class LocalLLMClient:
             "prompt": "...",
             "options": {...}
           }
+
+        `format` is passed through as Ollama's structured-output option
+        ("json", or a JSON schema dict on newer servers).
+
+        The request waits for a per-model slot (llm_concurrency; a no-op
+        unless COBREX_LLM_CONCURRENCY is set), counted as queue wait.
         """
         url = f"{self.base_url}/api/generate"
         payload = {
@@ -48,17 +79,322 @@ class LocalLLMClient:
         }
         if max_tokens is not None:
             payload["options"]["num_predict"] = max_tokens
+        if format is not None:
+            payload["format"] = format
+
+        if queued_at is None:
+            queued_at = time.perf_counter()
+        with llm_slot(model, endpoint=self.base_url) as slot:
+            t0 = time.perf_counter()
+            stats = LLMCallStats(
+                model=model,
+                backend="ollama-api",
+                queue_wait_s=t0 - queued_at,
+                prompt_chars=len(prompt),
+            )
+            resp = requests.post(url, json=payload, timeout=REQUEST_TIMEOUT_S)
+            resp.raise_for_status()
+            data = resp.json()
+            stats.latency_s = time.perf_counter() - t0
+            # Ollama returns { "model": ..., "created_at": ..., "response": "..." ,
+            #                  "prompt_eval_count": ..., "eval_count": ..., "*_duration": ns }
+            text = data.get("response", "").strip()
+            stats.response_chars = len(text)
+            slot.observe(apply_api_counters(stats, data))
+        return text, stats
+
+
+def _model_key(name: str) -> str:
+    """'llama3.1' and 'llama3.1:latest' name the same model."""
+    return name if ":" in name else f"{name}:latest"
+
+
+class _Endpoint:
+    """One server of an LLMClientPool: routing state and metrics."""
+
+    def __init__(self, base_url: str):
+        self.client = LocalLLMClient(base_url)
+        self.url = self.client.base_url
+        self.outstanding = 0
+        self.healthy = True
+        self.retry_at = 0.0
+        self.consecutive_failures = 0
+        self.loaded: Set[str] = set()    # models believed resident (affinity)
+        self.missing: Set[str] = set()   # models this server answered 404 for
+        self.requests = 0
+        self.errors = 0
+        self.latency_s = 0.0
+        self.eval_tokens = 0
+        self.eval_s = 0.0
+
+
+class LLMClientPool:
+    """
+    LocalLLMClient over several Ollama servers (other ports, one per NUMA
+    node, other hosts), with the same generate / generate_with_stats API.
+
+    Routing: among healthy servers that have not answered 404 for the model,
+    prefer those that already hold it in memory (seen in /api/ps or served
+    it before), unless they have more than `affinity_slack` requests
+    outstanding beyond the least busy server; then least outstanding wins.
+
+    Health: a connection error, timeout or 5xx takes a server out of rotation
+    with exponential backoff (up to 60 s); afterwards one trial request (or a
+    successful background probe of /api/ps every `health_interval` seconds)
+    brings it back. The failed request moves to the next server, so callers
+    only see an error when every server failed.
+
+    Per-server metrics: pool.metrics() / pool.report(); each request's
+    telemetry names its server in `backend`.
+    """
+
+    def __init__(
+        self,
+        base_urls: Sequence[str],
+        affinity_slack: int = 2,
+        health_interval: float = 30.0,
+        probe_timeout: float = 2.0,
+    ):
+        if not base_urls:
+            raise ValueError("LLMClientPool needs at least one endpoint")
+        self.endpoints = [_Endpoint(url) for url in base_urls]
+        self.affinity_slack = affinity_slack
+        self.health_interval = health_interval
+        self.probe_timeout = probe_timeout
+        self._lock = threading.Lock()
+        self._health_thread: Optional[threading.Thread] = None
+
+    # -- routing -------------------------------------------------------------
+
+    def _choose(self, model: str, tried: Set[str]) -> Optional[_Endpoint]:
+        key = _model_key(model)
+        now = time.time()
+        with self._lock:
+            candidates = [
+                ep for ep in self.endpoints
+                if ep.url not in tried and key not in ep.missing
+                and (ep.healthy or (now >= ep.retry_at and ep.outstanding == 0))
+            ]
+            if not candidates:
+                return None
+            least = min(ep.outstanding for ep in candidates)
+            warm = [ep for ep in candidates
+                    if key in ep.loaded and ep.outstanding <= least + self.affinity_slack]
+            ep = min(warm or candidates, key=lambda e: (e.outstanding, e.requests))
+            ep.outstanding += 1
+            return ep
+
+    def _succeeded(self, ep: _Endpoint, model: str, stats: LLMCallStats) -> None:
+        with self._lock:
+            ep.healthy = True
+            ep.consecutive_failures = 0
+            ep.loaded.add(_model_key(model))
+            ep.requests += 1
+            ep.latency_s += stats.latency_s
+            if stats.eval_count and stats.eval_duration_s:
+                ep.eval_tokens += stats.eval_count
+                ep.eval_s += stats.eval_duration_s
+
+    def _failed(self, ep: _Endpoint, model: str, error: Exception, down: bool) -> None:
+        with self._lock:
+            ep.requests += 1
+            ep.errors += 1
+            if down:
+                ep.healthy = False
+                ep.consecutive_failures += 1
+                ep.retry_at = time.time() + min(2.0 ** ep.consecutive_failures, 60.0)
+                ep.loaded.clear()
+            else:
+                ep.missing.add(_model_key(model))
+        print(f"[LLM-POOL][WARN] {ep.url} failed for {model}: {error}")
+
+    # -- requests ------------------------------------------------------------
+
+    def generate(
+        self,
+        model: str,
+        prompt: str,
+        temperature: float = 0.2,
+        max_tokens: Optional[int] = None,
+        format: Optional[Union[str, Dict[str, Any]]] = None,
+    ) -> str:
+        return self.generate_with_stats(
+            model, prompt, temperature=temperature, max_tokens=max_tokens, format=format,
+        )[0]
+
+    def generate_with_stats(
+        self,
+        model: str,
+        prompt: str,
+        temperature: float = 0.2,
+        max_tokens: Optional[int] = None,
+        format: Optional[Union[str, Dict[str, Any]]] = None,
+        queued_at: Optional[float] = None,
+    ) -> Tuple[str, LLMCallStats]:
+        """LocalLLMClient.generate_with_stats on the best server, failing over to the others."""
+        self._start_health_checks()
+        if queued_at is None:
+            queued_at = time.perf_counter()
+        tried: Set[str] = set()
+        last_error: Optional[Exception] = None
+        while True:
+            ep = self._choose(model, tried)
+            if ep is None:
+                break
+            tried.add(ep.url)
+            try:
+                text, stats = ep.client.generate_with_stats(
+                    model, prompt, temperature=temperature, max_tokens=max_tokens,
+                    format=format, queued_at=queued_at,
+                )
+            except requests.HTTPError as e:
+                status = e.response.status_code if e.response is not None else None
+                # 404: this server lacks the model; 4xx: the request itself is bad
+                if status is not None and 400 <= status < 500 and status != 404:
+                    raise
+                self._failed(ep, model, e, down=status != 404)
+                last_error = e
+                continue
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self._failed(ep, model, e, down=True)
+                last_error = e
+                continue
+            finally:
+                with self._lock:
+                    ep.outstanding -= 1
+            stats.backend = f"ollama-api@{ep.url}"
+            self._succeeded(ep, model, stats)
+            return text, stats
+        if last_error is not None:
+            raise last_error
+        raise RuntimeError(
+            f"No LLM endpoint available for {model} "
+            f"(servers: {[ep.url for ep in self.endpoints]})"
+        )
+
+    # -- health --------------------------------------------------------------
+
+    def check_health(self) -> None:
+        """Probe every server's /api/ps: reachability plus the models it holds in memory."""
+        for ep in self.endpoints:
+            try:
+                resp = requests.get(f"{ep.url}/api/ps", timeout=self.probe_timeout)
+                resp.raise_for_status()
+                loaded = {_model_key(m.get("name", "")) for m in resp.json().get("models", [])}
+            except (requests.RequestException, ValueError):
+                with self._lock:
+                    if ep.healthy:
+                        print(f"[LLM-POOL][WARN] {ep.url} failed its health check")
+                    ep.healthy = False
+                    ep.retry_at = time.time() + self.health_interval
+                continue
+            with self._lock:
+                ep.healthy = True
+                ep.consecutive_failures = 0
+                ep.loaded = loaded
+
+    def _start_health_checks(self) -> None:
+        if self._health_thread is not None or self.health_interval <= 0:
+            return
+        with self._lock:
+            if self._health_thread is not None:
+                return
+            self._health_thread = threading.Thread(
+                target=self._health_loop, name="llm-pool-health", daemon=True,
+            )
+        self._health_thread.start()
+
+    def _health_loop(self) -> None:
+        while True:
+            self.check_health()
+            time.sleep(self.health_interval)
+
+    # -- metrics -------------------------------------------------------------
+
+    def metrics(self) -> List[Dict[str, object]]:
+        with self._lock:
+            return [
+                {
+                    "endpoint": ep.url,
+                    "healthy": ep.healthy,
+                    "outstanding": ep.outstanding,
+                    "requests": ep.requests,
+                    "errors": ep.errors,
+                    "mean_latency_s": ep.latency_s / max(ep.requests - ep.errors, 1),
+                    "gen_tok_s": ep.eval_tokens / ep.eval_s if ep.eval_s else None,
+                    "loaded": sorted(ep.loaded),
+                }
+                for ep in self.endpoints
+            ]
+
+    def report(self) -> None:
+        for m in self.metrics():
+            rate = f"{m['gen_tok_s']:.1f}" if m["gen_tok_s"] else "-"
+            print(f"[LLM-POOL] {m['endpoint']:<28} {'up' if m['healthy'] else 'DOWN':<4} "
+                  f"{m['requests']:>6} requests {m['errors']:>4} errors "
+                  f"{m['mean_latency_s']:>7.2f}s mean {rate:>7} gen tok/s "
+                  f"loaded={','.join(m['loaded']) or '-'}")
+
+
+def client_from_env() -> Union[LocalLLMClient, LLMClientPool]:
+    """
+    COBREX_LLM_ENDPOINTS="http://localhost:11434,http://localhost:11435"
+    gives a pool; one URL (or none: localhost:11434) a plain client.
+    """
+    urls = [u.strip() for u in os.environ.get("COBREX_LLM_ENDPOINTS", "").split(",") if u.strip()]
+    if len(urls) > 1:
+        return LLMClientPool(urls)
+    return LocalLLMClient(urls[0]) if urls else LocalLLMClient()
+
+
+# Convenience singleton for scripts (call_llm / call_llm_with_stats)
+default_client = client_from_env()
+
+
+def set_llm_endpoints(base_urls: Optional[Sequence[str]]) -> None:
+    """Point call_llm at these servers (inherited by subprocesses); None: keep."""
+    global default_client
+    if base_urls:
+        os.environ["COBREX_LLM_ENDPOINTS"] = ",".join(base_urls)
+        default_client = client_from_env()
+
+
+def report_endpoints() -> None:
+    """Per-server metrics when call_llm goes through a pool."""
+    if isinstance(default_client, LLMClientPool):
+        default_client.report()
 
-        resp = requests.post(url, json=payload, timeout=600)
-        resp.raise_for_status()
-        data = resp.json()
-        # Ollama returns { "model": ..., "created_at": ..., "response": "..." , ... }
-        return data.get("response", "").strip()
 
+def call_llm(
+    model: str,
+    prompt: str,
+    temperature: float = 0.2,
+    max_tokens: Optional[int] = None,
+    format: Optional[Union[str, Dict[str, Any]]] = None,
+) -> str:
+    return default_client.generate(
+        model=model,
+        prompt=prompt,
+        temperature=temperature,
+        max_tokens=max_tokens,
+        format=format,
+    )
 
-# Convenience singleton for scripts
-default_client = LocalLLMClient()
 
+def call_llm_with_stats(
+    model: str,
+    prompt: str,
+    temperature: float = 0.2,
+    max_tokens: Optional[int] = None,
+    format: Optional[Union[str, Dict[str, Any]]] = None,
+    queued_at: Optional[float] = None,
+) -> Tuple[str, LLMCallStats]:
+    return default_client.generate_with_stats(
+        model=model,
+        prompt=prompt,
+        temperature=temperature,
+        max_tokens=max_tokens,
+        format=format,
+        queued_at=queued_at,
+    )
 
-def call_llm(model: str, prompt: str, temperature: float = 0.2, max_tokens: Optional[int] = None) -> str:
-    return default_client.generate(model=model, prompt=prompt, temperature=temperature, max_tokens=max_tokens)
@@ -16,13 +16,19 @@ For each COBOL file under --projects-root:
 3) Mocktail prompts:
    - summarizer.run_summarization.build_prompts_for_program
      (modes from summarizer.mocktail_config)
+   - or, with --stream-prompts, iter_prompts_for_program feeding the
+     LLM stage directly without writing BR_PROMPTS/ files
 
 4) LLM (Ollama) summarisation:
    - Rule-level summaries for each mocktail mode
    - File-level summary per program + mode
+   - Each summary gets a <summary>.telemetry.json sidecar (tokens,
+     durations, latency); llm_telemetry rolls them up into
+     <output-root>/llm_telemetry.csv at the end
 
 5) Evaluation:
-   - Per-file metrics vs references:
+   - Per-file ROUGE-1/2/L + BLEU vs references (eval_metrics, one batch
+     over the whole corpus after the main loop):
        * first from CSV (e.g. file_level_reference_dataset.csv)
        * fallback to data/human_references_generated/<proj>/<file>.txt
    - Per-project averages
@@ -37,20 +43,51 @@ Usage example (from COBREX-CLI root):
         --human-ref-root data/human_references_generated \\
         --model       llama3.1
 
+Add --trace output/trace.jsonl for per-program / per-stage timing spans,
+including one span per Ollama call (see tracing.py), and --profile for
+per-program cProfile / tracemalloc output under <prog_out_dir>/PROFILE
+(see profiling.py).
+
+Add --pipeline to overlap programs: BR/index + prompts for the next
+programs run on a CPU pool while the LLM works through the current ones,
+and each file-level merge starts as soon as its rule summaries are done
+(see pipeline_scheduler.py).
+
 """
 
 from __future__ import annotations
 
 import argparse
 import csv
+import json
 import subprocess
+import threading
 from collections import defaultdict
+from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Dict, Iterable, List, Tuple
 
-from ollama_utils import generate_text
+from eval_metrics import METRIC_NAMES, score_corpus
+from llm_concurrency import policy_arg, report as report_concurrency, set_llm_concurrency
+from llm_telemetry import report as report_telemetry, write_telemetry
+from ollama_utils import generate_text_with_stats
+from pipeline_journal import JOURNAL_NAME, PipelineJournal, atomic_write_text, sha256_text
+from pipeline_scheduler import StageScheduler
 from summarizer.mocktail_config import DEFAULT_MOCKTAIL_MODES
-from summarizer.run_summarization import build_prompts_for_program
+from summarizer.run_summarization import (
+    PromptRecord,
+    build_prompts_for_program,
+    iter_prompts_for_program,
+)
+from profiling import (
+    ProfileAggregate,
+    add_profile_argument,
+    merge as merge_profiles,
+    profile_modes,
+    profiled,
+    set_profile_modes,
+)
+from tracing import TRACE_FORMATS, enable_tracing, span
 
 
 # ---------------------------------------------------------------------------
@@ -130,19 +167,45 @@ def ensure_static_pipeline_for_program(
     return False
 
 
+def static_fingerprint(prog_out_dir: Path) -> str | None:
+    """
+    Hash of the names, sizes and mtimes of the files in Rules/. It changes
+    whenever run_all_projects_static.py re-extracts the program, which
+    invalidates the journalled br_index / prompts / program records.
+    """
+    rules_dir = prog_out_dir / "Rules"
+    try:
+        entries = sorted(
+            (p.name, st.st_size, st.st_mtime_ns)
+            for p in rules_dir.iterdir()
+            if p.is_file()
+            for st in (p.stat(),)
+        )
+    except OSError:
+        return None
+    return sha256_text(json.dumps(entries))
+
+
 # ---------------------------------------------------------------------------
 # 2) BR JSON + ProgramIndex + BR_REP
 # ---------------------------------------------------------------------------
 
-def run_br_and_index_pipeline(prog: str, prog_out_dir: Path) -> bool:
+def run_br_and_index_pipeline(
+    prog: str,
+    prog_out_dir: Path,
+    env: Dict[str, str] | None = None,
+) -> bool:
     """
     Run:
       - summarizer.build_br_json_from_dot
       - summarizer.program_index
       - summarizer.br_representation
 
+    `env` is passed to the three subprocesses (e.g. a tracing span's env()).
+
     We assume run_all_projects_static.py has already been run and that
-    Rules/ contains rule graphs (files named like 'rule_1', 'BRR_*', etc.).
+    Rules/ contains RULES_<PROG>.json (or, for older outputs, rule graphs
+    named like 'rule_1', 'BRR_*', etc.).
 
     Returns:
       True  -> BR JSON + ProgramIndex + BR_REP successfully created
@@ -155,20 +218,30 @@ def run_br_and_index_pipeline(prog: str, prog_out_dir: Path) -> bool:
         print("  → Skipping this file and continuing.")
         return False
 
-    # Consider any non-PDF file inside Rules/ as a rule graph.
-    rule_files = [
-        p for p in rules_dir.iterdir()
-        if p.is_file() and not p.name.lower().endswith(".pdf")
-    ]
+    rules_json = rules_dir / f"RULES_{prog}.json"
+    if rules_json.is_file():
+        # Structured rule list written by the BRR stage.
+        n_rules = len(json.loads(rules_json.read_text()).get("rules", []))
+        if not n_rules:
+            print(f"[BR][WARN] No rules in {rules_json}")
+            print("  → Skipping this file and continuing.")
+            return False
+        print(f"[BR] Found {n_rules} rule(s) for {prog} in {rules_json}")
+    else:
+        # Older outputs: consider any non-PDF file inside Rules/ as a rule graph.
+        rule_files = [
+            p for p in rules_dir.iterdir()
+            if p.is_file() and not p.name.lower().endswith(".pdf")
+        ]
 
-    if not rule_files:
-        print(f"[BR][WARN] No rule graph files found for {prog} in {rules_dir}")
-        print("  → Expected files like 'rule_1', 'BRR_<PROG>', etc.")
-        print("  → Skipping this file and continuing.")
-        return False
+        if not rule_files:
+            print(f"[BR][WARN] No rule graph files found for {prog} in {rules_dir}")
+            print("  → Expected files like 'rule_1', 'BRR_<PROG>', etc.")
+            print("  → Skipping this file and continuing.")
+            return False
 
-    print(f"[BR] Found {len(rule_files)} rule file(s) for {prog} in {rules_dir}: "
-          f"{[p.name for p in rule_files]}")
+        print(f"[BR] Found {len(rule_files)} rule file(s) for {prog} in {rules_dir}: "
+              f"{[p.name for p in rule_files]}")
 
     br_json_path = prog_out_dir / f"BR_{prog}.json"
 
@@ -181,7 +254,7 @@ def run_br_and_index_pipeline(prog: str, prog_out_dir: Path) -> bool:
     ]
     print("[RUN]", " ".join(cmd1))
     try:
-        subprocess.check_call(cmd1)
+        subprocess.check_call(cmd1, env=env)
     except subprocess.CalledProcessError as e:
         print(f"[BR][ERR] build_br_json_from_dot failed for {prog}: {e}")
         print("  → Skipping this file and continuing.")
@@ -196,7 +269,7 @@ def run_br_and_index_pipeline(prog: str, prog_out_dir: Path) -> bool:
     ]
     print("[RUN]", " ".join(cmd2))
     try:
-        subprocess.check_call(cmd2)
+        subprocess.check_call(cmd2, env=env)
     except subprocess.CalledProcessError as e:
         print(f"[BR][ERR] program_index failed for {prog}: {e}")
         print("  → Skipping this file and continuing.")
@@ -210,7 +283,7 @@ def run_br_and_index_pipeline(prog: str, prog_out_dir: Path) -> bool:
     ]
     print("[RUN]", " ".join(cmd3))
     try:
-        subprocess.check_call(cmd3)
+        subprocess.check_call(cmd3, env=env)
     except subprocess.CalledProcessError as e:
         print(f"[BR][ERR] br_representation failed for {prog}: {e}")
         print("  → Skipping this file and continuing.")
@@ -247,6 +320,72 @@ def iter_prompt_files(prog_out_dir: Path, prog: str, mode: str) -> Iterable[Tupl
         yield br_safe, path
 
 
+def read_cobol_source(prog: str, cobol_file: Path) -> str | None:
+    """The COBOL source for the whole-file fallback prompt, or None."""
+    if not cobol_file.is_file():
+        return None
+    try:
+        return cobol_file.read_text(encoding="utf-8", errors="ignore")
+    except Exception as e:
+        print(f"[RULE][WARN] Could not read COBOL source for {prog}: {e}")
+        return None
+
+
+def rule_prompt_entries(
+    prog: str,
+    prog_out_dir: Path,
+    mode: str,
+    cobol_source: str | None,
+    overwrite: bool = False,
+) -> List[Tuple[str, Path]]:
+    """
+    (br_id_safe, prompt_path) for one mode: the BR_PROMPTS files, or the
+    synthetic WHOLE_FILE prompt written from `cobol_source` when there are none.
+    """
+    # Normal path: prompts created by build_prompts_for_program(...)
+    entries = list(iter_prompt_files(prog_out_dir, prog, mode))
+
+    # Fallback: no prompts → create one synthetic prompt from full COBOL
+    if not entries and cobol_source:
+        prompts_dir = prog_out_dir / "BR_PROMPTS" / mode
+        prompts_dir.mkdir(parents=True, exist_ok=True)
+
+        prompt_path = prompts_dir / f"PROMPT_{prog}_WHOLE_FILE_{mode}.txt"
+
+        if not prompt_path.exists() or overwrite:
+            prompt_text = f"""
+You are an expert COBOL analyst.
+
+Program ID: {prog}
+Mocktail mode: {mode}
+
+You are given the FULL COBOL source of this program between <COBOL> tags.
+
+Your tasks:
+1. Explain the overall business purpose of the program.
+2. Describe the main business rules and what each one does.
+3. Highlight key inputs, outputs, and any validation/error-handling logic.
+4. Write a concise explanation (about 150–200 words) suitable for a human
+   maintainer who is not familiar with COBOL.
+
+<COBOL>
+{cobol_source}
+</COBOL>
+
+Now write ONLY the explanation.
+""".strip()
+
+            prompt_path.write_text(prompt_text, encoding="utf-8")
+
+        entries = [("WHOLE_FILE", prompt_path)]
+        print(
+            f"[RULE][INFO] No BR prompts for {prog} mode={mode}; "
+            f"created 1 synthetic prompt from full COBOL source."
+        )
+
+    return entries
+
+
 def generate_rule_level_summaries_for_program(
     prog: str,
     prog_out_dir: Path,
@@ -254,10 +393,22 @@ def generate_rule_level_summaries_for_program(
     model: str,
     cobol_file: Path,
     overwrite: bool = False,
+    prompt_stream: Iterable[PromptRecord] | None = None,
+    journal: PipelineJournal | None = None,
 ) -> None:
     """
     Generate rule-level summaries.
 
+    With a journal, a summary is done when the journal says so (not when
+    its file exists) for the same prompt text, and each new summary is
+    journalled with its prompt's hash after it is written atomically.
+
+    Streaming path (prompt_stream given):
+      - Consume PromptRecords from
+        summarizer.run_summarization.iter_prompts_for_program as they are
+        built, so the first LLM call starts before all prompts exist.
+        Modes that receive no records fall through to the paths below.
+
     Normal path:
       - Use BR_PROMPTS/<mode>/PROMPT_<prog>_*_<MODE>.txt created by
         summarizer.run_summarization.build_prompts_for_program.
@@ -276,55 +427,29 @@ def generate_rule_level_summaries_for_program(
     base_out = prog_out_dir / "LLM"
 
     # Read COBOL source once (for fallback use)
-    cobol_source: str | None = None
-    if cobol_file.is_file():
-        try:
-            cobol_source = cobol_file.read_text(encoding="utf-8", errors="ignore")
-        except Exception as e:
-            print(f"[RULE][WARN] Could not read COBOL source for {prog}: {e}")
-            cobol_source = None
+    cobol_source = read_cobol_source(prog, cobol_file)
+
+    streamed_modes = set()
+    if prompt_stream is not None:
+        for record in prompt_stream:
+            mode_out = base_out / "rule_level" / record.mode
+            if record.mode not in streamed_modes:
+                mode_out.mkdir(parents=True, exist_ok=True)
+                streamed_modes.add(record.mode)
+                print(f"[RULE] {prog} mode={record.mode} (streaming prompts)")
+
+            out_path = mode_out / f"RULE_SUMMARY_{prog}_{record.safe_id}_{record.mode}.txt"
+            if not overwrite and _output_done(journal, prog, "rule", record.mode, record.safe_id, out_path,
+                                              sha256_text(record.prompt)):
+                continue
+            _summarise_rule_prompt(prog, record.safe_id, record.mode, record.prompt, model, out_path,
+                                   journal)
 
     for mode in modes:
-        # Normal path: prompts created by build_prompts_for_program(...)
-        entries = list(iter_prompt_files(prog_out_dir, prog, mode))
-
-        # Fallback: no prompts → create one synthetic prompt from full COBOL
-        if not entries and cobol_source:
-            prompts_dir = prog_out_dir / "BR_PROMPTS" / mode
-            prompts_dir.mkdir(parents=True, exist_ok=True)
-
-            prompt_path = prompts_dir / f"PROMPT_{prog}_WHOLE_FILE_{mode}.txt"
-
-            if not prompt_path.exists() or overwrite:
-                prompt_text = f"""
-You are an expert COBOL analyst.
-
-Program ID: {prog}
-Mocktail mode: {mode}
-
-You are given the FULL COBOL source of this program between <COBOL> tags.
-
-Your tasks:
-1. Explain the overall business purpose of the program.
-2. Describe the main business rules and what each one does.
-3. Highlight key inputs, outputs, and any validation/error-handling logic.
-4. Write a concise explanation (about 150–200 words) suitable for a human
-   maintainer who is not familiar with COBOL.
-
-<COBOL>
-{cobol_source}
-</COBOL>
-
-Now write ONLY the explanation.
-""".strip()
-
-                prompt_path.write_text(prompt_text, encoding="utf-8")
+        if mode in streamed_modes:
+            continue
 
-            entries = [("WHOLE_FILE", prompt_path)]
-            print(
-                f"[RULE][INFO] No BR prompts for {prog} mode={mode}; "
-                f"created 1 synthetic prompt from full COBOL source."
-            )
+        entries = rule_prompt_entries(prog, prog_out_dir, mode, cobol_source, overwrite)
 
         # Still nothing (e.g. couldn’t read COBOL file)
         if not entries:
@@ -338,17 +463,72 @@ Now write ONLY the explanation.
 
         for br_safe, prompt_path in entries:
             out_path = mode_out / f"RULE_SUMMARY_{prog}_{br_safe}_{mode}.txt"
-            if out_path.exists() and not overwrite:
-                continue
-
             prompt = prompt_path.read_text(encoding="utf-8")
-            try:
-                ans = generate_text(model, prompt)
-            except Exception as e:
-                print(f"[RULE][ERR] {prog} {br_safe} mode={mode}: {e}")
+            if not overwrite and _output_done(journal, prog, "rule", mode, br_safe, out_path,
+                                              sha256_text(prompt)):
                 continue
 
-            out_path.write_text(ans, encoding="utf-8")
+            _summarise_rule_prompt(prog, br_safe, mode, prompt, model, out_path, journal)
+
+
+def _output_done(
+    journal: PipelineJournal | None,
+    prog: str,
+    stage: str,
+    mode: str,
+    unit: str | None,
+    out_path: Path,
+    inputs: str | None = None,
+) -> bool:
+    """
+    The journal's verdict when there is one, else "the file exists".
+    `inputs` is the hash of what the output was made from (its prompt), so
+    a record made from an older prompt is not done.
+    """
+    if journal is not None:
+        return journal.is_done(prog, stage, mode, unit, path=out_path, inputs=inputs)
+    return out_path.exists()
+
+
+def _save_summary(
+    journal: PipelineJournal | None,
+    prog: str,
+    stage: str,
+    mode: str,
+    unit: str | None,
+    out_path: Path,
+    text: str,
+    inputs: str | None = None,
+) -> None:
+    atomic_write_text(out_path, text)
+    if journal is not None:
+        journal.record(prog, stage, mode, unit, path=out_path, content=text, inputs=inputs)
+
+
+def _summarise_rule_prompt(
+    prog: str,
+    br_safe: str,
+    mode: str,
+    prompt: str,
+    model: str,
+    out_path: Path,
+    journal: PipelineJournal | None = None,
+) -> bool:
+    """Summarise one rule prompt into `out_path`; False when the LLM call failed."""
+    with span("llm.rule", prog=prog, br=br_safe, mode=mode, model=model) as sp:
+        sp.count(prompt_chars=len(prompt))
+        try:
+            ans, stats = generate_text_with_stats(model, prompt)
+        except Exception as e:
+            sp.fail(str(e))
+            print(f"[RULE][ERR] {prog} {br_safe} mode={mode}: {e}")
+            return False
+        sp.count(response_chars=len(ans), prompt_tokens=stats.prompt_eval_count or 0,
+                 eval_tokens=stats.eval_count or 0)
+
+    write_telemetry(out_path, stats, program=prog, mode=mode, level="rule", unit=br_safe)
+    _save_summary(journal, prog, "rule", mode, br_safe, out_path, ans, sha256_text(prompt))
+    return True
 
 
 
@@ -405,6 +585,7 @@ def generate_file_level_summaries_for_program(
     modes: List[str],
     model: str,
     overwrite: bool = False,
+    journal: PipelineJournal | None = None,
 ) -> None:
     llm_root = prog_out_dir / "LLM"
     for mode in modes:
@@ -417,17 +598,25 @@ def generate_file_level_summaries_for_program(
         file_out_dir.mkdir(parents=True, exist_ok=True)
 
         out_path = file_out_dir / f"FILE_SUMMARY_{prog}_{mode}.txt"
-        if out_path.exists() and not overwrite:
-            continue
-
+        # the prompt holds every rule summary, so a redone rule redoes the merge
         prompt = build_file_level_prompt(prog, rule_dir)
-        try:
-            ans = generate_text(model, prompt)
-        except Exception as e:
-            print(f"[FILE][ERR] {prog} mode={mode}: {e}")
+        if not overwrite and _output_done(journal, prog, "file", mode, None, out_path,
+                                          sha256_text(prompt)):
             continue
 
-        out_path.write_text(ans, encoding="utf-8")
+        with span("llm.file", prog=prog, mode=mode, model=model) as sp:
+            sp.count(prompt_chars=len(prompt))
+            try:
+                ans, stats = generate_text_with_stats(model, prompt)
+            except Exception as e:
+                sp.fail(str(e))
+                print(f"[FILE][ERR] {prog} mode={mode}: {e}")
+                continue
+            sp.count(response_chars=len(ans), prompt_tokens=stats.prompt_eval_count or 0,
+                     eval_tokens=stats.eval_count or 0)
+
+        write_telemetry(out_path, stats, program=prog, mode=mode, level="file", unit="FILE")
+        _save_summary(journal, prog, "file", mode, None, out_path, ans, sha256_text(prompt))
         print(f"[FILE] {prog} mode={mode} -> {out_path}")
 
 
@@ -491,37 +680,28 @@ def load_references_from_csv(csv_path: Path) -> Dict[str, str]:
             f"Cannot find reference text column in {csv_path}; expected one of {possible_ref_cols}, got {list(df.columns)}"
         )
 
-    refs: Dict[str, str] = {}
-
-    for _, row in df.iterrows():
-        path_val = row.get(path_col, "")
-        ref_val = row.get(ref_col, "")
-
-        if not isinstance(path_val, str) or not path_val.strip():
-            continue
-        if not isinstance(ref_val, str) or not ref_val.strip():
-            continue
-
-        raw = path_val.strip().replace("\\", "/")
-        text = ref_val.strip()
-        parts = raw.split("/")
-
-        candidate_keys = set()
-
-        # 1) raw as-is (whatever the CSV had)
-        candidate_keys.add(raw)
-
-        # 2) last two components: "<repo>/<file>.cbl"
-        if len(parts) >= 2:
-            tail2 = "/".join(parts[-2:])
-            candidate_keys.add(tail2)
-
-        # 3) just the file name, e.g. "HCAPDB01.cbl"
-        candidate_keys.add(parts[-1])
-
-        for key in candidate_keys:
-            # don't overwrite an existing reference for same key
-            refs.setdefault(key, text)
+    # Keep rows with both a non-empty path and a non-empty reference text
+    ref_text = df[ref_col].map(lambda v: v.strip() if isinstance(v, str) else "")
+    has_path = df[path_col].map(lambda v: isinstance(v, str) and v != "")
+    keep = has_path & ref_text.ne("")
+    raw = df.loc[keep, path_col]
+    text = ref_text[keep]
+    parts = raw.str.split("/")
+
+    # Register three candidate keys per row:
+    #   1) raw as-is (whatever the CSV had)
+    #   2) last two components: "<repo>/<file>.cbl"
+    #   3) just the file name, e.g. "HCAPDB01.cbl"
+    # Earlier rows win, so don't overwrite an existing reference for same key.
+    candidates = pd.concat(
+        [
+            pd.DataFrame({"key": raw, "text": text}),
+            pd.DataFrame({"key": parts.str[-2:].str.join("/"), "text": text}),
+            pd.DataFrame({"key": parts.str[-1], "text": text}),
+        ]
+    )
+    candidates = candidates.sort_index(kind="stable").drop_duplicates("key", keep="first")
+    refs: Dict[str, str] = dict(zip(candidates["key"], candidates["text"]))
 
     print(f"[INFO] Found {len(refs)} unique file keys with references from CSV.")
     return refs
@@ -566,38 +746,362 @@ def merge_references(csv_refs: Dict[str, str], human_refs: Dict[str, str]) -> Di
 
 
 # ---------------------------------------------------------------------------
-# 5) Simple ROUGE-1 F1
+# 5) Corpus-level metrics (ROUGE-1/2/L, BLEU) + CSV outputs
 # ---------------------------------------------------------------------------
 
-def _tokens(text: str) -> List[str]:
-    return [t for t in text.lower().split() if t]
-
-
-def rouge1_f1(pred: str, ref: str) -> float:
-    pt = _tokens(pred)
-    rt = _tokens(ref)
-    if not pt or not rt:
-        return 0.0
-    pc = {}
-    rc = {}
-    for t in pt:
-        pc[t] = pc.get(t, 0) + 1
-    for t in rt:
-        rc[t] = rc.get(t, 0) + 1
-    overlap = 0
-    for t, c in pc.items():
-        overlap += min(c, rc.get(t, 0))
-    precision = overlap / len(pt)
-    recall = overlap / len(rt)
-    if precision + recall == 0:
-        return 0.0
-    return 2 * precision * recall / (precision + recall)
+PER_FILE_FIELDS = ["project", "relative_cbl", "prog_id", "mode", *METRIC_NAMES]
+PER_PROJECT_FIELDS = ["project", "mode", *[f"avg_{m}" for m in METRIC_NAMES], "n_files"]
+
+
+def score_file_summaries(pending: List[Dict[str, str]]) -> List[Dict[str, object]]:
+    """
+    Score all collected (summary, reference) pairs in one batch.
+
+    Each pending item carries project / relative_cbl / prog_id / mode plus
+    the "pred" and "ref" texts; the returned rows follow PER_FILE_FIELDS.
+    """
+    if not pending:
+        return []
+
+    scores = score_corpus(
+        [item["pred"] for item in pending],
+        [item["ref"] for item in pending],
+    )
+    rows: List[Dict[str, object]] = []
+    for i, item in enumerate(pending):
+        row: Dict[str, object] = {
+            "project": item["project"],
+            "relative_cbl": item["relative_cbl"],
+            "prog_id": item["prog_id"],
+            "mode": item["mode"],
+        }
+        for name in METRIC_NAMES:
+            row[name] = float(scores[name][i])
+        rows.append(row)
+    return rows
+
+
+def write_eval_outputs(
+    per_file_rows: List[Dict[str, object]],
+    per_file_csv: Path,
+    per_project_csv: Path,
+) -> None:
+    """Write per-file + per-project CSVs and print global per-mode averages."""
+    if per_file_rows:
+        per_file_csv.parent.mkdir(parents=True, exist_ok=True)
+        with per_file_csv.open("w", encoding="utf-8", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=PER_FILE_FIELDS)
+            writer.writeheader()
+            writer.writerows(per_file_rows)
+        print(f"\n[OUT] Per-file metrics -> {per_file_csv}")
+
+    project_stats: Dict[str, Dict[str, List[Dict[str, object]]]] = defaultdict(
+        lambda: defaultdict(list)
+    )
+    global_stats: Dict[str, List[float]] = defaultdict(lambda: [0.0, 0])
+    for row in per_file_rows:
+        project_stats[row["project"]][row["mode"]].append(row)
+        global_stats[row["mode"]][0] += row["rouge1_f1"]
+        global_stats[row["mode"]][1] += 1
+
+    # Per-project summary CSV
+    project_rows: List[Dict[str, object]] = []
+    for project, mode_dict in project_stats.items():
+        for mode, rows in mode_dict.items():
+            if not rows:
+                continue
+            out: Dict[str, object] = {"project": project, "mode": mode}
+            for name in METRIC_NAMES:
+                out[f"avg_{name}"] = sum(r[name] for r in rows) / len(rows)
+            out["n_files"] = len(rows)
+            project_rows.append(out)
+    if project_rows:
+        per_project_csv.parent.mkdir(parents=True, exist_ok=True)
+        with per_project_csv.open("w", encoding="utf-8", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=PER_PROJECT_FIELDS)
+            writer.writeheader()
+            writer.writerows(project_rows)
+        print(f"[OUT] Per-project metrics -> {per_project_csv}")
+
+    # Global aggregates
+    if global_stats:
+        print("\n[GLOBAL] ROUGE-1 F1 averages over ALL projects/files:")
+        for mode, (total, count) in global_stats.items():
+            avg = total / count if count else 0.0
+            print(f"  {mode:20s}: {avg:0.4f}  (n={count})")
 
 
 # ---------------------------------------------------------------------------
 # 6) Main driver
 # ---------------------------------------------------------------------------
 
+def resolve_prog_out_dir(output_root: Path, project: str, prog: str) -> Path:
+    """Match run_all_projects_static.py's layout (or older ones)."""
+    candidates = [
+        output_root / project / f"COBOL_{prog}",
+        output_root / f"COBOL_{prog}",
+        output_root / project / prog,
+    ]
+    for cand in candidates:
+        if cand.is_dir():
+            return cand
+    print(
+        f"[WARN] No existing output dir found for {prog}. "
+        f"Expected one of: {[str(c) for c in candidates]}"
+    )
+    return candidates[0]
+
+
+def build_br_index(prog: str, prog_out_dir: Path, journal: PipelineJournal | None = None) -> bool:
+    """
+    Step 2 unless journalled from the current static outputs; the outcome
+    (done / failed) is journalled.
+    """
+    inputs = static_fingerprint(prog_out_dir) if journal is not None else None
+    if journal is not None and journal.is_done(prog, "br_index", inputs=inputs):
+        print(f"[JOURNAL] {prog}: BR JSON / ProgramIndex / BR_REP already built")
+        return True
+    with span("br_index", prog=prog) as sp:
+        ok = run_br_and_index_pipeline(prog, prog_out_dir, env=sp.env())
+        if not ok:
+            sp.fail("BR JSON / ProgramIndex / BR_REP incomplete")
+    if journal is not None:
+        journal.record(
+            prog, "br_index", status="done" if ok else "failed",
+            path=prog_out_dir / "INDEX" / f"ProgramIndex_{prog}.json", inputs=inputs,
+        )
+    return ok
+
+
+def build_prompts(
+    prog: str,
+    prog_out_dir: Path,
+    modes: List[str],
+    journal: PipelineJournal | None = None,
+) -> None:
+    """Step 3 (BR_PROMPTS/<mode>/ files) for the modes not yet journalled."""
+    if journal is None:
+        build_prompts_for_program(prog, prog_out_dir, modes)
+        return
+    inputs = static_fingerprint(prog_out_dir)
+    todo = [mode for mode in modes if not journal.is_done(prog, "prompts", mode, inputs=inputs)]
+    if len(todo) < len(modes):
+        built = [mode for mode in modes if mode not in todo]
+        print(f"[JOURNAL] {prog}: prompts already built for {built}")
+    if not todo:
+        return
+    build_prompts_for_program(prog, prog_out_dir, todo)
+    for mode in todo:
+        journal.record(prog, "prompts", mode, path=prog_out_dir / "BR_PROMPTS" / mode,
+                       inputs=inputs)
+
+
+def record_program_done(
+    prog: str,
+    prog_out_dir: Path,
+    modes: List[str],
+    journal: PipelineJournal,
+) -> None:
+    """Journal the program once every requested mode has its file-level summary."""
+    if all(journal.is_done(prog, "file", mode) for mode in modes):
+        journal.record(prog, "program", path=prog_out_dir, modes=sorted(modes),
+                       inputs=static_fingerprint(prog_out_dir))
+
+
+def journalled_program_dir(prog: str, modes: List[str], journal: PipelineJournal) -> Path | None:
+    """
+    The output dir of a program whose stages are all journalled for `modes`
+    from its current static outputs, else None (the program must be run).
+    """
+    rec = journal.get(prog, "program")
+    if rec is None or not rec.get("path"):
+        return None
+    prog_out_dir = Path(rec["path"])
+    if not journal.is_done(prog, "program", inputs=static_fingerprint(prog_out_dir)):
+        return None
+    if not all(journal.is_done(prog, "file", mode) for mode in modes):
+        return None
+    return prog_out_dir
+
+
+def run_program_stages(
+    prog: str,
+    cbl_path: Path,
+    prog_out_dir: Path,
+    args: argparse.Namespace,
+    journal: PipelineJournal | None = None,
+) -> None:
+    """Steps 2-5 for one program; journalled stages are not re-run."""
+    # 2) BR JSON + ProgramIndex + BR_REP
+    #    Best-effort: even if this fails or produces no BR_REP,
+    #    we will still fall back to "whole file" summarisation.
+    build_br_index(prog, prog_out_dir, journal)
+
+    # 3) Mocktail prompts (also best-effort; may produce nothing)
+    prompt_stream = None
+    if args.stream_prompts:
+        try:
+            prompt_stream = iter_prompts_for_program(prog, prog_out_dir, args.modes)
+        except FileNotFoundError as e:
+            print(f"[PROMPTS][WARN] {e}")
+    else:
+        build_prompts(prog, prog_out_dir, args.modes, journal)
+
+    # 4) Rule-level summaries (with COBOL fallback when no prompts exist)
+    with span("llm.rule_level", prog=prog):
+        generate_rule_level_summaries_for_program(
+            prog=prog,
+            prog_out_dir=prog_out_dir,
+            modes=args.modes,
+            model=args.model,
+            cobol_file=cbl_path,
+            overwrite=args.overwrite_llm,
+            prompt_stream=prompt_stream,
+            journal=journal,
+        )
+
+    # 5) File-level summaries
+    with span("llm.file_level", prog=prog):
+        generate_file_level_summaries_for_program(
+            prog=prog,
+            prog_out_dir=prog_out_dir,
+            modes=args.modes,
+            model=args.model,
+            overwrite=args.overwrite_llm,
+            journal=journal,
+        )
+
+
+# LLM queue order under --pipeline: ready merges first, then rules by program
+_FILE_TASK, _RULE_TASK = 0, 1
+
+
+@dataclass
+class _PipelinedProgram:
+    idx: int
+    project: str
+    prog: str
+    cbl_path: Path
+    prog_out_dir: Path
+    journal: PipelineJournal | None
+    llm_profile: ProfileAggregate
+    rules_left: Dict[str, int] = field(default_factory=dict)
+    merges_left: int = 0
+
+
+def run_programs_pipelined(
+    work: List[Tuple[str, str, Path, Path]],
+    args: argparse.Namespace,
+    journal: PipelineJournal | None = None,
+) -> None:
+    """
+    Steps 2-5 for (project, prog, cbl_path, prog_out_dir) items, overlapped
+    across programs (--pipeline):
+
+      - BR/index + prompts run on a CPU pool, in program order;
+      - rule summaries queue for the LLM pool behind earlier programs' work;
+      - a mode's file-level merge is queued, ahead of every rule, as soon
+        as that mode's last rule summary lands.
+
+    At most --pipeline-depth programs are between "prepare started" and
+    "last merge done", so preparation runs just far enough ahead to keep
+    the LLM busy.
+    """
+    sched = StageScheduler(args.cpu_workers, args.llm_workers)
+    in_flight = threading.BoundedSemaphore(args.pipeline_depth)
+    lock = threading.Lock()
+
+    def finish(pp: _PipelinedProgram) -> None:
+        if pp.journal:
+            record_program_done(pp.prog, pp.prog_out_dir, args.modes, pp.journal)
+        pp.llm_profile.write()
+        print(f"[PIPELINE] {pp.project}/{pp.prog} done")
+        in_flight.release()
+
+    # profiles are taken in the worker threads (cProfile and the sampler only
+    # see the thread they were started in); a program's rule and file
+    # summaries add up into one pipeline_llm profile, written by finish()
+    def merge(pp: _PipelinedProgram, mode: str) -> None:
+        try:
+            with span("llm.file_level", prog=pp.prog, mode=mode), pp.llm_profile.block():
+                generate_file_level_summaries_for_program(
+                    pp.prog, pp.prog_out_dir, [mode], args.model,
+                    overwrite=args.overwrite_llm, journal=pp.journal,
+                )
+        finally:
+            with lock:
+                pp.merges_left -= 1
+                last = pp.merges_left == 0
+            if last:
+                finish(pp)
+
+    def summarise(pp: _PipelinedProgram, mode: str, br_safe: str, prompt_path: Path,
+                  out_path: Path) -> None:
+        try:
+            with pp.llm_profile.block():
+                prompt = prompt_path.read_text(encoding="utf-8")
+                _summarise_rule_prompt(pp.prog, br_safe, mode, prompt, args.model, out_path,
+                                       pp.journal)
+        finally:
+            with lock:
+                pp.rules_left[mode] -= 1
+                last = pp.rules_left[mode] == 0
+            if last:
+                sched.submit_llm((_FILE_TASK, pp.idx), merge, pp, mode)
+
+    def prepare(pp: _PipelinedProgram) -> None:
+        try:
+            with span("prepare", prog=pp.prog, project=pp.project), \
+                    profiled(pp.prog_out_dir, "pipeline_prepare"):
+                build_br_index(pp.prog, pp.prog_out_dir, pp.journal)
+                build_prompts(pp.prog, pp.prog_out_dir, args.modes, pp.journal)
+                cobol_source = read_cobol_source(pp.prog, pp.cbl_path)
+                plan: Dict[str, List[Tuple[str, Path, Path]]] = {}
+                for mode in args.modes:
+                    entries = rule_prompt_entries(pp.prog, pp.prog_out_dir, mode, cobol_source,
+                                                  args.overwrite_llm)
+                    if not entries:
+                        print(f"[RULE][WARN] No prompts for {pp.prog} mode={mode}")
+                        continue
+                    mode_out = pp.prog_out_dir / "LLM" / "rule_level" / mode
+                    mode_out.mkdir(parents=True, exist_ok=True)
+                    plan[mode] = []
+                    for br_safe, prompt_path in entries:
+                        out_path = mode_out / f"RULE_SUMMARY_{pp.prog}_{br_safe}_{mode}.txt"
+                        prompt = prompt_path.read_text(encoding="utf-8")
+                        if args.overwrite_llm or not _output_done(
+                                pp.journal, pp.prog, "rule", mode, br_safe, out_path,
+                                sha256_text(prompt)):
+                            plan[mode].append((br_safe, prompt_path, out_path))
+                    print(f"[RULE] {pp.prog} mode={mode} prompts={len(entries)} "
+                          f"queued={len(plan[mode])}")
+        except BaseException:
+            in_flight.release()
+            raise
+
+        pp.merges_left = len(plan)
+        pp.rules_left = {mode: len(todo) for mode, todo in plan.items()}
+        if not plan:
+            finish(pp)
+        for mode, todo in plan.items():
+            if not todo:
+                sched.submit_llm((_FILE_TASK, pp.idx), merge, pp, mode)
+            for br_safe, prompt_path, out_path in todo:
+                sched.submit_llm((_RULE_TASK, pp.idx), summarise, pp, mode, br_safe,
+                                 prompt_path, out_path)
+
+    for idx, (project, prog, cbl_path, prog_out_dir) in enumerate(work):
+        in_flight.acquire()
+        prog_journal = journal.scope(project) if journal is not None else None
+        sched.submit_cpu(prepare, _PipelinedProgram(
+            idx, project, prog, cbl_path, prog_out_dir, prog_journal,
+            ProfileAggregate(prog_out_dir, "pipeline_llm"),
+        ))
+    sched.wait()
+    sched.close()
+    sched.report()
+
+
 def main(argv: List[str] | None = None) -> None:
     parser = argparse.ArgumentParser(
         description="End-to-end: static + mocktail + Ollama + evaluation for all COBOL files."
@@ -642,6 +1146,46 @@ def main(argv: List[str] | None = None) -> None:
         action="store_true",
         help="Re-run Ollama even if summaries already exist.",
     )
+    parser.add_argument(
+        "--stream-prompts",
+        action="store_true",
+        help="Feed mocktail prompts straight from BR_REP to Ollama "
+             "instead of writing BR_PROMPTS/ files first.",
+    )
+    parser.add_argument(
+        "--pipeline",
+        action="store_true",
+        help="Overlap stages across programs: build the next programs' BR_REP "
+             "and prompts while the LLM summarises, and merge each program's "
+             "file-level summaries as soon as its rules are done.",
+    )
+    parser.add_argument(
+        "--pipeline-depth",
+        type=int,
+        default=3,
+        help="--pipeline: programs in flight at once (default: 3)",
+    )
+    parser.add_argument(
+        "--cpu-workers",
+        type=int,
+        default=2,
+        help="--pipeline: threads for BR/index + prompt builds (default: 2)",
+    )
+    parser.add_argument(
+        "--llm-workers",
+        type=int,
+        default=1,
+        help="--pipeline: concurrent LLM requests (default: 1; raise it "
+             "together with OLLAMA_NUM_PARALLEL)",
+    )
+    parser.add_argument(
+        "--llm-concurrency",
+        type=policy_arg,
+        default=None,
+        help="In-flight Ollama requests per model: N, or adaptive[:MAX] to let "
+             "an AIMD controller find the server's capacity below --llm-workers "
+             "(default: $COBREX_LLM_CONCURRENCY or off)",
+    )
     parser.add_argument(
         "--per-file-csv",
         type=Path,
@@ -654,20 +1198,79 @@ def main(argv: List[str] | None = None) -> None:
         default=Path("data/eval_per_project.csv"),
         help="Where to write per-project metrics CSV.",
     )
+    parser.add_argument(
+        "--skip-eval",
+        action="store_true",
+        help="Only generate summaries; score later with score_summaries.py.",
+    )
+    parser.add_argument(
+        "--journal",
+        type=Path,
+        default=None,
+        help=f"Checkpoint journal (default: <output-root>/{JOURNAL_NAME}); "
+             "finished stages, summaries and programs are not redone on restart",
+    )
+    parser.add_argument(
+        "--no-journal",
+        action="store_true",
+        help="Resume by 'output file exists' only, as before the journal.",
+    )
+    parser.add_argument(
+        "--verify-journal",
+        action="store_true",
+        help="Re-hash journalled summaries; redo any that changed or vanished.",
+    )
+    parser.add_argument(
+        "--adopt-existing",
+        action="store_true",
+        help="Journal summaries left by runs without a journal instead of "
+             "regenerating them (they may be truncated by an old crash).",
+    )
+    parser.add_argument(
+        "--trace",
+        type=Path,
+        default=None,
+        help="Append per-program, per-stage and per-LLM-call timing spans "
+             "to this file (summarise with `python tracing.py summary FILE`)",
+    )
+    parser.add_argument(
+        "--trace-format",
+        choices=TRACE_FORMATS,
+        default="jsonl",
+        help="Trace file format: jsonl (default) or chrome (chrome://tracing, Perfetto)",
+    )
+    add_profile_argument(parser)
 
     args = parser.parse_args(argv)
+    if args.pipeline and args.stream_prompts:
+        parser.error("--stream-prompts cannot be combined with --pipeline")
+    if args.trace is not None:
+        enable_tracing(args.trace, args.trace_format)
+    # also inherited by the summarizer.program_index subprocesses
+    set_profile_modes(args.profile)
+    set_llm_concurrency(args.llm_concurrency)
 
     # Load references
-    csv_refs = load_references_from_csv(args.ref_csv)
-    human_refs = load_human_generated_refs(args.human_ref_root)
-    all_refs = merge_references(csv_refs, human_refs)
+    all_refs: Dict[str, str] = {}
+    if not args.skip_eval:
+        csv_refs = load_references_from_csv(args.ref_csv)
+        human_refs = load_human_generated_refs(args.human_ref_root)
+        all_refs = merge_references(csv_refs, human_refs)
+
+    journal = None
+    if not args.no_journal:
+        journal = PipelineJournal(
+            args.journal or args.output_root / JOURNAL_NAME,
+            verify=args.verify_journal,
+            adopt_existing=args.adopt_existing,
+        )
 
-    # For aggregations
-    per_file_rows: List[Dict[str, object]] = []
-    project_stats: Dict[str, Dict[str, List[float]]] = defaultdict(
-        lambda: defaultdict(list)
-    )
-    global_stats: Dict[str, List[float]] = defaultdict(lambda: [0.0, 0])
+    # (summary, reference) pairs, scored in one batch after the main loop
+    pending: List[Dict[str, str]] = []
+    # programs with static outputs, evaluated after the loop
+    programs: List[Tuple[str, Path, str, str, Path]] = []
+    # --pipeline: programs whose stages run after the loop, overlapped
+    pipelined: List[Tuple[str, str, Path, Path]] = []
 
     # Main loop
     for project, cbl_path in discover_cobol_files(args.projects_root):
@@ -675,144 +1278,97 @@ def main(argv: List[str] | None = None) -> None:
         rel_key = "/".join(rel_cbl.parts)  # e.g. IBM_example-health-apis/HCAPDB01.cbl
         prog = program_id_for_file(project, cbl_path, args.projects_root)
 
-        # ------------------------------------------------------------------
-        # Resolve prog_out_dir to match run_all_projects_static.py layout
-        # ------------------------------------------------------------------
-        candidates = [
-            args.output_root / project / f"COBOL_{prog}",
-            args.output_root / f"COBOL_{prog}",
-            args.output_root / project / prog,
-        ]
-        prog_out_dir = None
-        for cand in candidates:
-            if cand.is_dir():
-                prog_out_dir = cand
-                break
-        if prog_out_dir is None:
-            prog_out_dir = candidates[0]
-            print(
-                f"[WARN] No existing output dir found for {prog}. "
-                f"Expected one of: {[str(c) for c in candidates]}"
-            )
-
-        print("\n==============================")
-        print(f"[FILE] Project={project} COBOL={rel_key}  prog={prog}")
-        print(f"[FILE] Using prog_out_dir={prog_out_dir}")
-
-        # 1) Static + graphs (reusing outputs from run_all_projects_static.py)
-        if not ensure_static_pipeline_for_program(prog, cbl_path, prog_out_dir):
-            # Skip this file
-            continue
-
-        # 2) BR JSON + ProgramIndex + BR_REP
-        #    Best-effort: even if this fails or produces no BR_REP,
-        #    we will still fall back to "whole file" summarisation.
-        run_br_and_index_pipeline(prog, prog_out_dir)
-
-        # 3) Mocktail prompts (also best-effort; may produce nothing)
-        build_prompts_for_program(prog, prog_out_dir, args.modes)
-
-        # 4) Rule-level summaries (with COBOL fallback when no prompts exist)
-        generate_rule_level_summaries_for_program(
-            prog=prog,
-            prog_out_dir=prog_out_dir,
-            modes=args.modes,
-            model=args.model,
-            cobol_file=cbl_path,
-            overwrite=args.overwrite_llm,
-        )
-
-        # 5) File-level summaries
-        generate_file_level_summaries_for_program(
-            prog=prog,
-            prog_out_dir=prog_out_dir,
-            modes=args.modes,
-            model=args.model,
-            overwrite=args.overwrite_llm,
-        )
-
-        # 6) Evaluation (if reference exists)
-        ref_text = all_refs.get(rel_key)
+        # program names are only unique within a project
+        prog_journal = journal.scope(project) if journal is not None else None
+        done_dir = None
+        if prog_journal and not (args.overwrite_llm or args.verify_journal):
+            done_dir = journalled_program_dir(prog, args.modes, prog_journal)
+        if done_dir is not None:
+            # Every stage journalled for these modes: straight to evaluation
+            prog_out_dir = done_dir
+            print(f"[JOURNAL] {rel_key}: all stages done → {prog_out_dir}")
+        else:
+            prog_out_dir = resolve_prog_out_dir(args.output_root, project, prog)
 
-        # extra fallback: try just the filename
-        if not ref_text:
-            basename = cbl_path.name
-            ref_text = all_refs.get(basename)
+            print("\n==============================")
+            print(f"[FILE] Project={project} COBOL={rel_key}  prog={prog}")
+            print(f"[FILE] Using prog_out_dir={prog_out_dir}")
 
-        if not ref_text:
-            print(
-                f"[EVAL][WARN] No reference found for {rel_key} "
-                f"(or {cbl_path.name}), skipping evaluation"
-            )
-            continue
-
-        llm_root = prog_out_dir / "LLM" / "file_level"
-        for mode in args.modes:
-            summary_path = llm_root / f"FILE_SUMMARY_{prog}_{mode}.txt"
-            if not summary_path.is_file():
-                print(f"[EVAL][WARN] Missing file summary for {prog} mode={mode}")
+            # 1) Static + graphs (reusing outputs from run_all_projects_static.py)
+            if not ensure_static_pipeline_for_program(prog, cbl_path, prog_out_dir):
+                # Skip this file
                 continue
-            pred = summary_path.read_text(encoding="utf-8")
-            score = rouge1_f1(pred, ref_text)
-
-            per_file_rows.append(
-                {
-                    "project": project,
-                    "relative_cbl": rel_key,
-                    "prog_id": prog,
-                    "mode": mode,
-                    "rouge1_f1": score,
-                }
-            )
-
-            project_stats[project][mode].append(score)
-            global_stats[mode][0] += score
-            global_stats[mode][1] += 1
-
-    # Write per-file CSV
-    if per_file_rows:
-        args.per_file_csv.parent.mkdir(parents=True, exist_ok=True)
-        with args.per_file_csv.open("w", encoding="utf-8", newline="") as f:
-            writer = csv.DictWriter(
-                f,
-                fieldnames=["project", "relative_cbl", "prog_id", "mode", "rouge1_f1"],
-            )
-            writer.writeheader()
-            writer.writerows(per_file_rows)
-        print(f"\n[OUT] Per-file metrics -> {args.per_file_csv}")
 
-    # Per-project summary CSV
-    project_rows: List[Dict[str, object]] = []
-    for project, mode_dict in project_stats.items():
-        for mode, scores in mode_dict.items():
-            if not scores:
+            if args.pipeline:
+                pipelined.append((project, prog, cbl_path, prog_out_dir))
+            else:
+                with span("program", prog=prog, project=project), \
+                        profiled(prog_out_dir, "pipeline"):
+                    run_program_stages(prog, cbl_path, prog_out_dir, args, prog_journal)
+
+                if prog_journal:
+                    record_program_done(prog, prog_out_dir, args.modes, prog_journal)
+
+        programs.append((project, cbl_path, rel_key, prog, prog_out_dir))
+
+    if pipelined:
+        print(f"\n[PIPELINE] {len(pipelined)} program(s), depth={args.pipeline_depth}, "
+              f"cpu_workers={args.cpu_workers}, llm_workers={args.llm_workers}")
+        run_programs_pipelined(pipelined, args, journal)
+
+    # per-model in-flight limits, sequential or --pipeline
+    report_concurrency()
+
+    # 6) Evaluation (if reference exists)
+    if not args.skip_eval:
+        for project, cbl_path, rel_key, prog, prog_out_dir in programs:
+            ref_text = all_refs.get(rel_key)
+
+            # extra fallback: try just the filename
+            if not ref_text:
+                basename = cbl_path.name
+                ref_text = all_refs.get(basename)
+
+            if not ref_text:
+                print(
+                    f"[EVAL][WARN] No reference found for {rel_key} "
+                    f"(or {cbl_path.name}), skipping evaluation"
+                )
                 continue
-            avg = sum(scores) / len(scores)
-            project_rows.append(
-                {
-                    "project": project,
-                    "mode": mode,
-                    "avg_rouge1_f1": avg,
-                    "n_files": len(scores),
-                }
-            )
-    if project_rows:
-        args.per_project_csv.parent.mkdir(parents=True, exist_ok=True)
-        with args.per_project_csv.open("w", encoding="utf-8", newline="") as f:
-            writer = csv.DictWriter(
-                f,
-                fieldnames=["project", "mode", "avg_rouge1_f1", "n_files"],
-            )
-            writer.writeheader()
-            writer.writerows(project_rows)
-        print(f"[OUT] Per-project metrics -> {args.per_project_csv}")
 
-    # Global aggregates
-    if global_stats:
-        print("\n[GLOBAL] Averages over ALL projects/files:")
-        for mode, (total, count) in global_stats.items():
-            avg = total / count if count else 0.0
-            print(f"  {mode:20s}: {avg:0.4f}  (n={count})")
+            llm_root = prog_out_dir / "LLM" / "file_level"
+            for mode in args.modes:
+                summary_path = llm_root / f"FILE_SUMMARY_{prog}_{mode}.txt"
+                if not summary_path.is_file():
+                    print(f"[EVAL][WARN] Missing file summary for {prog} mode={mode}")
+                    continue
+                pending.append(
+                    {
+                        "project": project,
+                        "relative_cbl": rel_key,
+                        "prog_id": prog,
+                        "mode": mode,
+                        "pred": summary_path.read_text(encoding="utf-8"),
+                        "ref": ref_text,
+                    }
+                )
+
+    # per-request sidecars written by the LLM stages, this run and earlier ones
+    print("\n[TELEMETRY] LLM requests under", args.output_root)
+    report_telemetry([args.output_root], out_csv=args.output_root / "llm_telemetry.csv")
+
+    if profile_modes():
+        print("\n[PROFILE] Corpus-wide hot spots (python profiling.py merge for more):")
+        merge_profiles([args.output_root], top=20)
+
+    if args.skip_eval:
+        print("\n[EVAL] Skipped; run score_summaries.py to score file-level summaries.")
+        return
+
+    with span("evaluate") as sp:
+        per_file_rows = score_file_summaries(pending)
+        sp.count(summaries=len(per_file_rows))
+    write_eval_outputs(per_file_rows, args.per_file_csv, args.per_project_csv)
 
 
 if __name__ == "__main__":
@@ -26,7 +26,9 @@ It does three things:
 
 3) LLM-as-a-Judge evaluation (file level)
    For each mode, ask a Judge LLM to score the file-level summary
-   against a human reference explanation.
+   against a human reference explanation. `judge-all` scores every
+   (program, mode) pair under an output root concurrently, caches
+   judgments and writes one consolidated CSV.
 
 You can adapt model names and paths as needed.
 """
@@ -34,13 +36,20 @@ You can adapt model names and paths as needed.
 from __future__ import annotations
 
 import argparse
+import csv
+import hashlib
 import json
+import math
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 
 from mocktail.mocktail_config import DEFAULT_MOCKTAIL_MODES
-from local_llm_client import call_llm
+from llm_concurrency import policy_arg, report as report_concurrency, set_llm_concurrency
+from llm_telemetry import write_telemetry
+from local_llm_client import call_llm, call_llm_with_stats, report_endpoints, set_llm_endpoints
 
 
 # ---------------------------------------------------------------------------
@@ -148,8 +157,10 @@ def generate_rule_level_summaries(
                 continue
 
             print(f"  [LLM] {entry.path.name} -> {out_path.name}")
-            summary = call_llm(code_model, prompt_text)
+            summary, stats = call_llm_with_stats(code_model, prompt_text)
             out_path.write_text(summary, encoding="utf-8")
+            write_telemetry(out_path, stats, program=prog, mode=mode, level="rule",
+                            unit=entry.unit_id)
 
 
 # ---------------------------------------------------------------------------
@@ -250,27 +261,36 @@ def generate_file_level_summaries(
             continue
 
         print(f"[file_summaries] Mode={mode}, {len(rule_summaries)} rules -> {out_path.name}")
-        summary_text = call_llm(text_model, prompt)
+        summary_text, stats = call_llm_with_stats(text_model, prompt)
         out_path.write_text(summary_text, encoding="utf-8")
+        write_telemetry(out_path, stats, program=prog, mode=mode, level="file", unit="FILE")
 
 
 # ---------------------------------------------------------------------------
 # 3) LLM-as-a-Judge evaluation (file level)
 # ---------------------------------------------------------------------------
 
+JUDGE_KEYS = ("purpose", "functionality", "clarity", "overall")
+# run_judge writes the judgment cache after this many new judgments
+CACHE_SAVE_EVERY = 10
+
 
 def build_judge_prompt(reference: str, candidate: str, mode: str) -> str:
     """Build a prompt for the Judge LLM.
 
     We compare a candidate file-level explanation against a human-written
     reference explanation. The judge must output strict JSON so we can parse it.
+
+    Everything up to and including the reference is independent of the mode,
+    so consecutive judgments of one program share a prompt prefix that the
+    server can keep in its KV cache instead of re-reading the reference.
     """
 
     return f"""You are an expert COBOL documentation reviewer.
 
 You will be given two texts:
   1) A *reference* explanation for a COBOL program (written by a human).
-  2) A *candidate* explanation generated by a model using configuration '{mode}'.
+  2) A *candidate* explanation generated by a model.
 
 Your job is to evaluate how good the candidate explanation is compared to the
 reference along the following dimensions (each 0–10, higher is better):
@@ -291,13 +311,235 @@ Reference explanation:
 {reference.strip()}
 </Reference>
 
-Candidate explanation:
+Candidate explanation (configuration '{mode}'):
 <Candidate>
 {candidate.strip()}
 </Candidate>
 """
 
 
+def parse_judge_scores(raw: str) -> Dict[str, float]:
+    """Parse a judge answer into {key: float} for JUDGE_KEYS.
+
+    Raises ValueError if no JSON object can be recovered from `raw`, or if
+    any of JUDGE_KEYS is missing or not a number (so the item is retried
+    and never cached).
+    """
+
+    try:
+        scores = json.loads(raw)
+    except json.JSONDecodeError:
+        # Try to recover if the model added text around JSON
+        try:
+            start = raw.index("{")
+            end = raw.rindex("}") + 1
+            scores = json.loads(raw[start:end])
+        except Exception as e:
+            raise ValueError(f"Could not parse judge JSON: {e}\nRaw: {raw}")
+
+    if not isinstance(scores, dict):
+        raise ValueError(f"Judge JSON is not an object: {raw}")
+
+    # Normalise to floats and keep only expected keys
+    cleaned: Dict[str, float] = {}
+    bad: List[str] = []
+    for key in JUDGE_KEYS:
+        value = scores.get(key)
+        try:
+            if isinstance(value, bool):
+                raise TypeError(value)
+            cleaned[key] = float(value)
+        except (TypeError, ValueError):
+            bad.append(key)
+            continue
+        if math.isnan(cleaned[key]):
+            bad.append(key)
+    if bad:
+        raise ValueError(f"Judge JSON lacks numeric {', '.join(bad)}: {raw}")
+    return cleaned
+
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class JudgeItem:
+    prog: str
+    mode: str
+    reference: str
+    candidate: str
+
+    def cache_key(self, judge_model: str) -> str:
+        """(judge model, reference hash, candidate hash) as one string key."""
+        return f"{judge_model}|{_sha256(self.reference.strip())}|{_sha256(self.candidate.strip())}"
+
+
+@dataclass
+class JudgeResult:
+    prog: str
+    mode: str
+    scores: Dict[str, Optional[float]]
+    status: str  # "ok" | "cached" | "failed"
+    attempts: int = 0
+    error: str = ""
+
+
+class JudgeCache:
+    """JSON file of cache_key -> parsed scores, shared by all judge workers."""
+
+    def __init__(self, path: Optional[Path]):
+        self.path = path
+        self._lock = threading.Lock()
+        self._data: Dict[str, Dict[str, Optional[float]]] = {}
+        if path is not None and path.is_file():
+            try:
+                self._data = json.loads(path.read_text(encoding="utf-8"))
+            except json.JSONDecodeError:
+                print(f"[judge] WARNING: ignoring unreadable cache {path}")
+
+    def get(self, key: str) -> Optional[Dict[str, Optional[float]]]:
+        with self._lock:
+            return self._data.get(key)
+
+    def put(self, key: str, scores: Dict[str, Optional[float]]) -> None:
+        with self._lock:
+            self._data[key] = scores
+
+    def save(self) -> None:
+        if self.path is None:
+            return
+        with self._lock:
+            payload = json.dumps(self._data, indent=2, sort_keys=True)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp.write_text(payload, encoding="utf-8")
+        tmp.replace(self.path)
+
+
+def _judge_one(item: JudgeItem, judge_model: str) -> Dict[str, Optional[float]]:
+    prompt = build_judge_prompt(item.reference, item.candidate, item.mode)
+    raw = call_llm(judge_model, prompt, format="json")
+    return parse_judge_scores(raw)
+
+
+def run_judge(
+    items: List[JudgeItem],
+    judge_model: str,
+    cache: JudgeCache,
+    workers: int = 4,
+    max_attempts: int = 3,
+) -> List[JudgeResult]:
+    """Judge all items with a bounded thread pool.
+
+    Cached items are answered without calling the model. The remaining items
+    are judged concurrently (at most `workers` requests in flight); items that
+    fail (HTTP error or unparseable JSON) are re-submitted, and only those, up
+    to `max_attempts` times. Results come back in the order of `items`.
+    """
+
+    if max_attempts < 1:
+        raise ValueError(f"max_attempts must be at least 1, got {max_attempts}")
+
+    results: Dict[int, JudgeResult] = {}
+    pending: List[int] = []
+
+    for idx, item in enumerate(items):
+        hit = cache.get(item.cache_key(judge_model))
+        # entries cached before incomplete answers counted as failures may lack scores
+        if hit is not None and all(hit.get(k) is not None for k in JUDGE_KEYS):
+            results[idx] = JudgeResult(item.prog, item.mode, hit, status="cached")
+        else:
+            pending.append(idx)
+
+    print(
+        f"[judge] {len(items)} items: {len(items) - len(pending)} cached, "
+        f"{len(pending)} to judge with {judge_model} (workers={workers})"
+    )
+
+    attempt = 0
+    unsaved = 0
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        while pending and attempt < max_attempts:
+            attempt += 1
+            futures = {pool.submit(_judge_one, items[idx], judge_model): idx for idx in pending}
+            failed: List[int] = []
+            for fut in as_completed(futures):
+                idx = futures[fut]
+                item = items[idx]
+                try:
+                    scores = fut.result()
+                except Exception as e:
+                    failed.append(idx)
+                    results[idx] = JudgeResult(
+                        item.prog,
+                        item.mode,
+                        {k: None for k in JUDGE_KEYS},
+                        status="failed",
+                        attempts=attempt,
+                        error=str(e).splitlines()[0] if str(e) else type(e).__name__,
+                    )
+                    continue
+                cache.put(item.cache_key(judge_model), scores)
+                unsaved += 1
+                if unsaved >= CACHE_SAVE_EVERY:
+                    # a crash keeps all but the last few judgments
+                    cache.save()
+                    unsaved = 0
+                results[idx] = JudgeResult(item.prog, item.mode, scores, status="ok", attempts=attempt)
+                print(f"[judge] {item.prog} mode={item.mode} overall={scores.get('overall')}")
+
+            if failed:
+                print(f"[judge] attempt {attempt}: {len(failed)} item(s) failed")
+            pending = sorted(failed)
+
+    cache.save()
+    for idx in pending:
+        res = results[idx]
+        print(f"[judge] WARNING: giving up on {res.prog} mode={res.mode}: {res.error}")
+
+    return [results[idx] for idx in range(len(items))]
+
+
+def collect_judge_items(
+    prog: str,
+    file_summaries_root: Path,
+    reference: str,
+    modes: List[str],
+) -> List[JudgeItem]:
+    """One JudgeItem per mode that has a file-level summary on disk."""
+
+    items: List[JudgeItem] = []
+    for mode in modes:
+        path = file_summaries_root / "file_level" / f"FILE_SUMMARY_{prog}_{mode}.txt"
+        if not path.is_file():
+            print(f"[judge] WARNING: missing file-level summary for {prog} mode={mode}: {path}")
+            continue
+        items.append(JudgeItem(prog, mode, reference, path.read_text(encoding="utf-8")))
+    return items
+
+
+def write_judge_table(results: List[JudgeResult], out_csv: Path) -> None:
+    """One consolidated row per (program, mode)."""
+
+    out_csv.parent.mkdir(parents=True, exist_ok=True)
+    with out_csv.open("w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["prog", "mode", *JUDGE_KEYS, "status", "attempts", "error"])
+        for res in sorted(results, key=lambda r: (r.prog, r.mode)):
+            writer.writerow(
+                [
+                    res.prog,
+                    res.mode,
+                    *("" if res.scores.get(k) is None else res.scores[k] for k in JUDGE_KEYS),
+                    res.status,
+                    res.attempts,
+                    res.error,
+                ]
+            )
+    print(f"[judge] Consolidated table written to {out_csv}")
+
+
 def evaluate_file_level_summaries(
     prog: str,
     file_summaries_root: Path,
@@ -305,6 +547,9 @@ def evaluate_file_level_summaries(
     modes: List[str],
     judge_model: str,
     out_json: Path,
+    workers: int = 4,
+    cache_path: Optional[Path] = None,
+    max_attempts: int = 3,
 ) -> None:
     """Run LLM-as-a-Judge on each mode's file-level summary.
 
@@ -316,47 +561,18 @@ def evaluate_file_level_summaries(
           ...
         }
       }
+
+    Modes whose judgment still fails after retries are left out.
     """
 
     reference = reference_path.read_text(encoding="utf-8")
+    items = collect_judge_items(prog, file_summaries_root, reference, modes)
+    cache = JudgeCache(cache_path)
 
-    result: Dict[str, Dict[str, float]] = {}
-
-    for mode in modes:
-        path = file_summaries_root / "file_level" / f"FILE_SUMMARY_{prog}_{mode}.txt"
-        if not path.is_file():
-            print(f"[judge] WARNING: missing file-level summary for mode={mode}: {path}")
-            continue
-
-        candidate = path.read_text(encoding="utf-8")
-        prompt = build_judge_prompt(reference, candidate, mode)
-
-        print(f"[judge] Evaluating mode={mode}")
-        raw = call_llm(judge_model, prompt)
-
-        try:
-            scores = json.loads(raw)
-        except json.JSONDecodeError:
-            # Try to recover if the model added text around JSON
-            try:
-                start = raw.index("{")
-                end = raw.rindex("}") + 1
-                scores = json.loads(raw[start:end])
-            except Exception as e:
-                raise RuntimeError(
-                    f"Could not parse judge JSON for mode={mode}: {e}\nRaw: {raw}"
-                )
-
-        # Normalise to floats and keep only expected keys
-        cleaned: Dict[str, float | None] = {}
-        for key in ("purpose", "functionality", "clarity", "overall"):
-            val = scores.get(key)
-            try:
-                cleaned[key] = float(val)
-            except (TypeError, ValueError):
-                cleaned[key] = None
-
-        result[mode] = cleaned
+    result: Dict[str, Dict[str, Optional[float]]] = {}
+    for res in run_judge(items, judge_model, cache, workers=workers, max_attempts=max_attempts):
+        if res.status != "failed":
+            result[res.mode] = res.scores
 
     # Wrap under program ID so you can later aggregate multiple programs
     wrapped = {prog: result}
@@ -365,6 +581,57 @@ def evaluate_file_level_summaries(
     print(f"[judge] Results written to {out_json}")
 
 
+def discover_judge_programs(output_root: Path) -> Dict[str, Path]:
+    """
+    prog -> the dir holding its file_level/: COBOL_<PROG> (this script's
+    layout) or COBOL_<PROG>/LLM (mtp_full_pipeline_all_projects.py's).
+    """
+
+    found: Dict[str, Path] = {}
+    for pattern in ("**/COBOL_*/file_level", "**/COBOL_*/LLM/file_level"):
+        for file_level in sorted(output_root.glob(pattern)):
+            summaries_root = file_level.parent
+            prog_dir = summaries_root if summaries_root.name.startswith("COBOL_") \
+                else summaries_root.parent
+            found.setdefault(prog_dir.name[len("COBOL_"):], summaries_root)
+    return found
+
+
+def evaluate_all_programs(
+    output_root: Path,
+    reference_root: Path,
+    modes: List[str],
+    judge_model: str,
+    out_csv: Path,
+    workers: int = 4,
+    cache_path: Optional[Path] = None,
+    max_attempts: int = 3,
+) -> List[JudgeResult]:
+    """Judge every (program, mode) under output_root in one concurrent run.
+
+    References are looked up as <PROG>.txt anywhere under reference_root.
+    """
+
+    refs: Dict[str, Path] = {}
+    for path in sorted(reference_root.rglob("*.txt")):
+        refs.setdefault(path.stem, path)
+
+    items: List[JudgeItem] = []
+    for prog, prog_dir in discover_judge_programs(output_root).items():
+        ref_path = refs.get(prog)
+        if ref_path is None:
+            print(f"[judge] WARNING: no reference for {prog} under {reference_root}")
+            continue
+        reference = ref_path.read_text(encoding="utf-8")
+        items.extend(collect_judge_items(prog, prog_dir, reference, modes))
+
+    results = run_judge(
+        items, judge_model, JudgeCache(cache_path), workers=workers, max_attempts=max_attempts
+    )
+    write_judge_table(results, out_csv)
+    return results
+
+
 # ---------------------------------------------------------------------------
 # CLI wiring
 # ---------------------------------------------------------------------------
@@ -375,11 +642,11 @@ def parse_args() -> argparse.Namespace:
         description="Run local LLM-based summarization + evaluation for COBOL mocktails.",
     )
 
-    parser.add_argument("--prog", required=True, help="Program ID, e.g. ATM")
+    parser.add_argument("--prog", default=None, help="Program ID, e.g. ATM")
     parser.add_argument(
         "--base-dir",
         type=Path,
-        required=True,
+        default=None,
         help="Base output dir for this program, e.g. output/COBOL_ATM",
     )
     parser.add_argument(
@@ -401,6 +668,15 @@ def parse_args() -> argparse.Namespace:
         help="Mocktail modes to process (default: all defined in mocktail_config).",
     )
 
+    parser.add_argument(
+        "--llm-endpoints",
+        nargs="+",
+        default=None,
+        metavar="URL",
+        help="Ollama servers to balance requests over, e.g. http://localhost:11434 "
+             "http://localhost:11435 (default: $COBREX_LLM_ENDPOINTS or localhost:11434)",
+    )
+
     sub = parser.add_subparsers(dest="stage", required=True)
 
     # Stage 1: rule-level summaries
@@ -438,12 +714,99 @@ def parse_args() -> argparse.Namespace:
         default=None,
         help="Where to store JSON results (defaults to BASE/eval_{prog}.json)",
     )
+    _add_judge_runner_args(p_judge)
 
-    return parser.parse_args()
+    # Stage 3b: judge every program under an output root
+    p_all = sub.add_parser(
+        "judge-all",
+        help="Run LLM-as-a-Judge on all programs/modes concurrently",
+    )
+    p_all.add_argument(
+        "--output-root",
+        type=Path,
+        required=True,
+        help="Root containing COBOL_<PROG>/file_level/ or COBOL_<PROG>/LLM/file_level/ dirs",
+    )
+    p_all.add_argument(
+        "--reference-root",
+        type=Path,
+        required=True,
+        help="Directory searched recursively for <PROG>.txt human references",
+    )
+    p_all.add_argument(
+        "--judge-model",
+        default="llama3.1",
+        help="Local model name for Judge LLM (e.g., llama3.1).",
+    )
+    p_all.add_argument(
+        "--out-csv",
+        type=Path,
+        default=None,
+        help="Consolidated results table (defaults to OUTPUT_ROOT/judge_results.csv)",
+    )
+    _add_judge_runner_args(p_all)
+
+    args = parser.parse_args()
+    if args.stage != "judge-all" and (args.prog is None or args.base_dir is None):
+        parser.error(f"--prog and --base-dir are required for stage '{args.stage}'")
+    return args
+
+
+def _positive_int(value: str) -> int:
+    n = int(value)
+    if n < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value!r}")
+    return n
+
+
+def _add_judge_runner_args(p: argparse.ArgumentParser) -> None:
+    p.add_argument(
+        "--workers",
+        type=int,
+        default=4,
+        help="Max concurrent judge requests (default: 4)",
+    )
+    p.add_argument(
+        "--max-attempts",
+        type=_positive_int,
+        default=3,
+        help="Attempts per item; only failed items are retried (default: 3)",
+    )
+    p.add_argument(
+        "--cache",
+        type=Path,
+        default=None,
+        help="JSON cache of judgments keyed by (judge model, reference, candidate)",
+    )
+    p.add_argument(
+        "--llm-concurrency",
+        type=policy_arg,
+        default=None,
+        help="In-flight judge requests per model: N, or adaptive[:MAX] to let "
+             "an AIMD controller settle below --workers "
+             "(default: $COBREX_LLM_CONCURRENCY or off)",
+    )
 
 
 def main() -> None:
     args = parse_args()
+    set_llm_concurrency(getattr(args, "llm_concurrency", None))
+    set_llm_endpoints(args.llm_endpoints)
+
+    if args.stage == "judge-all":
+        evaluate_all_programs(
+            output_root=args.output_root,
+            reference_root=args.reference_root,
+            modes=args.modes,
+            judge_model=args.judge_model,
+            out_csv=args.out_csv or (args.output_root / "judge_results.csv"),
+            workers=args.workers,
+            cache_path=args.cache or (args.output_root / "judge_cache.json"),
+            max_attempts=args.max_attempts,
+        )
+        report_concurrency()
+        report_endpoints()
+        return
 
     prog: str = args.prog
     base_dir: Path = args.base_dir
@@ -477,8 +840,14 @@ def main() -> None:
             modes=args.modes,
             judge_model=args.judge_model,
             out_json=out_json,
+            workers=args.workers,
+            cache_path=args.cache,
+            max_attempts=args.max_attempts,
         )
 
+    report_concurrency()
+    report_endpoints()
+
 
 if __name__ == "__main__":
     main()
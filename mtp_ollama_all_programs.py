@@ -7,8 +7,10 @@ from collections import defaultdict
 from pathlib import Path
 from typing import Dict, Iterable, List, Tuple
 
+from eval_metrics import METRIC_NAMES, score_corpus
 from summarizer.mocktail_config import DEFAULT_MOCKTAIL_MODES
-from ollama_utils import generate_text
+from llm_telemetry import write_telemetry
+from ollama_utils import generate_text_with_stats
 
 
 # ---------- discovery ----------
@@ -79,12 +81,13 @@ def generate_rule_level_summaries_for_program(
 
             prompt_text = prompt_path.read_text(encoding="utf-8")
             try:
-                ans = generate_text(model, prompt_text)
+                ans, stats = generate_text_with_stats(model, prompt_text)
             except Exception as e:
                 print(f"  [ERROR] Ollama failed for {prog} rule={rule_id} mode={mode}: {e}")
                 continue
 
             out_path.write_text(ans, encoding="utf-8")
+            write_telemetry(out_path, stats, program=prog, mode=mode, level="rule", unit=rule_id)
 
         print(f"  -> rule summaries in {out_dir}")
 
@@ -166,16 +169,17 @@ def generate_file_level_summaries_for_program(
 
         prompt = build_file_level_prompt(prog, mode, collected)
         try:
-            ans = generate_text(model, prompt)
+            ans, stats = generate_text_with_stats(model, prompt)
         except Exception as e:
             print(f"[ERROR] Ollama file-level failed for {prog} mode={mode}: {e}")
             continue
 
         out_path.write_text(ans, encoding="utf-8")
+        write_telemetry(out_path, stats, program=prog, mode=mode, level="file", unit="FILE")
         print(f"[FILE] {prog} mode={mode} -> {out_path}")
 
 
-# ---------- evaluation: file-level ROUGE-1 F1 vs CSV ----------
+# ---------- evaluation: file-level ROUGE/BLEU vs CSV ----------
 
 def load_references(csv_path: Path, prog_col: str = "prog", text_col: str = "reference") -> Dict[str, str]:
     refs: Dict[str, str] = {}
@@ -189,41 +193,19 @@ def load_references(csv_path: Path, prog_col: str = "prog", text_col: str = "ref
     return refs
 
 
-def _tokens(s: str) -> List[str]:
-    return [t for t in s.lower().split() if t]
-
-
-def rouge1_f1(pred: str, ref: str) -> float:
-    p = _tokens(pred)
-    r = _tokens(ref)
-    if not p or not r:
-        return 0.0
-
-    from collections import Counter
-    cp, cr = Counter(p), Counter(r)
-    overlap = sum(min(cp[w], cr[w]) for w in cp)
-
-    prec = overlap / len(p)
-    rec = overlap / len(r)
-    if prec + rec == 0:
-        return 0.0
-    return 2 * prec * rec / (prec + rec)
-
-
-def evaluate_program(
+def collect_file_summaries(
     prog: str,
     base_dir: Path,
     modes: List[str],
-    ref_text: str,
-) -> Dict[str, float]:
-    scores: Dict[str, float] = {}
+) -> List[Tuple[str, str]]:
+    """Return (mode, file-level summary text) for every mode that has one."""
+    found: List[Tuple[str, str]] = []
     for mode in modes:
         path = base_dir / "LLM_Ollama" / mode / "file_level" / f"FILE_SUMMARY_{prog}_{mode}.txt"
         if not path.is_file():
             continue
-        pred = path.read_text(encoding="utf-8")
-        scores[mode] = rouge1_f1(pred, ref_text)
-    return scores
+        found.append((mode, path.read_text(encoding="utf-8")))
+    return found
 
 
 # ---------- main ----------
@@ -266,7 +248,8 @@ def main(argv: List[str] | None = None) -> None:
     if args.ref_csv is not None and args.ref_csv.is_file():
         refs = load_references(args.ref_csv)
 
-    agg: Dict[str, Tuple[float, int]] = defaultdict(lambda: [0.0, 0])  # mode -> [sum, count]
+    # (prog, mode, pred, ref), scored in one batch once every program is done
+    pending: List[Tuple[str, str, str, str]] = []
 
     for prog, base_dir in find_cobol_program_dirs(args.output_root):
         print(f"\n========== PROGRAM {prog} ({base_dir}) ==========")
@@ -288,25 +271,34 @@ def main(argv: List[str] | None = None) -> None:
         )
 
         if prog in refs:
-            scores = evaluate_program(
-                prog=prog,
-                base_dir=base_dir,
-                modes=args.modes,
-                ref_text=refs[prog],
-            )
-            print(f"[METRICS] {prog}: {json.dumps(scores, indent=2)}")
-            for mode, s in scores.items():
-                agg[mode][0] += s
-                agg[mode][1] += 1
+            for mode, pred in collect_file_summaries(prog, base_dir, args.modes):
+                pending.append((prog, mode, pred, refs[prog]))
         elif refs:
             print(f"[WARN] no reference found in CSV for prog={prog}; skipping metric.")
 
-    if agg:
-        print("\n===== AGGREGATED AVERAGE ROUGE-1 F1 OVER ALL FILES =====")
-        for mode in sorted(agg.keys()):
-            total, count = agg[mode]
-            avg = total / count if count else 0.0
-            print(f"{mode:18s}: {avg:0.4f}  (n={count})")
+    if not pending:
+        return
+
+    scores = score_corpus([p[2] for p in pending], [p[3] for p in pending])
+
+    per_prog: Dict[str, Dict[str, Dict[str, float]]] = defaultdict(dict)
+    agg: Dict[str, Dict[str, List[float]]] = defaultdict(lambda: defaultdict(list))
+    for i, (prog, mode, _pred, _ref) in enumerate(pending):
+        row = {name: float(scores[name][i]) for name in METRIC_NAMES}
+        per_prog[prog][mode] = row
+        for name, val in row.items():
+            agg[mode][name].append(val)
+
+    for prog, by_mode in per_prog.items():
+        print(f"[METRICS] {prog}: {json.dumps(by_mode, indent=2)}")
+
+    print("\n===== AGGREGATED AVERAGES OVER ALL FILES =====")
+    print(f"{'mode':18s}  " + "  ".join(f"{name:>9s}" for name in METRIC_NAMES))
+    for mode in sorted(agg.keys()):
+        vals = agg[mode]
+        count = len(vals["rouge1_f1"])
+        avgs = "  ".join(f"{sum(vals[name]) / count:9.4f}" for name in METRIC_NAMES)
+        print(f"{mode:18s}  {avgs}  (n={count})")
 
 
 if __name__ == "__main__":
@@ -3,26 +3,37 @@
 Small helper wrapper around the `ollama` CLI.
 
 Usage:
-    from ollama_utils import generate_text
+    from ollama_utils import generate_text, generate_text_with_stats
 
     text = generate_text("llama3.1", "Your prompt here")
+    text, stats = generate_text_with_stats("llama3.1", "Your prompt here")
+
+The model runs with `--verbose`, so the token counts and durations Ollama
+prints to stderr come back as an llm_telemetry.LLMCallStats.
+
+Requests take a per-model slot from llm_concurrency first (a no-op unless
+COBREX_LLM_CONCURRENCY is set); the wait counts as queue_wait_s.
 """
 
 from __future__ import annotations
 
 import subprocess
-from typing import Optional
+import time
+from typing import Optional, Tuple
 
+from llm_concurrency import llm_slot
+from llm_telemetry import LLMCallStats, apply_verbose_counters
 
-def _run_ollama(model: str, prompt: str, timeout: Optional[int] = None) -> str:
+
+def _run_ollama(model: str, prompt: str, timeout: Optional[int] = None) -> Tuple[str, str]:
     """
-    Call `ollama run <model>` with the given prompt and return the
-    concatenated text output.
+    Call `ollama run --verbose <model>` with the given prompt and return
+    the concatenated text output and stderr (with the timing counters).
 
     Assumes Ollama is installed locally and the model has been pulled.
     """
     proc = subprocess.Popen(
-        ["ollama", "run", model],
+        ["ollama", "run", "--verbose", model],
         stdin=subprocess.PIPE,
         stdout=subprocess.PIPE,
         stderr=subprocess.PIPE,
@@ -31,9 +42,39 @@ def _run_ollama(model: str, prompt: str, timeout: Optional[int] = None) -> str:
     out, err = proc.communicate(prompt, timeout=timeout)
     if proc.returncode != 0:
         raise RuntimeError(f"ollama run failed (code={proc.returncode}): {err.strip()}")
-    return out.strip()
+    return out.strip(), err
+
+
+def generate_text_with_stats(
+    model: str,
+    prompt: str,
+    timeout: Optional[int] = None,
+    queued_at: Optional[float] = None,
+) -> Tuple[str, LLMCallStats]:
+    """
+    Return the model's text and the request's telemetry.
+
+    `queued_at` is the time.perf_counter() value at which the caller queued
+    the request; the time until it actually started is its queue wait.
+    """
+    if queued_at is None:
+        queued_at = time.perf_counter()
+    with llm_slot(model) as slot:
+        t0 = time.perf_counter()
+        stats = LLMCallStats(
+            model=model,
+            backend="ollama-cli",
+            queue_wait_s=t0 - queued_at,
+            prompt_chars=len(prompt),
+        )
+        out, err = _run_ollama(model, prompt, timeout=timeout)
+        stats.latency_s = time.perf_counter() - t0
+        stats.response_chars = len(out)
+        apply_verbose_counters(stats, err)
+        slot.observe(stats)
+    return out, stats
 
 
 def generate_text(model: str, prompt: str, timeout: Optional[int] = None) -> str:
     """Return raw text from the Ollama model."""
-    return _run_ollama(model, prompt, timeout=timeout)
+    return generate_text_with_stats(model, prompt, timeout=timeout)[0]
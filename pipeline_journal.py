@@ -0,0 +1,268 @@
+#!/usr/bin/env python
+"""
+Append-only checkpoint journal for mtp_full_pipeline_all_projects.py.
+
+Every completed unit of work is one JSON line keyed by
+(program, stage, mode, unit):
+
+    {"program": "ATM", "stage": "rule", "mode": "C_BR", "unit": "rule_3",
+     "status": "done", "path": "output/.../RULE_SUMMARY_ATM_rule_3_C_BR.txt",
+     "sha256": "...", "ts": 1730000000.0}
+
+Stages written by the driver:
+
+    br_index  BR JSON + ProgramIndex + BR_REP      (mode/unit empty)
+    prompts   BR_PROMPTS/<mode>/                   (mode)
+    rule      one rule-level summary               (mode, unit = BR id)
+    file      one file-level summary               (mode)
+    program   every stage above done for the modes listed in the record;
+              `path` is the program's output dir
+
+br_index, prompts and program records carry an `inputs` fingerprint of
+the static outputs (Rules/) they were built from; when extractor.py
+rewrites those, the records no longer match and the stages are redone.
+
+Outputs are written with atomic_write_text (temp file + rename) before
+their line is appended, so a crash leaves either no journal entry (the
+unit is redone) or a complete file. A half-written last line is ignored
+on load. On restart the driver consults the journal instead of statting
+output directories; a program whose "program" entry covers every requested
+mode (and whose static outputs are unchanged) is skipped outright.
+Outputs from runs made before the journal existed are redone, unless the
+journal is opened with adopt_existing=True (the driver's --adopt-existing);
+then an existing file is hashed and journalled instead.
+
+    python pipeline_journal.py status output/pipeline_journal.jsonl
+    python pipeline_journal.py compact output/pipeline_journal.jsonl
+"""
+
+from __future__ import annotations
+
+import argparse
+import copy
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+JOURNAL_NAME = "pipeline_journal.jsonl"
+
+Key = Tuple[str, str, str, str]
+
+
+def sha256_text(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def sha256_file(path: Path) -> Optional[str]:
+    try:
+        return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+    except OSError:
+        return None
+
+
+def atomic_write_text(path: Path, text: str, encoding: str = "utf-8") -> None:
+    """Write via a temp file in the same directory and rename it over `path`."""
+    path = Path(path)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding=encoding) as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def read_journal(path: Path) -> Iterator[dict]:
+    """Records in append order; a torn (crash-truncated) line is skipped."""
+    try:
+        f = open(path, encoding="utf-8")
+    except FileNotFoundError:
+        return
+    with f:
+        for lineno, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                print(f"[JOURNAL][WARN] Ignoring unreadable line {lineno} in {path}")
+
+
+class PipelineJournal:
+    """
+    In-memory view of the journal (last record per key wins) plus an
+    append handle. Thread-safe; each record is one O_APPEND write, so
+    several processes may share a journal file. scope(project) gives a view
+    whose program names are prefixed with "<project>/".
+    """
+
+    def __init__(self, path: Path, verify: bool = False, adopt_existing: bool = False):
+        self.path = Path(path)
+        self.verify = verify
+        self.adopt_existing = adopt_existing
+        self._prefix = ""
+        self._lock = threading.Lock()
+        self._records: Dict[Key, dict] = {}
+        for rec in read_journal(self.path):
+            self._records[(rec["program"], rec["stage"], rec.get("mode") or "",
+                           rec.get("unit") or "")] = rec
+        if self._records:
+            print(f"[JOURNAL] {len(self._records)} entries loaded from {self.path}")
+
+    def scope(self, name: str) -> "PipelineJournal":
+        """A view sharing this journal's file and records, keyed under `name`/."""
+        view = copy.copy(self)
+        view._prefix = f"{self._prefix}{name}/"
+        return view
+
+    def _key(self, program: str, stage: str, mode: Optional[str], unit: Optional[str]) -> Key:
+        return (self._prefix + program, stage, mode or "", unit or "")
+
+    def get(self, program: str, stage: str, mode: str = None, unit: str = None) -> Optional[dict]:
+        with self._lock:
+            return self._records.get(self._key(program, stage, mode, unit))
+
+    def is_done(
+        self,
+        program: str,
+        stage: str,
+        mode: str = None,
+        unit: str = None,
+        path: Optional[Path] = None,
+        inputs: Optional[str] = None,
+    ) -> bool:
+        """
+        True when the unit completed. With verify=True, a journalled file
+        must still exist with the same content hash. With adopt_existing,
+        an unjournalled but existing `path` is journalled and counts as done.
+        With `inputs`, the record must have been made from the same inputs
+        (its "inputs" field).
+        """
+        rec = self.get(program, stage, mode, unit)
+        if rec is None or rec.get("status") != "done":
+            if self.adopt_existing and path is not None and Path(path).exists():
+                self.record(program, stage, mode, unit, path=path, adopted=True, inputs=inputs)
+                return True
+            return False
+        if inputs is not None and rec.get("inputs") != inputs:
+            print(f"[JOURNAL] Inputs changed; redoing "
+                  f"{self._prefix}{program} {stage} {mode or ''} {unit or ''}".rstrip())
+            return False
+        if self.verify and rec.get("sha256") and rec.get("path"):
+            if sha256_file(Path(rec["path"])) != rec["sha256"]:
+                print(f"[JOURNAL] {rec['path']} changed or missing; redoing "
+                      f"{self._prefix}{program} {stage} {mode or ''} {unit or ''}".rstrip())
+                return False
+        return True
+
+    def record(
+        self,
+        program: str,
+        stage: str,
+        mode: str = None,
+        unit: str = None,
+        path: Optional[Path] = None,
+        content: Optional[str] = None,
+        status: str = "done",
+        **extra,
+    ) -> dict:
+        """Append one record; `content` (else the file at `path`) is hashed."""
+        digest = None
+        if content is not None:
+            digest = sha256_text(content)
+        elif path is not None and Path(path).is_file():
+            digest = sha256_file(Path(path))
+        key = self._key(program, stage, mode, unit)
+        rec = {
+            "program": key[0],
+            "stage": stage,
+            "mode": mode or "",
+            "unit": unit or "",
+            "status": status,
+            "path": str(path) if path is not None else None,
+            "sha256": digest,
+            "ts": time.time(),
+        }
+        rec.update(extra)
+        line = (json.dumps(rec) + "\n").encode("utf-8")
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, line)
+            finally:
+                os.close(fd)
+            self._records[key] = rec
+        return rec
+
+    def records(self) -> List[dict]:
+        with self._lock:
+            return list(self._records.values())
+
+    def compact(self) -> int:
+        """Rewrite the journal with only the latest record per key."""
+        with self._lock:
+            payload = "".join(json.dumps(r) + "\n" for r in self._records.values())
+            atomic_write_text(self.path, payload)
+            return len(self._records)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Inspect or compact a pipeline journal.")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p_status = sub.add_parser("status", help="Completed units per stage")
+    p_status.add_argument("journal", type=Path)
+    p_status.add_argument("--verify", action="store_true",
+                          help="Re-hash journalled files and report mismatches")
+
+    p_compact = sub.add_parser(
+        "compact", help="Keep only the latest record per key (not while a run is appending)"
+    )
+    p_compact.add_argument("journal", type=Path)
+
+    args = parser.parse_args(argv)
+    if not args.journal.is_file():
+        print(f"[JOURNAL] {args.journal} does not exist")
+        return 1
+
+    journal = PipelineJournal(args.journal, verify=getattr(args, "verify", False))
+    if args.cmd == "compact":
+        n = journal.compact()
+        print(f"[JOURNAL] Compacted to {n} entries -> {args.journal}")
+        return 0
+
+    done: Counter = Counter()
+    failed: Counter = Counter()
+    stale = 0
+    for rec in journal.records():
+        if rec.get("status") != "done":
+            failed[rec["stage"]] += 1
+        elif journal.is_done(rec["program"], rec["stage"], rec["mode"], rec["unit"]):
+            done[rec["stage"]] += 1
+        else:
+            stale += 1
+    print(f"{'stage':<10} {'done':>8} {'failed':>8}")
+    for stage in ("br_index", "prompts", "rule", "file", "program"):
+        print(f"{stage:<10} {done[stage]:>8} {failed[stage]:>8}")
+    if args.verify:
+        print(f"stale (file changed or missing): {stale}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
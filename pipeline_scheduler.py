@@ -0,0 +1,117 @@
+"""
+Two-pool task scheduler that overlaps CPU stages with LLM calls.
+
+mtp_full_pipeline_all_projects.py --pipeline uses it to run program N+1's
+BR/index + prompt build (CPU pool) while program N's rule summaries are
+with the LLM, and to slot program N-1's file-level merge in as soon as its
+last rule summary lands:
+
+    sched = StageScheduler(cpu_workers=2, llm_workers=1)
+    sched.submit_cpu(prepare, prog)                    # FIFO
+    sched.submit_llm((RULE, prog_idx), summarise, br)  # lowest key first
+    sched.wait()                                       # incl. tasks added by tasks
+    sched.close(); sched.report()
+
+LLM tasks are ordered by their priority key, so a ready merge (or an
+earlier program's rule) goes before later programs' rules and programs
+finish in order instead of all at the end. A task's exception is printed
+and counted; it never stops the scheduler, so callers decide what a
+failure means (the driver still merges whatever rule summaries exist,
+as in sequential mode).
+"""
+
+from __future__ import annotations
+
+import itertools
+import queue
+import threading
+import time
+import traceback
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, Tuple
+
+
+class StageScheduler:
+    def __init__(self, cpu_workers: int = 2, llm_workers: int = 1):
+        self._cpu = ThreadPoolExecutor(max_workers=cpu_workers, thread_name_prefix="cpu")
+        self._llm: "queue.PriorityQueue[Tuple]" = queue.PriorityQueue()
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._outstanding = 0
+        self.busy: Dict[str, float] = {"cpu": 0.0, "llm": 0.0}
+        self.tasks: Dict[str, int] = {"cpu": 0, "llm": 0}
+        self.errors: Dict[str, int] = {"cpu": 0, "llm": 0}
+        self._t0 = time.perf_counter()
+        self._llm_threads: List[threading.Thread] = [
+            threading.Thread(target=self._llm_loop, name=f"llm-{i}", daemon=True)
+            for i in range(llm_workers)
+        ]
+        for t in self._llm_threads:
+            t.start()
+
+    # -- submission ----------------------------------------------------------
+
+    def submit_cpu(self, fn: Callable, *args, **kwargs) -> Future:
+        self._add()
+        return self._cpu.submit(self._run, "cpu", fn, args, kwargs)
+
+    def submit_llm(self, priority: Tuple, fn: Callable, *args, **kwargs) -> None:
+        """Queue an LLM task; lower `priority` tuples run first, FIFO among equals."""
+        self._add()
+        self._llm.put((priority, next(self._seq), fn, args, kwargs))
+
+    def _add(self) -> None:
+        with self._cond:
+            self._outstanding += 1
+
+    # -- execution -----------------------------------------------------------
+
+    def _llm_loop(self) -> None:
+        while True:
+            item = self._llm.get()
+            if item[2] is None:
+                return
+            _, _, fn, args, kwargs = item
+            self._run("llm", fn, args, kwargs)
+
+    def _run(self, pool: str, fn: Callable, args, kwargs):
+        t0 = time.perf_counter()
+        failed = False
+        try:
+            return fn(*args, **kwargs)
+        except Exception:
+            failed = True
+            print(f"[PIPELINE][ERR] {pool} task {getattr(fn, '__name__', fn)} failed:")
+            traceback.print_exc()
+        finally:
+            with self._cond:
+                self.busy[pool] += time.perf_counter() - t0
+                self.tasks[pool] += 1
+                self.errors[pool] += failed
+                self._outstanding -= 1
+                self._cond.notify_all()
+
+    def wait(self) -> None:
+        """Block until every task, including those submitted by tasks, has run."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._outstanding == 0)
+
+    def close(self) -> None:
+        self._cpu.shutdown(wait=True)
+        for _ in self._llm_threads:
+            # sorts after every real task: (inf,) > any priority tuple
+            self._llm.put(((float("inf"),), next(self._seq), None, (), {}))
+        for t in self._llm_threads:
+            t.join()
+
+    # -- reporting -----------------------------------------------------------
+
+    def report(self) -> None:
+        """Wall time against each pool's busy time, summed over its threads."""
+        wall = time.perf_counter() - self._t0
+        cpu, llm = self.busy["cpu"], self.busy["llm"]
+        print(
+            f"[PIPELINE] wall {wall:.1f}s | CPU stages {cpu:.1f}s in {self.tasks['cpu']} task(s) "
+            f"({self.errors['cpu']} failed) | LLM {llm:.1f}s in {self.tasks['llm']} task(s) "
+            f"({self.errors['llm']} failed) | saved vs. back-to-back {max(cpu + llm - wall, 0.0):.1f}s"
+        )
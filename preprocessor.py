@@ -1,9 +1,34 @@
 """
 This module contains functions for preprocessing the COBOL program
+
+Single file (what extractor.py uses):
+
+    preprocess("prog.cbl")          # writes ./clean_output.cbl
+
+Many files at once, keeping the per-file cost down to the cobc run itself
+(cobc processes run in parallel, the ProLeap JVM is started once):
+
+    python preprocessor.py --out-dir output/preprocessed a.cbl b.cbl ...
+    python preprocessor.py --out-dir output/preprocessed --proleap data/project_clean/X/*.cbl
+
+With --copybook-cache DIR, COPY statements are inlined from a cached
+CopybookResolver (copybook_cache.py) before cobc runs. Programs whose source
+and copybooks have not changed since the last batch are skipped.
 """
 
-import subprocess
+import argparse
 import os
+import subprocess
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from copybook_cache import CopybookResolver
+
+
+PROLEAP_DIR = Path(__file__).resolve().parent / "ProleapPreprocessor"
 
 
 def run_proleap_preprocessor():
@@ -16,13 +41,90 @@ def run_proleap_preprocessor():
     p.wait()
 
 
-def clean_file(file_name):
+class ProleapService:
+    """
+    Long-lived ProLeap preprocessor (`App --serve`).
+
+    The JVM is started once through Maven and then fed one
+    "input<TAB>output" request per line on stdin; it answers
+    "OK<TAB>output" or "ERR<TAB>message". Requests are serialised, so one
+    service can be shared between threads.
+
+        with ProleapService() as svc:
+            svc.process("clean_output.cbl", "preprocessed.cbl")
+    """
+
+    def __init__(self, project_dir=PROLEAP_DIR):
+        self.project_dir = Path(project_dir)
+        self._proc = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        if self._proc is not None and self._proc.poll() is None:
+            return self
+        cmd = [
+            "mvn", "-q", "exec:java",
+            "-Dexec.mainClass=com.example.App",
+            "-Dexec.args=--serve",
+        ]
+        self._proc = subprocess.Popen(
+            cmd,
+            cwd=str(self.project_dir),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+            encoding="utf-8",
+            bufsize=1,
+        )
+        return self
+
+    def process(self, input_file, output_file):
+        """Preprocess one file; returns the output path or raises RuntimeError."""
+        line = "{}\t{}\n".format(
+            Path(input_file).resolve(), Path(output_file).resolve()
+        )
+        with self._lock:
+            self.start()
+            try:
+                self._proc.stdin.write(line)
+                self._proc.stdin.flush()
+                reply = self._proc.stdout.readline()
+            except (BrokenPipeError, OSError) as e:
+                raise RuntimeError("ProLeap service died: {!r}".format(e))
+
+        if not reply:
+            raise RuntimeError(
+                "ProLeap service exited (code {})".format(self._proc.poll())
+            )
+        status, _, payload = reply.rstrip("\n").partition("\t")
+        if status != "OK":
+            raise RuntimeError("ProLeap failed on {}: {}".format(input_file, payload))
+        return payload
+
+    def close(self):
+        if self._proc is None:
+            return
+        try:
+            self._proc.stdin.close()
+            self._proc.wait(timeout=30)
+        except (OSError, subprocess.TimeoutExpired):
+            self._proc.kill()
+        self._proc = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def clean_file(file_name, output_name='clean_output.cbl'):
     """
     Function to clean the output of preprocessing by cobc
     """
 
 
-    with open(os.path.join('clean_output.cbl'),'w') as wp:
+    with open(output_name,'w') as wp:
 
 
         with open(file_name) as fp:
@@ -38,16 +140,139 @@ def clean_file(file_name):
 
 
 
-def preprocess(input_file_name ):
+def run_cobc(input_file_name, output_name, include_dirs=()):
     """
-    Preprocessing the cobol file using cobc and proleap preprocessor
+    Run `cobc -E` on one file and write the cleaned result to output_name.
+    The intermediate .i file is private to this call, so several calls can
+    run at the same time.
     """
+    fd, tmp_i = tempfile.mkstemp(suffix=".i", dir=os.path.dirname(os.path.abspath(output_name)))
+    os.close(fd)
+    cmd = ["cobc","-std=cobol85", "-E","-o", tmp_i]
+    for d in include_dirs:
+        cmd += ["-I", str(d)]
+    try:
+        p = subprocess.run(cmd + [input_file_name])
+        if p.returncode != 0:
+            raise RuntimeError("cobc -E failed on {} (exit {})".format(input_file_name, p.returncode))
+        clean_file(tmp_i, output_name)
+    finally:
+        if os.path.exists(tmp_i):
+            os.remove(tmp_i)
+    return output_name
 
-    p = subprocess.Popen(["cobc","-std=cobol85", "-E","-o", "output.i", input_file_name])
 
-    p.wait()
+def preprocess(input_file_name, output_name='clean_output.cbl'):
+    """
+    Preprocessing the cobol file using cobc and proleap preprocessor.
+    The intermediate .i file is private to the call (see run_cobc).
+    """
 
-    clean_file(os.path.join("./","output.i"))
-    os.remove("output.i")
+    run_cobc(input_file_name, output_name)
     # Uncomment below line if proleap preprocessor is running
     # run_proleap_preprocessor()
+
+
+def preprocess_batch(input_files, out_dir, workers=None, proleap=None, copybooks=None):
+    """
+    Preprocess many COBOL files into out_dir/<stem>.cbl.
+
+    cobc runs in a thread pool (one short process per file). If `proleap`
+    is a ProleapService, its JVM post-processes every cobc output in place.
+    If `copybooks` is a CopybookResolver, COPYs are inlined from its cache
+    first, and programs that are not stale keep their existing output.
+
+    Returns {input path: output path or Exception}.
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    include_dirs = copybooks.search_dirs if copybooks is not None else ()
+
+    def one(src):
+        dst = out_dir / "{}.cbl".format(Path(src).stem)
+        try:
+            return build(src, dst)
+        except Exception:
+            # never leave an output from an earlier batch for extractor.py to pick up
+            if dst.exists():
+                dst.unlink()
+            raise
+
+    def build(src, dst):
+        if copybooks is None:
+            run_cobc(str(src), str(dst))
+        elif dst.exists() and not copybooks.is_stale(src):
+            return str(dst)
+        else:
+            expanded = out_dir / "{}.expanded.cbl".format(Path(src).stem)
+            expanded.write_text(copybooks.expand(src))
+            try:
+                run_cobc(str(expanded), str(dst), include_dirs)
+            finally:
+                expanded.unlink()
+        if proleap is not None:
+            proleap.process(dst, dst)
+        return str(dst)
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 4) as pool:
+        futures = {str(src): pool.submit(one, src) for src in input_files}
+        for src, fut in futures.items():
+            try:
+                results[src] = fut.result()
+            except Exception as e:
+                results[src] = e
+    if copybooks is not None:
+        copybooks.save()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Batch-preprocess COBOL files with cobc (and optionally ProLeap)."
+    )
+    parser.add_argument("files", nargs="+", type=Path, help="COBOL sources")
+    parser.add_argument(
+        "--out-dir", type=Path, required=True,
+        help="Directory for the preprocessed <stem>.cbl files",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=os.cpu_count() or 4,
+        help="Parallel cobc processes (default: CPU count)",
+    )
+    parser.add_argument(
+        "--proleap", action="store_true",
+        help="Also run the ProLeap preprocessor through one long-lived JVM",
+    )
+    parser.add_argument(
+        "--copybook-cache", type=Path, default=None,
+        help="Inline COPYs from a cached resolver kept in this directory and "
+             "skip programs that have not changed",
+    )
+    parser.add_argument(
+        "--copybooks", nargs="*", type=Path, default=None,
+        help="Copybook directories for --copybook-cache (default: ./copybooks)",
+    )
+    args = parser.parse_args(argv)
+
+    resolver = None
+    if args.copybook_cache is not None:
+        resolver = CopybookResolver(args.copybooks or None, cache_dir=args.copybook_cache)
+
+    if args.proleap:
+        with ProleapService() as svc:
+            results = preprocess_batch(args.files, args.out_dir, args.workers, svc, resolver)
+    else:
+        results = preprocess_batch(args.files, args.out_dir, args.workers, copybooks=resolver)
+
+    failures = 0
+    for src, res in results.items():
+        if isinstance(res, Exception):
+            failures += 1
+            print("[PREPROCESS][ERROR] {}: {}".format(src, res))
+    print("[PREPROCESS] {} ok, {} failed → {}".format(len(results) - failures, failures, args.out_dir))
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
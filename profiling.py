@@ -0,0 +1,478 @@
+#!/usr/bin/env python
+"""
+Per-program profiling for the static and LLM drivers.
+
+    from profiling import profiled
+
+    with profiled(prog_out_dir, "dfg"):
+        ...
+
+Profiling is off unless COBREX_PROFILE lists one or more modes
+(comma-separated; "1" / "on" mean cpu,mem):
+
+  cpu     cProfile             -> PROFILE/<label>.prof (+ top functions in <label>.txt)
+  sample  stack sampling       -> PROFILE/<label>_samples.json and <label>.folded
+          every COBREX_PROFILE_INTERVAL seconds (default 0.005); much lower
+          overhead than cProfile on long runs, .folded feeds flamegraph.pl /
+          speedscope
+  mem     tracemalloc          -> PROFILE/<label>_alloc.json (+ top sites in <label>.txt)
+
+Like COBREX_RENDER (graph_render.py) and COBREX_TRACE (tracing.py), the
+setting is inherited by extractor.py / build_dfg.py / build_pdg.py /
+summarizer.program_index subprocesses, so `--profile` on
+run_all_projects_static.py or mtp_full_pipeline_all_projects.py profiles
+every program into its own output directory. Only the outermost profiled()
+block in a thread records. Blocks in different threads (e.g. the --pipeline
+workers of mtp_full_pipeline_all_projects.py) each profile their own
+thread; tracemalloc is process-wide, so only the block that started it
+records mem, and its snapshot includes the other threads' allocations.
+
+Many short blocks of one program (e.g. its LLM calls) share one profile:
+
+    agg = ProfileAggregate(prog_out_dir, "pipeline_llm")
+    with agg.block():           # in any thread, any number of times
+        ...
+    agg.write()                 # PROFILE/pipeline_llm.* (cpu and sample only)
+
+Merging a batch:
+
+    python profiling.py merge output                  # corpus-wide hot functions
+    python profiling.py merge output --label dfg --sort tottime --out output/dfg.prof
+"""
+
+from __future__ import annotations
+
+import argparse
+import cProfile
+import io
+import json
+import linecache
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+PROFILE_MODES = ("cpu", "sample", "mem")
+DEFAULT_PROFILE_MODES = ("cpu", "mem")
+DEFAULT_SAMPLE_INTERVAL = 0.005
+PROFILE_DIRNAME = "PROFILE"
+
+TOP_FUNCTIONS = 30
+TOP_ALLOCATIONS = 50
+
+# per thread: cProfile and the sampler only see the thread that started them
+_local = threading.local()
+# tracemalloc is process-wide: the block that starts it owns it
+_mem_lock = threading.Lock()
+
+
+def parse_profile_modes(value: str) -> Tuple[str, ...]:
+    """'cpu,mem' -> ('cpu', 'mem'); '1' / 'on' / 'all' -> the defaults; '' / 'off' -> ()."""
+    value = (value or "").strip().lower()
+    if value in ("", "0", "off", "false", "no"):
+        return ()
+    if value in ("1", "on", "true", "yes", "all"):
+        return DEFAULT_PROFILE_MODES
+    modes = tuple(m.strip() for m in value.split(",") if m.strip())
+    bad = [m for m in modes if m not in PROFILE_MODES]
+    if bad:
+        raise ValueError(f"profile modes must be among {PROFILE_MODES}, got {bad}")
+    return modes
+
+
+def profile_arg(value: str) -> str:
+    """argparse `type=` for --profile: validates, returns the normalised string."""
+    try:
+        return ",".join(parse_profile_modes(value))
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def add_profile_argument(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const=",".join(DEFAULT_PROFILE_MODES),
+        default=None,
+        type=profile_arg,
+        metavar="MODES",
+        help="Profile into <program output>/PROFILE/: comma-separated "
+             f"{'/'.join(PROFILE_MODES)} (bare --profile: "
+             f"{','.join(DEFAULT_PROFILE_MODES)}). Default: $COBREX_PROFILE or off",
+    )
+
+
+def profile_modes() -> Tuple[str, ...]:
+    try:
+        return parse_profile_modes(os.environ.get("COBREX_PROFILE", ""))
+    except ValueError as e:
+        print(f"[PROFILE][WARN] Ignoring COBREX_PROFILE: {e}")
+        return ()
+
+
+def set_profile_modes(modes: Optional[str]) -> None:
+    """Profile this process and every subprocess it starts (None leaves the env alone)."""
+    if modes is not None:
+        os.environ["COBREX_PROFILE"] = modes or "off"
+
+
+def _sample_interval() -> float:
+    try:
+        return max(float(os.environ.get("COBREX_PROFILE_INTERVAL", DEFAULT_SAMPLE_INTERVAL)), 1e-4)
+    except ValueError:
+        return DEFAULT_SAMPLE_INTERVAL
+
+
+def _func_key(code) -> str:
+    return f"{code.co_filename}:{code.co_firstlineno}({code.co_name})"
+
+
+class StackSampler:
+    """Samples one thread's Python stack on a timer (sys._current_frames)."""
+
+    def __init__(self, interval: float, thread_id: Optional[int] = None):
+        self.interval = interval
+        self.thread_id = thread_id or threading.get_ident()
+        self.samples = 0
+        self.self_counts: Counter = Counter()
+        self.cum_counts: Counter = Counter()
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="cobrex-sampler", daemon=True)
+
+    def start(self) -> "StackSampler":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_func_key(frame.f_code))
+                frame = frame.f_back
+            self.samples += 1
+            self.self_counts[stack[0]] += 1
+            for key in set(stack):
+                self.cum_counts[key] += 1
+            self.stacks[";".join(reversed(stack))] += 1
+
+    def merge(self, other: "StackSampler") -> None:
+        """Add a stopped sampler's counts to this one."""
+        self.samples += other.samples
+        self.self_counts.update(other.self_counts)
+        self.cum_counts.update(other.cum_counts)
+        self.stacks.update(other.stacks)
+
+    def to_json(self) -> dict:
+        return {
+            "interval": self.interval,
+            "samples": self.samples,
+            "functions": {
+                key: [self.self_counts.get(key, 0), cum]
+                for key, cum in self.cum_counts.most_common()
+            },
+        }
+
+
+def _allocation_sites(snapshot: tracemalloc.Snapshot, top: int) -> List[dict]:
+    sites = []
+    for stat in snapshot.statistics("lineno")[:top]:
+        frame = stat.traceback[0]
+        sites.append({
+            "file": frame.filename,
+            "line": frame.lineno,
+            "code": linecache.getline(frame.filename, frame.lineno).strip(),
+            "size": stat.size,
+            "count": stat.count,
+        })
+    return sites
+
+
+@contextmanager
+def profiled(out_dir, label: str):
+    """
+    Profile the enclosed block into <out_dir>/PROFILE/<label>.* according to
+    COBREX_PROFILE; a no-op when it is unset or a profiled() block is already
+    running in this thread.
+    """
+    modes = profile_modes()
+    if not modes or getattr(_local, "active", False):
+        yield
+        return
+
+    _local.active = True
+    profiler = cProfile.Profile() if "cpu" in modes else None
+    sampler = StackSampler(_sample_interval()) if "sample" in modes else None
+    mem = False
+    if "mem" in modes:
+        with _mem_lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                mem = True
+    if sampler is not None:
+        sampler.start()
+    t0 = time.perf_counter()
+    if profiler is not None:
+        try:
+            profiler.enable()
+        except ValueError as e:
+            # Python 3.12+: one cProfile at a time per process
+            print(f"[PROFILE][WARN] No cProfile for {label}: {e}")
+            profiler = None
+    try:
+        yield
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        wall = time.perf_counter() - t0
+        if sampler is not None:
+            sampler.stop()
+        snapshot = peak = None
+        if mem:
+            with _mem_lock:
+                snapshot = tracemalloc.take_snapshot()
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+        _local.active = False
+
+        try:
+            _write_profile(Path(out_dir) / PROFILE_DIRNAME, label, f"{wall:.3f}s wall",
+                           pstats.Stats(profiler) if profiler is not None else None,
+                           sampler, snapshot, peak)
+        except OSError as e:
+            print(f"[PROFILE][WARN] Could not write {label} profile to {out_dir}: {e}")
+
+
+class ProfileAggregate:
+    """
+    One profile for many short blocks, e.g. every LLM call of a program,
+    instead of a PROFILE/ file set per block. Blocks may run in any thread;
+    their cProfile stats are added up (pstats) and their samples merged.
+    mem is not recorded: tracemalloc is process-wide.
+    """
+
+    def __init__(self, out_dir, label: str):
+        self.out_dir = Path(out_dir)
+        self.label = label
+        self.modes = tuple(m for m in profile_modes() if m != "mem")
+        self.blocks = 0
+        self.wall = 0.0
+        self._stats: Optional[pstats.Stats] = None
+        self._sampler: Optional[StackSampler] = None
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def block(self):
+        """Profile the enclosed block into the aggregate (a no-op like profiled())."""
+        if not self.modes or getattr(_local, "active", False):
+            yield
+            return
+
+        _local.active = True
+        profiler = cProfile.Profile() if "cpu" in self.modes else None
+        sampler = StackSampler(_sample_interval()) if "sample" in self.modes else None
+        if sampler is not None:
+            sampler.start()
+        t0 = time.perf_counter()
+        if profiler is not None:
+            try:
+                profiler.enable()
+            except ValueError:
+                # Python 3.12+: another thread's block holds cProfile
+                profiler = None
+        try:
+            yield
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            wall = time.perf_counter() - t0
+            if sampler is not None:
+                sampler.stop()
+            _local.active = False
+            with self._lock:
+                self.blocks += 1
+                self.wall += wall
+                if profiler is not None:
+                    if self._stats is None:
+                        self._stats = pstats.Stats(profiler)
+                    else:
+                        self._stats.add(profiler)
+                if sampler is not None:
+                    if self._sampler is None:
+                        self._sampler = sampler
+                    else:
+                        self._sampler.merge(sampler)
+
+    def write(self) -> None:
+        """Write PROFILE/<label>.* once; nothing when no block was profiled."""
+        with self._lock:
+            if not self.blocks:
+                return
+            try:
+                _write_profile(self.out_dir / PROFILE_DIRNAME, self.label,
+                               f"{self.wall:.3f}s wall over {self.blocks} blocks",
+                               self._stats, self._sampler, None, None)
+            except OSError as e:
+                print(f"[PROFILE][WARN] Could not write {self.label} profile to {self.out_dir}: {e}")
+
+
+def _write_profile(prof_dir: Path, label: str, timing: str, stats: Optional[pstats.Stats],
+                   sampler, snapshot, peak) -> None:
+    prof_dir.mkdir(parents=True, exist_ok=True)
+    report = [f"{label}: {timing}"]
+
+    if stats is not None:
+        stats.dump_stats(str(prof_dir / f"{label}.prof"))
+        buf = io.StringIO()
+        stats.stream = buf
+        stats.sort_stats("cumulative").print_stats(TOP_FUNCTIONS)
+        report += ["", "== cProfile (cumulative) ==", buf.getvalue().strip()]
+
+    if sampler is not None:
+        (prof_dir / f"{label}_samples.json").write_text(json.dumps(sampler.to_json(), indent=1))
+        with (prof_dir / f"{label}.folded").open("w") as f:
+            for stack, n in sampler.stacks.most_common():
+                f.write(f"{stack} {n}\n")
+        report += ["", f"== samples ({sampler.samples} x {sampler.interval * 1e3:g} ms, self) =="]
+        for key, n in sampler.self_counts.most_common(TOP_FUNCTIONS):
+            report.append(f"{n:>8}  {key}")
+
+    if snapshot is not None:
+        sites = _allocation_sites(snapshot, TOP_ALLOCATIONS)
+        (prof_dir / f"{label}_alloc.json").write_text(json.dumps({
+            "peak": peak,
+            "sites": sites,
+        }, indent=1))
+        report += ["", f"== tracemalloc (peak {peak / 2**20:.1f} MiB, live at exit) =="]
+        for site in sites[:TOP_FUNCTIONS]:
+            report.append(f"{site['size'] / 1024:>10.1f} KiB {site['count']:>8}  "
+                          f"{site['file']}:{site['line']}  {site['code']}")
+
+    (prof_dir / f"{label}.txt").write_text("\n".join(report) + "\n")
+    print(f"[PROFILE] {label} -> {prof_dir}")
+
+
+# ---------------------------------------------------------------------------
+# Merging a batch
+# ---------------------------------------------------------------------------
+
+def iter_profile_files(roots: List[Path], suffix: str, label: Optional[str] = None) -> Iterator[Path]:
+    pattern = f"{label or '*'}{suffix}"
+    for root in roots:
+        yield from sorted(root.rglob(f"{PROFILE_DIRNAME}/{pattern}"))
+
+
+def merge_cpu(files: List[Path], sort: str, top: int, out: Optional[Path] = None) -> None:
+    stats = pstats.Stats(str(files[0]))
+    for path in files[1:]:
+        stats.add(str(path))
+    if out is not None:
+        stats.dump_stats(str(out))
+        print(f"[PROFILE] merged cProfile stats -> {out}")
+    print(f"== cProfile: {len(files)} profiles, {stats.total_tt:.3f}s total, by {sort} ==")
+    stats.files = []  # print_stats would list every merged file first
+    stats.sort_stats(sort).print_stats(top)
+
+    slowest = sorted(
+        ((pstats.Stats(str(p)).total_tt, p) for p in files), key=lambda t: -t[0]
+    )[:min(top, 10)]
+    print("Slowest profiles:")
+    for total, path in slowest:
+        print(f"  {total:>10.3f}s  {path}")
+    print()
+
+
+def merge_samples(files: List[Path], top: int) -> None:
+    self_counts: Counter = Counter()
+    cum_counts: Counter = Counter()
+    seconds = 0.0
+    for path in files:
+        data = json.loads(path.read_text())
+        seconds += data["samples"] * data["interval"]
+        for key, (n_self, n_cum) in data["functions"].items():
+            self_counts[key] += n_self * data["interval"]
+            cum_counts[key] += n_cum * data["interval"]
+    print(f"== samples: {len(files)} profiles, ~{seconds:.1f}s sampled ==")
+    print(f"{'self s':>10} {'cum s':>10}  function")
+    for key, s in self_counts.most_common(top):
+        print(f"{s:>10.2f} {cum_counts[key]:>10.2f}  {key}")
+    print()
+
+
+def merge_alloc(files: List[Path], top: int) -> None:
+    sites: Dict[Tuple[str, int], List] = defaultdict(lambda: [0, 0, 0, ""])
+    peaks = []
+    for path in files:
+        data = json.loads(path.read_text())
+        peaks.append((data.get("peak") or 0, path))
+        for site in data["sites"]:
+            agg = sites[(site["file"], site["line"])]
+            agg[0] += site["size"]
+            agg[1] += site["count"]
+            agg[2] += 1
+            agg[3] = site["code"]
+    print(f"== tracemalloc: {len(files)} profiles ==")
+    print(f"{'KiB':>12} {'blocks':>9} {'progs':>6}  site")
+    for (file, line), (size, count, progs, code) in sorted(
+        sites.items(), key=lambda kv: -kv[1][0]
+    )[:top]:
+        print(f"{size / 1024:>12.1f} {count:>9} {progs:>6}  {file}:{line}  {code}")
+    print("Highest peaks:")
+    for peak, path in sorted(peaks, key=lambda t: -t[0])[:min(top, 10)]:
+        print(f"  {peak / 2**20:>10.1f} MiB  {path}")
+    print()
+
+
+def merge(roots: List[Path], label: Optional[str] = None, sort: str = "cumulative",
+          top: int = 25, out: Optional[Path] = None) -> int:
+    """Print corpus-wide hot functions / allocation sites; returns the profile count."""
+    cpu = list(iter_profile_files(roots, ".prof", label))
+    samples = list(iter_profile_files(roots, "_samples.json", label))
+    alloc = list(iter_profile_files(roots, "_alloc.json", label))
+    if cpu:
+        merge_cpu(cpu, sort, top, out)
+    if samples:
+        merge_samples(samples, top)
+    if alloc:
+        merge_alloc(alloc, top)
+    return len(cpu) + len(samples) + len(alloc)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Inspect COBREX profiles.")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p_merge = sub.add_parser("merge", help="Merge every PROFILE/ directory under the roots")
+    p_merge.add_argument("roots", nargs="+", type=Path, help="e.g. output")
+    p_merge.add_argument("--label", default=None,
+                         help="Only one stage: extractor, dfg, pdg, program_index, "
+                              "pipeline, pipeline_prepare, pipeline_llm")
+    p_merge.add_argument("--sort", default="cumulative",
+                         choices=("cumulative", "tottime", "ncalls"),
+                         help="cProfile sort key (default: cumulative)")
+    p_merge.add_argument("--top", type=int, default=25)
+    p_merge.add_argument("--out", type=Path, default=None,
+                         help="Also write the merged cProfile stats (snakeviz, pstats)")
+
+    args = parser.parse_args(argv)
+    if not merge(args.roots, args.label, args.sort, args.top, args.out):
+        print(f"[PROFILE] No profiles under {[str(r) for r in args.roots]}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -10,6 +10,18 @@ Usage examples:
   # run only for one project
   python run_all_projects_static.py --projects IBM_example-health-apis
 
+  # no `dot` during extraction; PDFs rendered in parallel at the end
+  python run_all_projects_static.py --render deferred
+
+  # preprocess each project's programs in one parallel batch first
+  python run_all_projects_static.py --batch-preprocess
+
+  # per-program / per-stage timing spans (see tracing.py)
+  python run_all_projects_static.py --trace output/trace.jsonl
+
+  # cProfile + tracemalloc per program, merged hot functions at the end
+  python run_all_projects_static.py --profile
+
 Assumptions:
   - COBOL sources live under: data/project_clean/<project_name>/*.cbl
   - extractor.py will write static outputs to:
@@ -17,10 +29,18 @@ Assumptions:
 """
 
 import argparse
+import os
+import shutil
 import subprocess
 import sys
 from pathlib import Path
 
+from graph_render import RENDER_MODES, drain_queue, set_render_mode
+from copybook_cache import CopybookResolver
+from preprocessor import ProleapService, preprocess_batch
+from profiling import add_profile_argument, merge as merge_profiles, profile_modes, set_profile_modes
+from tracing import TRACE_FORMATS, enable_tracing, span
+
 
 DEFAULT_PROJECTS_ROOT = Path("data") / "project_clean"
 DEFAULT_OUTPUT_ROOT = Path("output")
@@ -66,18 +86,52 @@ def run_extractor_for_file(
     print(f"--- [{project_name}] {cobol_path.name} (program={prog_name}) ---")
     print(f"[RUN] python extractor.py {cobol_path}")
 
-    try:
-        subprocess.run(
-            [sys.executable, "extractor.py", str(cobol_path)],
-            check=True,
-        )
-        return True
-    except subprocess.CalledProcessError as e:
-        print(
-            f"[ERROR] Failure for {cobol_path}: "
-            f"Command {e.cmd!r} returned non-zero exit status {e.returncode}."
-        )
-        return False
+    with span("program", prog=prog_name, project=project_name) as sp:
+        try:
+            subprocess.run(
+                [sys.executable, "extractor.py", str(cobol_path)],
+                check=True,
+                env=sp.env(),
+            )
+            return True
+        except subprocess.CalledProcessError as e:
+            sp.fail(f"exit status {e.returncode}")
+            print(
+                f"[ERROR] Failure for {cobol_path}: "
+                f"Command {e.cmd!r} returned non-zero exit status {e.returncode}."
+            )
+            return False
+
+
+def redo_changed_programs(
+    cobol_files: list[Path],
+    project_name: str,
+    output_root: Path,
+    copybooks: CopybookResolver,
+) -> list[Path]:
+    """
+    Remove the COBOL_<prog> dirs of programs whose source or any copybook
+    they include changed since their last expansion, so they are
+    preprocessed and extracted again. Returns those programs.
+    """
+    changed = []
+    for path in cobol_files:
+        prog_out_dir = output_root / project_name / f"COBOL_{path.stem}"
+        if not prog_out_dir.exists():
+            continue
+        if not copybooks.tracked(path):
+            # extracted before the dependency graph existed: record today's
+            # copybooks as its baseline
+            copybooks.expand(path)
+        elif copybooks.is_stale(path):
+            changed.append(path)
+
+    for path in changed:
+        prog_out_dir = output_root / project_name / f"COBOL_{path.stem}"
+        print(f"[COPYBOOK] {path.name} or a copybook it includes changed; "
+              f"re-extracting → {prog_out_dir}")
+        shutil.rmtree(prog_out_dir)
+    return changed
 
 
 def main(argv: list[str] | None = None) -> int:
@@ -106,12 +160,74 @@ def main(argv: list[str] | None = None) -> int:
             "projects-root are processed."
         ),
     )
+    parser.add_argument(
+        "--render",
+        choices=RENDER_MODES,
+        default=None,
+        help="Graphviz policy for the static stages: pdf (render now), dot "
+             "(DOT sources only), deferred (queue PDFs, render them after "
+             "extraction), off (no graphs). "
+             "Default: $COBREX_RENDER or pdf",
+    )
+    parser.add_argument(
+        "--render-workers",
+        type=int,
+        default=os.cpu_count() or 4,
+        help="Parallel `dot` processes for --render deferred (default: CPU count)",
+    )
+    parser.add_argument(
+        "--batch-preprocess",
+        action="store_true",
+        help="Preprocess each project's pending programs in one parallel cobc "
+             "batch (into <output-root>/<project>/preprocessed) instead of "
+             "once per extractor.py run",
+    )
+    parser.add_argument(
+        "--proleap",
+        action="store_true",
+        help="With --batch-preprocess, also run the ProLeap preprocessor "
+             "through one long-lived JVM",
+    )
+    parser.add_argument(
+        "--copybooks",
+        nargs="*",
+        type=Path,
+        default=None,
+        help="With --batch-preprocess, inline COPYs from these directories "
+             "through a cached resolver (default: ./copybooks). Its cache and "
+             "program->copybook graph live in <output-root>/.copybook_cache; "
+             "programs whose source or copybooks changed are re-extracted",
+    )
+    parser.add_argument(
+        "--trace",
+        type=Path,
+        default=None,
+        help="Append per-program and per-stage timing spans to this file "
+             "(summarise with `python tracing.py summary FILE`)",
+    )
+    parser.add_argument(
+        "--trace-format",
+        choices=TRACE_FORMATS,
+        default="jsonl",
+        help="Trace file format: jsonl (default) or chrome (chrome://tracing, Perfetto)",
+    )
+    add_profile_argument(parser)
 
     args = parser.parse_args(argv)
 
     projects_root: Path = args.projects_root
     output_root: Path = args.output_root
 
+    # Inherited by every extractor.py subprocess
+    if args.render is not None:
+        set_render_mode(args.render)
+    render_queue = output_root / "render_queue.jsonl"
+    os.environ["COBREX_RENDER_QUEUE"] = str(render_queue)
+    if args.trace is not None:
+        enable_tracing(args.trace, args.trace_format)
+    # every extractor.py run profiles itself into its COBOL_<PROG>/PROFILE
+    set_profile_modes(args.profile)
+
     if args.projects:
         projects = args.projects
     else:
@@ -125,6 +241,12 @@ def main(argv: list[str] | None = None) -> int:
     print()
 
     any_failures = False
+    proleap = ProleapService().start() if args.batch_preprocess and args.proleap else None
+    copybooks = None
+    if args.batch_preprocess and args.copybooks is not None:
+        copybooks = CopybookResolver(
+            args.copybooks or None, cache_dir=output_root / ".copybook_cache"
+        )
 
     for proj in projects:
         proj_dir = projects_root / proj
@@ -139,12 +261,45 @@ def main(argv: list[str] | None = None) -> int:
         )
         print()
 
+        if copybooks is not None:
+            redo_changed_programs(cobol_files, proj, output_root, copybooks)
+
+        if args.batch_preprocess:
+            pending = [
+                p for p in cobol_files
+                if not (output_root / proj / f"COBOL_{p.stem}").exists()
+            ]
+            pre_dir = output_root / proj / "preprocessed"
+            with span("preprocess_batch", project=proj) as sp:
+                results = preprocess_batch(
+                    pending, pre_dir, proleap=proleap, copybooks=copybooks
+                )
+                sp.count(programs=len(results))
+            for src, res in results.items():
+                if isinstance(res, Exception):
+                    print(f"[WARN] Batch preprocessing failed for {src}: {res}")
+            # extractor.py picks up <stem>.cbl from here, else runs cobc itself
+            os.environ["COBREX_PREPROCESSED_DIR"] = str(pre_dir.resolve())
+            print()
+
         for cobol_path in cobol_files:
             ok = run_extractor_for_file(cobol_path, proj, output_root)
             if not ok:
                 any_failures = True
             print()  # blank line between files
 
+    if proleap is not None:
+        proleap.close()
+
+    if os.environ.get("COBREX_RENDER") == "deferred":
+        with span("render_deferred"):
+            if drain_queue(render_queue, workers=args.render_workers):
+                any_failures = True
+
+    if profile_modes():
+        print("[PROFILE] Corpus-wide hot spots (python profiling.py merge for more):")
+        merge_profiles([output_root], top=20)
+
     if any_failures:
         return 1
     return 0
@@ -0,0 +1,618 @@
+#!/usr/bin/env python3
+"""
+Per-stage performance benchmark for the COBREX / mocktail pipeline.
+
+Every input program goes through the pipeline stages in order:
+
+  preprocess     preprocessor.preprocess (cobc -E)      -> clean_output.cbl
+  parse          ParsingUnit.main.extractor              -> CFG/CFG_<P>.json
+  rbb            RBB IR + RBB graph                      -> RBB/
+  brr            BR_Realisation.doBRR                    -> Rules/
+  dfg            DFG/build_dfg.py                        -> DFG/
+  pdg            PDG/build_pdg.py                        -> PDG/
+  br_json        summarizer.build_br_json_from_dot       -> BR_<P>.json
+  program_index  summarizer.program_index                -> INDEX/
+  br_rep         summarizer.br_representation            -> BR_REP/
+  prompts        summarizer.run_summarization            -> BR_PROMPTS/
+  llm_mock       rule + file level summarisation with generate_text_with_stats stubbed
+
+Each stage runs in its own child process (this script, --stage NAME). So
+every stage is measured on its own, without earlier stages skewing it:
+
+  wall_s          wall time of the stage body (imports / setup excluded)
+  cpu_s           user+sys CPU of the stage, including its subprocesses
+                  (cobc, dot)
+  peak_rss_kb     peak RSS of the process that ran the stage
+  artifact_bytes  bytes the stage added to the program's output directory
+
+brr needs the in-memory IR. Its child rebuilds the IR outside the timed
+region, so the IR does count towards its peak RSS.
+
+An input is either a COBOL source (.cbl/.cob) or a COBREX CFG JSON
+(CFG_<PROG>.json). A CFG input starts at `rbb`, so the later stages can be
+benchmarked without cobc or the parser, e.g. on synthetic CFGs. Once a stage
+fails, the program's remaining stages are recorded as "skipped".
+
+Every record carries the input's size: CFG nodes for a CFG input, source
+lines for a COBOL input. With --scaling, each stage gets a fitted exponent k
+in time ~ size^k over all inputs (least squares on log-log), plus its time
+per size. Use it on gen_synthetic_inputs.py programs of growing size, where
+k near 1 is linear and k near 2 is quadratic.
+
+Results are one JSON file. With --baseline, every (program, stage) and every
+stage total is compared against an earlier results file. Growth beyond
+--threshold in wall_s, cpu_s or peak_rss_kb is reported as a regression, and
+the exit status is 1.
+
+Usage:
+
+    python run_benchmarks.py                                  # Benchmarksuite/
+    python run_benchmarks.py --render off --out bench/new.json
+    python run_benchmarks.py --baseline bench/base.json --threshold 0.15
+    python run_benchmarks.py --current bench/new.json --baseline bench/base.json
+    python run_benchmarks.py output/synthetic/CFG_SYN*.json --render off --scaling
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import os
+import platform
+import resource
+import runpy
+import shutil
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from graph_render import RENDER_MODES, set_render_mode
+
+
+ROOT_DIR = Path(__file__).resolve().parent
+DEFAULT_INPUTS = [ROOT_DIR / "Benchmarksuite"]
+DEFAULT_WORK_ROOT = Path("output") / "bench"
+DEFAULT_RESULTS = DEFAULT_WORK_ROOT / "results.json"
+
+STAGES = [
+    "preprocess",
+    "parse",
+    "rbb",
+    "brr",
+    "dfg",
+    "pdg",
+    "br_json",
+    "program_index",
+    "br_rep",
+    "prompts",
+    "llm_mock",
+]
+# stages a CFG_<PROG>.json input starts from
+CFG_INPUT_FIRST_STAGE = "rbb"
+
+METRICS = ("wall_s", "cpu_s", "peak_rss_kb")
+# ignore relative changes on values this small (timer / allocator noise)
+METRIC_FLOORS = {"wall_s": 0.05, "cpu_s": 0.05, "peak_rss_kb": 4096}
+
+SOURCE_SUFFIXES = (".cbl", ".cob", ".CBL", ".COB")
+
+
+# ---------------------------------------------------------------------------
+# Inputs
+# ---------------------------------------------------------------------------
+
+def discover_inputs(paths: List[Path]) -> List[Path]:
+    """COBOL sources and CFG_*.json files named directly or found in directories."""
+    found: List[Path] = []
+    for p in paths:
+        if p.is_dir():
+            for child in sorted(p.iterdir()):
+                if child.is_file() and (
+                    child.suffix in SOURCE_SUFFIXES
+                    or (child.name.startswith("CFG_") and child.suffix == ".json")
+                ):
+                    found.append(child)
+        elif p.is_file():
+            found.append(p)
+        else:
+            print(f"[BENCH][WARN] No such input: {p}")
+    return found
+
+
+def program_name(path: Path) -> str:
+    if path.suffix == ".json" and path.stem.startswith("CFG_"):
+        return path.stem[len("CFG_"):]
+    return path.stem
+
+
+def stages_for(path: Path) -> List[str]:
+    if path.suffix == ".json":
+        return STAGES[STAGES.index(CFG_INPUT_FIRST_STAGE):]
+    return list(STAGES)
+
+
+def input_size(path: Path) -> tuple:
+    """(size, unit): CFG nodes for a CFG input, lines for a COBOL source."""
+    if path.suffix == ".json":
+        with open(path) as f:
+            data = json.load(f)
+        return len(data.get("nodes") or data.get("Nodes") or []), "cfg_nodes"
+    with open(path, errors="ignore") as f:
+        return sum(1 for _ in f), "source_lines"
+
+
+def _dir_bytes(path: Path) -> int:
+    total = 0
+    for dirpath, _, files in os.walk(path):
+        for f in files:
+            try:
+                total += os.lstat(os.path.join(dirpath, f)).st_size
+            except OSError:
+                pass
+    return total
+
+
+# ---------------------------------------------------------------------------
+# Stage bodies (run inside the --stage child, cwd = the program's work dir)
+# ---------------------------------------------------------------------------
+
+class StageContext:
+    def __init__(self, prog: str, source: Path):
+        self.prog = prog
+        self.source = source
+        self.prog_dir = Path("output") / f"COBOL_{prog}"
+        self.cfg_json = self.prog_dir / "CFG" / f"CFG_{prog}.json"
+
+
+def _run_script(path: Path, argv: List[str]) -> None:
+    # like `python path`: the script's directory comes first on sys.path
+    sys.path.insert(0, str(path.parent))
+    sys.argv = [str(path)] + argv
+    runpy.run_path(str(path), run_name="__main__")
+
+
+def _run_module(name: str, argv: List[str]) -> None:
+    sys.argv = [name] + argv
+    runpy.run_module(name, run_name="__main__", alter_sys=True)
+
+
+def _build_ir(ctx: StageContext):
+    from IRBuilder import IR
+
+    ir = IR()
+    with open(ctx.cfg_json) as f:
+        cfg = json.load(f)
+    ir.buildIR(cfg, ctx.prog)
+    return ir
+
+
+def _setup_none(ctx: StageContext):
+    return None
+
+
+def _stage_preprocess(ctx: StageContext, _):
+    from preprocessor import preprocess
+
+    preprocess(str(ctx.source))
+    if not Path("clean_output.cbl").exists():
+        raise FileNotFoundError("clean_output.cbl was not created by preprocess()")
+
+
+def _stage_parse(ctx: StageContext, _):
+    from ParsingUnit.main import extractor
+
+    extractor("clean_output.cbl", ctx.prog, str(ctx.source), "output")
+
+
+def _stage_rbb(ctx: StageContext, _):
+    ir = _build_ir(ctx)
+    rbb_dir = ctx.prog_dir / "RBB"
+    rbb_dir.mkdir(parents=True, exist_ok=True)
+    ir_json = ir.getJSON(str(rbb_dir / f"RBB_{ctx.prog}.json"))
+    ir.getPDF(str(rbb_dir / f"RBB_{ctx.prog}"), ir_json, "pdf")
+
+
+def _stage_brr(ctx: StageContext, ir):
+    from main import doBRR
+
+    doBRR(ir.rootNode)
+
+
+def _stage_dfg(ctx: StageContext, _):
+    _run_script(ROOT_DIR / "DFG" / "build_dfg.py", [str(ctx.cfg_json)])
+
+
+def _stage_pdg(ctx: StageContext, _):
+    _run_script(ROOT_DIR / "PDG" / "build_pdg.py", [str(ctx.cfg_json)])
+
+
+def _stage_br_json(ctx: StageContext, _):
+    _run_module("summarizer.build_br_json_from_dot", [
+        "--prog", ctx.prog,
+        "--rules-dir", str(ctx.prog_dir / "Rules"),
+        "--out-json", str(ctx.prog_dir / f"BR_{ctx.prog}.json"),
+    ])
+
+
+def _stage_program_index(ctx: StageContext, _):
+    _run_module("summarizer.program_index", [
+        "--prog", ctx.prog,
+        "--base-dir", str(ctx.prog_dir),
+        "--br-json", str(ctx.prog_dir / f"BR_{ctx.prog}.json"),
+    ])
+
+
+def _stage_br_rep(ctx: StageContext, _):
+    _run_module("summarizer.br_representation", [
+        "--prog", ctx.prog,
+        "--base-dir", str(ctx.prog_dir),
+    ])
+
+
+def _stage_prompts(ctx: StageContext, _):
+    from summarizer.run_summarization import build_prompts_for_program
+    from summarizer.mocktail_config import DEFAULT_MOCKTAIL_MODES
+
+    build_prompts_for_program(ctx.prog, ctx.prog_dir, list(DEFAULT_MOCKTAIL_MODES))
+
+
+def _mock_generate_text_with_stats(model: str, prompt: str, timeout: Optional[int] = None,
+                                   queued_at: Optional[float] = None):
+    """Stand-in for ollama_utils.generate_text_with_stats: no model, fixed-size answer."""
+    from llm_telemetry import LLMCallStats
+
+    text = f"[mock:{model}] summary of a {len(prompt)}-character prompt.\n"
+    # ~4 characters per token, so telemetry sidecars and roll-ups get exercised
+    stats = LLMCallStats(model=model, backend="mock", prompt_chars=len(prompt),
+                         response_chars=len(text), prompt_eval_count=len(prompt) // 4,
+                         eval_count=len(text) // 4)
+    return text, stats
+
+
+def _stage_llm_mock(ctx: StageContext, _):
+    import mtp_full_pipeline_all_projects as pipeline
+    from summarizer.mocktail_config import DEFAULT_MOCKTAIL_MODES
+
+    pipeline.generate_text_with_stats = _mock_generate_text_with_stats
+    modes = list(DEFAULT_MOCKTAIL_MODES)
+    # the whole-file fallback prompt embeds the COBOL source; a CFG input has none
+    cobol_file = ctx.source if ctx.source.suffix in SOURCE_SUFFIXES else ctx.prog_dir / "NO_SOURCE"
+    pipeline.generate_rule_level_summaries_for_program(
+        ctx.prog, ctx.prog_dir, modes, "mock", cobol_file, overwrite=True,
+    )
+    pipeline.generate_file_level_summaries_for_program(
+        ctx.prog, ctx.prog_dir, modes, "mock", overwrite=True,
+    )
+
+
+# name -> (setup outside the timed region, timed body)
+STAGE_FUNCS: Dict[str, tuple] = {
+    "preprocess": (_setup_none, _stage_preprocess),
+    "parse": (_setup_none, _stage_parse),
+    "rbb": (_setup_none, _stage_rbb),
+    "brr": (_build_ir, _stage_brr),
+    "dfg": (_setup_none, _stage_dfg),
+    "pdg": (_setup_none, _stage_pdg),
+    "br_json": (_setup_none, _stage_br_json),
+    "program_index": (_setup_none, _stage_program_index),
+    "br_rep": (_setup_none, _stage_br_rep),
+    "prompts": (_setup_none, _stage_prompts),
+    "llm_mock": (_setup_none, _stage_llm_mock),
+}
+
+
+def _cpu_now() -> float:
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    kids = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + kids.ru_utime + kids.ru_stime
+
+
+def run_stage_in_process(stage: str, prog: str, source: Path, result_file: Path) -> int:
+    """Body of the --stage child: time one stage and write its record."""
+    for extra in (ROOT_DIR, ROOT_DIR / "RBB", ROOT_DIR / "BR_Realisation"):
+        if str(extra) not in sys.path:
+            sys.path.insert(0, str(extra))
+
+    ctx = StageContext(prog, source)
+    setup, body = STAGE_FUNCS[stage]
+    record = {"status": "ok", "error": None}
+    try:
+        state = setup(ctx)
+        cpu0, t0 = _cpu_now(), time.perf_counter()
+        try:
+            body(ctx, state)
+        finally:
+            record["wall_s"] = time.perf_counter() - t0
+            record["cpu_s"] = _cpu_now() - cpu0
+    except SystemExit as e:
+        # the static stages report failures with sys.exit(1)
+        if e.code not in (None, 0):
+            record.update(status="error", error=f"SystemExit({e.code})")
+    except BaseException as e:
+        record.update(status="error", error=repr(e))
+
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    kids = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    scale = 1024 if sys.platform == "darwin" else 1
+    record["peak_rss_kb"] = max(own, kids) // scale
+
+    result_file.write_text(json.dumps(record))
+    return 0 if record["status"] == "ok" else 1
+
+
+# ---------------------------------------------------------------------------
+# Driver
+# ---------------------------------------------------------------------------
+
+def prepare_work_dir(work_dir: Path, source: Path, prog: str) -> None:
+    if work_dir.exists():
+        shutil.rmtree(work_dir)
+    (work_dir / "logs").mkdir(parents=True)
+    # BR_Realisation reads businessVariables.txt from the working directory
+    shutil.copy(ROOT_DIR / "businessVariables.txt", work_dir / "businessVariables.txt")
+    if source.suffix == ".json":
+        cfg_dir = work_dir / "output" / f"COBOL_{prog}" / "CFG"
+        cfg_dir.mkdir(parents=True)
+        shutil.copy(source, cfg_dir / f"CFG_{prog}.json")
+
+
+def benchmark_program(source: Path, work_root: Path,
+                      stages: Optional[List[str]] = None) -> List[dict]:
+    """Run every stage for one input in its own child process."""
+    prog = program_name(source)
+    source = source.resolve()
+    work_dir = (work_root / prog).resolve()
+    prepare_work_dir(work_dir, source, prog)
+    prog_dir = work_dir / "output" / f"COBOL_{prog}"
+    size, size_unit = input_size(source)
+
+    records = []
+    failed_at = None
+    for stage in stages_for(source):
+        if stages and stage not in stages:
+            continue
+        rec = {"program": prog, "stage": stage, "input": str(source),
+               "size": size, "size_unit": size_unit}
+        if failed_at is not None:
+            rec.update(status="skipped", error=f"after {failed_at} failed")
+            records.append(rec)
+            continue
+
+        before = _dir_bytes(prog_dir)
+        result_file = work_dir / "logs" / f"{stage}.result.json"
+        with open(work_dir / "logs" / f"{stage}.log", "w") as log:
+            subprocess.run(
+                [sys.executable, str(Path(__file__).resolve()), "--stage", stage,
+                 "--prog", prog, "--source", str(source),
+                 "--result-file", str(result_file)],
+                cwd=str(work_dir), stdout=log, stderr=subprocess.STDOUT,
+            )
+        if result_file.exists():
+            rec.update(json.loads(result_file.read_text()))
+        else:
+            rec.update(status="error", error="stage process died; see logs/" + stage + ".log")
+        rec["artifact_bytes"] = _dir_bytes(prog_dir) - before
+        if rec["status"] != "ok":
+            failed_at = stage
+        records.append(rec)
+        _print_record(rec)
+    return records
+
+
+def _print_record(rec: dict) -> None:
+    if rec["status"] == "ok":
+        print(f"  {rec['stage']:<14} {rec['wall_s']:9.3f}s wall {rec['cpu_s']:9.3f}s cpu "
+              f"{rec['peak_rss_kb'] / 1024:8.1f} MiB  {rec['artifact_bytes']:>10} B")
+    else:
+        print(f"  {rec['stage']:<14} {rec['status'].upper()}: {rec.get('error')}")
+
+
+def stage_totals(records: List[dict]) -> Dict[str, dict]:
+    """Per-stage sums (wall/cpu/artifacts) and max RSS over successful runs."""
+    totals: Dict[str, dict] = {}
+    for rec in records:
+        if rec.get("status") != "ok":
+            continue
+        t = totals.setdefault(rec["stage"], {
+            "programs": 0, "wall_s": 0.0, "cpu_s": 0.0,
+            "peak_rss_kb": 0, "artifact_bytes": 0,
+        })
+        t["programs"] += 1
+        t["wall_s"] += rec["wall_s"]
+        t["cpu_s"] += rec["cpu_s"]
+        t["peak_rss_kb"] = max(t["peak_rss_kb"], rec["peak_rss_kb"])
+        t["artifact_bytes"] += rec["artifact_bytes"]
+    return totals
+
+
+def scaling(records: List[dict]) -> Dict[str, dict]:
+    """
+    Per stage: the exponent k of wall_s ~ size^k (log-log least squares) and
+    the (size, wall_s, cpu_s, peak_rss_kb) points it was fitted to. Needs
+    successful runs at two or more distinct sizes.
+    """
+    points: Dict[str, list] = {}
+    for rec in records:
+        if rec.get("status") == "ok" and rec.get("size", 0) > 0:
+            points.setdefault(rec["stage"], []).append(
+                (rec["size"], rec["wall_s"], rec["cpu_s"], rec["peak_rss_kb"])
+            )
+
+    curves: Dict[str, dict] = {}
+    for stage, pts in points.items():
+        pts.sort()
+        fit = [(math.log(n), math.log(w)) for n, w, _, _ in pts if w > 0]
+        exponent = None
+        if len({x for x, _ in fit}) >= 2:
+            mx = sum(x for x, _ in fit) / len(fit)
+            my = sum(y for _, y in fit) / len(fit)
+            sxx = sum((x - mx) ** 2 for x, _ in fit)
+            exponent = sum((x - mx) * (y - my) for x, y in fit) / sxx
+        curves[stage] = {
+            "exponent": exponent,
+            "points": [
+                {"size": n, "wall_s": w, "cpu_s": c, "peak_rss_kb": r}
+                for n, w, c, r in pts
+            ],
+        }
+    return curves
+
+
+def print_scaling(curves: Dict[str, dict]) -> None:
+    sizes = sorted({p["size"] for c in curves.values() for p in c["points"]})
+    print()
+    print(f"{'stage':<14} {'k':>6}  " + "".join(f"{n:>11}" for n in sizes))
+    for stage in STAGES:
+        c = curves.get(stage)
+        if not c:
+            continue
+        by_size = {p["size"]: p["wall_s"] for p in c["points"]}
+        k = "-" if c["exponent"] is None else f"{c['exponent']:.2f}"
+        cells = "".join(
+            f"{by_size[n]:>10.3f}s" if n in by_size else f"{'':>11}" for n in sizes
+        )
+        print(f"{stage:<14} {k:>6}  {cells}")
+    print("(k: fitted exponent of wall time ~ size^k; columns: wall time per input size)")
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> List[str]:
+    """Return one line per metric that grew by more than `threshold`."""
+    def regressions(key: str, cur: dict, base: dict) -> List[str]:
+        out = []
+        for m in METRICS:
+            if m not in cur or m not in base:
+                continue
+            b, c = base[m], cur[m]
+            if max(b, c) < METRIC_FLOORS[m] or b <= 0:
+                continue
+            change = (c - b) / b
+            if change > threshold:
+                out.append(f"{key:<40} {m:<12} {b:>12.3f} -> {c:>12.3f}  (+{change:.0%})")
+        return out
+
+    lines: List[str] = []
+    base_recs = {
+        (r["program"], r["stage"]): r
+        for r in baseline.get("results", []) if r.get("status") == "ok"
+    }
+    for rec in current.get("results", []):
+        if rec.get("status") != "ok":
+            continue
+        base = base_recs.get((rec["program"], rec["stage"]))
+        if base is not None:
+            lines += regressions(f"{rec['program']}/{rec['stage']}", rec, base)
+
+    base_totals = baseline.get("totals", {})
+    for stage, tot in current.get("totals", {}).items():
+        if stage in base_totals:
+            lines += regressions(f"TOTAL/{stage}", tot, base_totals[stage])
+    return lines
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Benchmark every pipeline stage per program (LLM mocked)."
+    )
+    parser.add_argument(
+        "inputs", nargs="*", type=Path,
+        help="COBOL sources, CFG_<PROG>.json files or directories of them "
+             "(default: Benchmarksuite/)",
+    )
+    parser.add_argument("--out", type=Path, default=DEFAULT_RESULTS,
+                        help=f"Results JSON (default: {DEFAULT_RESULTS})")
+    parser.add_argument("--work-root", type=Path, default=DEFAULT_WORK_ROOT,
+                        help=f"Per-program scratch directories (default: {DEFAULT_WORK_ROOT})")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=None,
+                        help="Only run these stages (default: all)")
+    parser.add_argument(
+        "--render", choices=RENDER_MODES, default=None,
+        help="Graphviz policy for the stages (default: $COBREX_RENDER or pdf)",
+    )
+    parser.add_argument("--baseline", type=Path, default=None,
+                        help="Earlier results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.20,
+                        help="Relative growth reported as a regression (default: 0.20)")
+    parser.add_argument("--scaling", action="store_true",
+                        help="Print per-stage scaling exponents over the input sizes")
+    parser.add_argument("--current", type=Path, default=None,
+                        help="Compare this results JSON with --baseline instead of running")
+
+    # internal: run a single stage (used by the driver's child processes)
+    parser.add_argument("--stage", choices=STAGES, help=argparse.SUPPRESS)
+    parser.add_argument("--prog", help=argparse.SUPPRESS)
+    parser.add_argument("--source", type=Path, help=argparse.SUPPRESS)
+    parser.add_argument("--result-file", type=Path, help=argparse.SUPPRESS)
+
+    args = parser.parse_args(argv)
+
+    if args.stage:
+        return run_stage_in_process(args.stage, args.prog, args.source, args.result_file)
+
+    if args.current is not None:
+        if args.baseline is None:
+            parser.error("--current needs --baseline")
+        current = json.loads(args.current.read_text())
+    else:
+        if args.render is not None:
+            set_render_mode(args.render)
+
+        inputs = discover_inputs(args.inputs or DEFAULT_INPUTS)
+        if not inputs:
+            print("[BENCH] No inputs found.")
+            return 1
+
+        records: List[dict] = []
+        started = time.time()
+        for source in inputs:
+            print(f"[BENCH] {source}")
+            records += benchmark_program(source, args.work_root, args.stages)
+
+        current = {
+            "meta": {
+                "started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(started)),
+                "duration_s": time.time() - started,
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpu_count": os.cpu_count(),
+                "render": os.environ.get("COBREX_RENDER", "pdf"),
+                "inputs": [str(p) for p in inputs],
+            },
+            "results": records,
+            "totals": stage_totals(records),
+            "scaling": scaling(records),
+        }
+        args.out.parent.mkdir(parents=True, exist_ok=True)
+        args.out.write_text(json.dumps(current, indent=2))
+
+        print()
+        print(f"{'stage':<14} {'progs':>5} {'wall_s':>10} {'cpu_s':>10} {'max MiB':>9} {'bytes':>12}")
+        for stage in STAGES:
+            t = current["totals"].get(stage)
+            if t:
+                print(f"{stage:<14} {t['programs']:>5} {t['wall_s']:>10.3f} {t['cpu_s']:>10.3f} "
+                      f"{t['peak_rss_kb'] / 1024:>9.1f} {t['artifact_bytes']:>12}")
+        failed = sum(1 for r in records if r["status"] == "error")
+        print(f"[BENCH] {len(records)} stage runs, {failed} failed → {args.out}")
+
+    if args.scaling:
+        print_scaling(current.get("scaling") or scaling(current.get("results", [])))
+
+    if args.baseline is None:
+        return 0
+
+    lines = compare(current, json.loads(args.baseline.read_text()), args.threshold)
+    if lines:
+        print(f"[BENCH] {len(lines)} regression(s) over {args.threshold:.0%} vs {args.baseline}:")
+        for line in lines:
+            print("  " + line)
+        return 1
+    print(f"[BENCH] No regressions over {args.threshold:.0%} vs {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
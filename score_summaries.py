@@ -0,0 +1,238 @@
+#!/usr/bin/env python
+"""
+Standalone batch scorer for file-level summaries.
+
+Re-scores every FILE_SUMMARY_<PROG>_<MODE>.txt already present under
+--output-root against the human references, without touching the static,
+BR/index, prompt or LLM stages:
+
+  1) Load all references once (CSV first, human_references_generated as
+     fallback) into one pandas table keyed like the pipeline keys files.
+  2) Glob every LLM/file_level/FILE_SUMMARY_*.txt in a single pass, and key
+     each by its source's path under --projects-root, as the driver does.
+  3) Join summaries to references and score the whole corpus in one batch
+     with eval_metrics.score_corpus.
+  4) Write the same eval_per_file.csv / eval_per_project.csv layouts as
+     mtp_full_pipeline_all_projects.py.
+
+Supported output layouts (as produced by run_all_projects_static.py):
+
+    <output-root>/<project>/COBOL_<PROG>/LLM/file_level/FILE_SUMMARY_<PROG>_<MODE>.txt
+    <output-root>/COBOL_<PROG>/LLM/file_level/...     (project = output-root name)
+
+Usage:
+
+    python score_summaries.py \\
+        --output-root    output \\
+        --projects-root  data/project_clean \\
+        --ref-csv        data/file_level_reference_dataset.csv \\
+        --human-ref-root data/human_references_generated
+"""
+
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import pandas as pd
+
+from mtp_full_pipeline_all_projects import (
+    load_human_generated_refs,
+    load_references_from_csv,
+    merge_references,
+    program_id_for_file,
+    score_file_summaries,
+    write_eval_outputs,
+)
+from summarizer.mocktail_config import DEFAULT_MOCKTAIL_MODES
+
+COBOL_SUFFIXES = (".cbl", ".cob")
+
+
+def load_reference_table(ref_csv: Path | None, human_root: Path | None) -> pd.DataFrame:
+    """All references as one table: key -> reference (CSV wins over human refs)."""
+    csv_refs = load_references_from_csv(ref_csv) if ref_csv is not None else {}
+    human_refs = load_human_generated_refs(human_root) if human_root is not None else {}
+    merged = merge_references(csv_refs, human_refs)
+    return pd.DataFrame({"key": list(merged.keys()), "ref": list(merged.values())})
+
+
+def discover_sources(projects_root: Path) -> Dict[Tuple[str, str], str]:
+    """
+    (project, prog) -> reference key of every COBOL source under
+    projects_root: its relative path, e.g. "proj/batch/PAYROLL.CBL", which
+    is how mtp_full_pipeline_all_projects.py keys references.
+    """
+    keys: Dict[Tuple[str, str], str] = {}
+    # the driver only processes *.cbl, so those win over a same-named .CBL / .cob
+    for path in sorted(projects_root.rglob("*"), key=lambda p: (p.suffix != ".cbl", p)):
+        if path.suffix.lower() not in COBOL_SUFFIXES or not path.is_file():
+            continue
+        rel = path.relative_to(projects_root)
+        project = rel.parts[0] if len(rel.parts) > 1 else projects_root.name
+        prog = program_id_for_file(project, path, projects_root)
+        keys.setdefault((project, prog), "/".join(rel.parts))
+    return keys
+
+
+def discover_file_summaries(
+    output_root: Path,
+    modes: List[str],
+    sources: Dict[Tuple[str, str], str] | None = None,
+) -> pd.DataFrame:
+    """
+    One glob over output_root for file-level summaries.
+
+    relative_cbl comes from `sources` (see discover_sources); without it, or
+    for a program it lacks, it is guessed as "<project>/<prog>.cbl".
+
+    Returns a table with project / relative_cbl / prog_id / mode / path.
+    """
+    sources = sources or {}
+    wanted = set(modes)
+    records = []
+    for path in output_root.glob("**/LLM/file_level/FILE_SUMMARY_*.txt"):
+        prog_dir = path.parents[2]
+        prog = prog_dir.name
+        if prog.startswith("COBOL_"):
+            prog = prog[len("COBOL_"):]
+
+        prefix = f"FILE_SUMMARY_{prog}_"
+        if not path.stem.startswith(prefix):
+            continue
+        mode = path.stem[len(prefix):]
+        if mode not in wanted:
+            continue
+
+        if prog_dir.parent == output_root:
+            project = output_root.name
+        else:
+            project = prog_dir.parent.relative_to(output_root).parts[0]
+
+        records.append(
+            {
+                "project": project,
+                "relative_cbl": sources.get((project, prog), f"{project}/{prog}.cbl"),
+                "prog_id": prog,
+                "mode": mode,
+                "path": str(path),
+            }
+        )
+
+    columns = ["project", "relative_cbl", "prog_id", "mode", "path"]
+    return pd.DataFrame.from_records(records, columns=columns)
+
+
+def attach_references(summaries: pd.DataFrame, refs: pd.DataFrame) -> pd.DataFrame:
+    """
+    Join references onto summaries: the source's path under the projects
+    root first, then the bare file name (same fallback order as the
+    all-projects driver).
+    """
+    out = summaries.merge(
+        refs.rename(columns={"key": "relative_cbl"}), on="relative_cbl", how="left"
+    )
+    basename = out["relative_cbl"].str.rsplit("/", n=1).str[-1]
+    by_name = refs.set_index("key")["ref"]
+    out["ref"] = out["ref"].fillna(basename.map(by_name))
+    return out
+
+
+def score_output_root(
+    output_root: Path,
+    ref_csv: Path | None,
+    human_ref_root: Path | None,
+    modes: List[str],
+    per_file_csv: Path,
+    per_project_csv: Path,
+    projects_root: Path | None = None,
+) -> None:
+    refs = load_reference_table(ref_csv, human_ref_root)
+    sources = None
+    if projects_root is not None:
+        sources = discover_sources(projects_root)
+        print(f"[SCORE] {len(sources)} COBOL sources under {projects_root}")
+    else:
+        print("[SCORE][WARN] No --projects-root; assuming sources are <project>/<PROG>.cbl")
+    summaries = discover_file_summaries(output_root, modes, sources)
+    print(f"[SCORE] {len(summaries)} file-level summaries under {output_root}")
+
+    table = attach_references(summaries, refs)
+    missing = table["ref"].isna()
+    if missing.any():
+        for key in sorted(table.loc[missing, "relative_cbl"].unique()):
+            print(f"[EVAL][WARN] No reference found for {key}, skipping evaluation")
+        table = table[~missing]
+
+    table = table.sort_values(["project", "relative_cbl", "mode"], kind="stable")
+    table["pred"] = [Path(p).read_text(encoding="utf-8") for p in table["path"]]
+
+    pending = table[["project", "relative_cbl", "prog_id", "mode", "pred", "ref"]].to_dict("records")
+    per_file_rows = score_file_summaries(pending)
+    write_eval_outputs(per_file_rows, per_file_csv, per_project_csv)
+
+
+def main(argv: List[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Re-score existing file-level summaries (no static or LLM stages)."
+    )
+    parser.add_argument(
+        "--output-root",
+        type=Path,
+        required=True,
+        help="Root for COBREX outputs (COBOL_<PROG> dirs)",
+    )
+    parser.add_argument(
+        "--projects-root",
+        type=Path,
+        default=None,
+        help="Root of the cleaned projects the summaries were generated from; "
+             "references are keyed by each source's path under it (needed for "
+             "nested projects and .CBL / .cob sources)",
+    )
+    parser.add_argument(
+        "--ref-csv",
+        type=Path,
+        default=None,
+        help="CSV with human file-level references",
+    )
+    parser.add_argument(
+        "--human-ref-root",
+        type=Path,
+        default=None,
+        help="Root of human_references_generated",
+    )
+    parser.add_argument(
+        "--modes",
+        nargs="+",
+        default=list(DEFAULT_MOCKTAIL_MODES),
+        help=f"Mocktail modes (default: {list(DEFAULT_MOCKTAIL_MODES)})",
+    )
+    parser.add_argument(
+        "--per-file-csv",
+        type=Path,
+        default=Path("data/eval_per_file.csv"),
+        help="Where to write per-file metrics CSV.",
+    )
+    parser.add_argument(
+        "--per-project-csv",
+        type=Path,
+        default=Path("data/eval_per_project.csv"),
+        help="Where to write per-project metrics CSV.",
+    )
+    args = parser.parse_args(argv)
+
+    score_output_root(
+        output_root=args.output_root,
+        ref_csv=args.ref_csv,
+        human_ref_root=args.human_ref_root,
+        modes=args.modes,
+        per_file_csv=args.per_file_csv,
+        per_project_csv=args.per_project_csv,
+        projects_root=args.projects_root,
+    )
+
+
+if __name__ == "__main__":
+    main()
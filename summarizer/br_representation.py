@@ -5,6 +5,8 @@ import os
 from collections import defaultdict
 from typing import Dict, Any, List, Tuple
 
+from tracing import span
+
 
 def load_program_index(path: str) -> dict:
     with open(path, "r") as f:
@@ -187,6 +189,11 @@ def build_br_representation_for_prog(
     Load ProgramIndex_<PROG>.json and for each br_id
     build a BR representation JSON with multi-view info.
     """
+    with span("br_rep", prog=prog_name) as sp:
+        sp.count(reps=_build_br_representation_for_prog(prog_name, base_output_dir))
+
+
+def _build_br_representation_for_prog(prog_name: str, base_output_dir: str) -> int:
     index_path = os.path.join(
         base_output_dir, "INDEX", f"ProgramIndex_{prog_name}.json"
     )
@@ -202,6 +209,7 @@ def build_br_representation_for_prog(
     out_dir = os.path.join(base_output_dir, "BR_REP")
     os.makedirs(out_dir, exist_ok=True)
 
+    written = 0
     for br_id, br_info in br_index.items():
         node_ids = br_info.get("node_ids", [])
         if not node_ids:
@@ -231,6 +239,9 @@ def build_br_representation_for_prog(
             json.dump(rep, f, indent=2)
 
         print(f"[BR_REP] {br_id} -> {out_path}")
+        written += 1
+
+    return written
 
 
 if __name__ == "__main__":
@@ -1,14 +1,61 @@
 # summarizer/build_br_json_from_dot.py
+#
+# Builds BR_<PROG>.json from the rule list the BRR stage writes
+# (Rules/RULES_<PROG>.json). Outputs from before that file existed only
+# have the rule_* DOT sources; those are still parsed as a fallback.
 
 import os
 import re
 import json
 from typing import Dict, Any, List
 
+from tracing import span
+
+
+def rules_json_path(rules_dir: str, prog_name: str) -> str:
+    return os.path.join(rules_dir, f"RULES_{prog_name}.json")
+
+
+def build_acobrex_br_from_rules_json(path: str, prog_name: str) -> Dict[str, Any]:
+    """
+    Same output as build_acobrex_br_from_dot, read from the BRR stage's
+    RULES_<PROG>.json. Rules keep their numeric order; the rule head's text
+    is the description and the rule's primary/secondary variables are kept.
+    """
+    with open(path, "r") as f:
+        data = json.load(f)
+
+    business_rules: List[Dict[str, Any]] = []
+    for rule in data.get("rules", []):
+        if rule.get("start_line") is None or rule.get("end_line") is None:
+            continue
+        business_rules.append({
+            "id": rule["id"],
+            "description": rule.get("description") or rule["id"],
+            "start_line": rule["start_line"],
+            "end_line": rule["end_line"],
+            "primary_variables": rule.get("primary_variables", []),
+            "secondary_variables": rule.get("secondary_variables", []),
+        })
+
+    return {
+        "program": data.get("program", prog_name),
+        "business_rules": business_rules,
+    }
+
+
+def build_acobrex_br(rules_dir: str, prog_name: str) -> Dict[str, Any]:
+    """RULES_<PROG>.json when present, else the legacy DOT scan."""
+    path = rules_json_path(rules_dir, prog_name)
+    if os.path.isfile(path):
+        return build_acobrex_br_from_rules_json(path, prog_name)
+    print(f"[build_br_json_from_dot] {path} not found, parsing rule_* DOT files")
+    return build_acobrex_br_from_dot(rules_dir, prog_name)
+
 
 def build_acobrex_br_from_dot(rules_dir: str, prog_name: str) -> Dict[str, Any]:
     """
-    Scan rule_*.dot (or rule_* without extension) in rules_dir and build:
+    Legacy: scan rule_*.dot (or rule_* without extension) in rules_dir and build:
 
     {
       "program": "ATM",
@@ -89,7 +136,8 @@ def main():
     import argparse
 
     parser = argparse.ArgumentParser(
-        description="Build A-COBREX business rule JSON from rule_*.dot files."
+        description="Build A-COBREX business rule JSON from RULES_<PROG>.json "
+                    "(or, for older outputs, the rule_* DOT files)."
     )
     parser.add_argument(
         "--prog",
@@ -99,7 +147,7 @@ def main():
     parser.add_argument(
         "--rules-dir",
         required=True,
-        help="Directory containing rule_* DOT files.",
+        help="Rules/ directory of the program (RULES_<PROG>.json or rule_* DOT files).",
     )
     parser.add_argument(
         "--out-json",
@@ -109,10 +157,12 @@ def main():
     args = parser.parse_args()
 
     os.makedirs(os.path.dirname(args.out_json), exist_ok=True)
-    br_json = build_acobrex_br_from_dot(args.rules_dir, args.prog)
+    with span("br_json", prog=args.prog) as sp:
+        br_json = build_acobrex_br(args.rules_dir, args.prog)
+        sp.count(rules=len(br_json["business_rules"]))
 
-    with open(args.out_json, "w") as f:
-        json.dump(br_json, f, indent=2)
+        with open(args.out_json, "w") as f:
+            json.dump(br_json, f, indent=2)
 
     print(f"[build_br_json_from_dot] Wrote {args.out_json}")
 
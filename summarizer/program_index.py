@@ -5,6 +5,9 @@ import os
 from collections import defaultdict
 from typing import Dict, Any, Optional
 
+from profiling import add_profile_argument, profiled, set_profile_modes
+from tracing import span
+
 
 def load_json(path: str) -> dict:
     with open(path, "r") as f:
@@ -368,6 +371,17 @@ def build_program_index(
     Builds and writes ProgramIndex_<PROG>.json in:
       <base_output_dir>/INDEX/ProgramIndex_<PROG>.json
     """
+    with span("program_index", prog=prog_name) as sp:
+        program_index = _build_program_index(prog_name, base_output_dir, acobrex_br_json_path)
+        sp.count(nodes=len(program_index["node_index"]), rules=len(program_index["br_index"]))
+    return program_index
+
+
+def _build_program_index(
+    prog_name: str,
+    base_output_dir: str,
+    acobrex_br_json_path: Optional[str],
+) -> dict:
     cfg_path = os.path.join(base_output_dir, "CFG", f"CFG_{prog_name}.json")
     dfg_pruned_path = os.path.join(base_output_dir, "DFG", f"DFG_{prog_name}_pruned.json")
     pdg_path = os.path.join(base_output_dir, "PDG", f"PDG_{prog_name}.json")
@@ -447,6 +461,9 @@ if __name__ == "__main__":
         default=None,
         help="Optional path to A-COBREX business rule JSON file.",
     )
+    add_profile_argument(parser)
     args = parser.parse_args()
+    set_profile_modes(args.profile)
 
-    build_program_index(args.prog, args.base_dir, args.br_json)
+    with profiled(args.base_dir, "program_index"):
+        build_program_index(args.prog, args.base_dir, args.br_json)
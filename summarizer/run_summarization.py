@@ -6,19 +6,31 @@ import argparse
 import json
 from pathlib import Path
 from textwrap import dedent
-from typing import Dict, List, Iterable
+from typing import Callable, Dict, List, Iterable, Iterator, NamedTuple, Optional
+
+from tracing import span
 
 from .mocktail_config import MOCKTAIL_VIEWS, DEFAULT_MOCKTAIL_MODES
 
 
-def load_br_reps(br_rep_dir: Path) -> List[Dict]:
-    reps: List[Dict] = []
+def iter_br_reps(br_rep_dir: Path) -> Iterator[Dict]:
+    """
+    Yield BR_REP JSON dicts one at a time (sorted by file name), so callers
+    never hold every rule of a large program in memory at once.
+    """
     if not br_rep_dir.is_dir():
         raise FileNotFoundError(f"BR_REP directory not found: {br_rep_dir}")
-    for path in sorted(br_rep_dir.glob("BR_*.json")):
-        with path.open("r", encoding="utf-8") as f:
-            reps.append(json.load(f))
-    return reps
+
+    def _gen() -> Iterator[Dict]:
+        for path in sorted(br_rep_dir.glob("BR_*.json")):
+            with path.open("r", encoding="utf-8") as f:
+                yield json.load(f)
+
+    return _gen()
+
+
+def load_br_reps(br_rep_dir: Path) -> List[Dict]:
+    return list(iter_br_reps(br_rep_dir))
 
 
 def _safe_br_id(br_id: str) -> str:
@@ -28,6 +40,18 @@ def _safe_br_id(br_id: str) -> str:
     return s
 
 
+class PromptRecord(NamedTuple):
+    """One mocktail prompt, as handed to the LLM dispatcher."""
+    prog: str
+    br_id: str
+    mode: str
+    prompt: str
+
+    @property
+    def safe_id(self) -> str:
+        return _safe_br_id(self.br_id)
+
+
 # ---------- view formatters ----------
 
 def _fmt_code(rep: Dict) -> str:
@@ -110,107 +134,160 @@ def _fmt_pdg(rep: Dict) -> str:
     return f"<PDG_VIEW>\n{body}\n</PDG_VIEW>"
 
 
-def build_prompt_for_br(rep: Dict, mode: str) -> str:
+# ---------- prompt assembly ----------
+
+# Header/footer are precompiled once at import; only the program and BR-ID
+# are substituted per rule.
+_PROMPT_HEADER = dedent(
+    """
+    You are an expert mainframe COBOL engineer.
+
+    Program: {prog}
+    Business-Rule Unit (BR-ID): {br_id}
+
+    You will be given one or more *views* of this rule, such as:
+    - COBOL source lines
+    - business rule text
+    - pruned data-flow facts
+    - control-flow / structural information
+    - program dependence / category tags
+
+    Your job is to explain what THIS rule does, in business terms.
+    Focus only on this rule, not the entire program.
+    """
+).strip()
+
+_PROMPT_FOOTER = dedent(
+    """
+    Write 3–7 sentences that:
+    - Describe the purpose of this rule.
+    - Mention key decisions, loops, validations and important fields.
+    - Use clear English suitable for a human analyst.
+    - Do NOT just restate the code line-by-line.
+    - Do NOT include any XML or tags in your answer, only prose.
+    """
+).strip()
+
+# View label -> formatter. Formatters returning "" are left out of the prompt;
+# unknown view labels are ignored so the config can evolve safely.
+_VIEW_FORMATTERS: Dict[str, Callable[[Dict], str]] = {
+    "CODE": _fmt_code,
+    "BR": _fmt_br,
+    "BRR": _fmt_brr,
+    "DFG_PRUNED": _fmt_dfg_pruned,
+    "CFG": _fmt_cfg,
+    "AST": _fmt_ast,
+    "PDG": _fmt_pdg,
+}
+
+
+class PromptFragments:
+    """
+    Rendered prompt pieces for one BR_REP, shared across mocktail modes.
+
+    Each view is formatted at most once (on first use), so building all
+    modes for a rule costs about the same as building the FULL mode.
+    """
+
+    __slots__ = ("rep", "header", "_views")
+
+    def __init__(self, rep: Dict):
+        self.rep = rep
+        self.header = _PROMPT_HEADER.format(
+            prog=rep.get("program", ""),
+            br_id=rep.get("br_id", ""),
+        )
+        self._views: Dict[str, str] = {}
+
+    def view(self, name: str) -> str:
+        block = self._views.get(name)
+        if block is None:
+            fmt = _VIEW_FORMATTERS.get(name)
+            block = fmt(self.rep) if fmt is not None else ""
+            self._views[name] = block
+        return block
+
+
+def build_prompt_for_br(
+    rep: Dict,
+    mode: str,
+    fragments: Optional[PromptFragments] = None,
+) -> str:
     if mode not in MOCKTAIL_VIEWS:
         raise KeyError(f"Unknown mocktail mode: {mode}")
-    views = MOCKTAIL_VIEWS[mode]
-
-    prog = rep.get("program", "")
-    br_id = rep.get("br_id", "")
-
-    header = dedent(
-        f"""
-        You are an expert mainframe COBOL engineer.
-
-        Program: {prog}
-        Business-Rule Unit (BR-ID): {br_id}
-
-        You will be given one or more *views* of this rule, such as:
-        - COBOL source lines
-        - business rule text
-        - pruned data-flow facts
-        - control-flow / structural information
-        - program dependence / category tags
-
-        Your job is to explain what THIS rule does, in business terms.
-        Focus only on this rule, not the entire program.
-        """
-    ).strip()
-
-    sections: List[str] = []
-
-    for v in views:
-        if v == "CODE":
-            sections.append(_fmt_code(rep))
-        elif v == "BR":
-            block = _fmt_br(rep)
-            if block:
-                sections.append(block)
-        elif v == "BRR":
-            sections.append(_fmt_brr(rep))
-        elif v == "DFG_PRUNED":
-            block = _fmt_dfg_pruned(rep)
-            if block:
-                sections.append(block)
-        elif v == "CFG":
-            block = _fmt_cfg(rep)
-            if block:
-                sections.append(block)
-        elif v == "AST":
-            sections.append(_fmt_ast(rep))
-        elif v == "PDG":
-            sections.append(_fmt_pdg(rep))
-        else:
-            # Ignore unknown view labels so the config can evolve safely.
-            continue
+    if fragments is None:
+        fragments = PromptFragments(rep)
 
+    sections = [block for block in map(fragments.view, MOCKTAIL_VIEWS[mode]) if block]
     context = "\n\n".join(sections)
 
-    footer = dedent(
-        """
-        Write 3–7 sentences that:
-        - Describe the purpose of this rule.
-        - Mention key decisions, loops, validations and important fields.
-        - Use clear English suitable for a human analyst.
-        - Do NOT just restate the code line-by-line.
-        - Do NOT include any XML or tags in your answer, only prose.
-        """
-    ).strip()
-
-    return header + "\n\n" + context + "\n\n" + footer
+    return fragments.header + "\n\n" + context + "\n\n" + _PROMPT_FOOTER
 
 
 # ---------- core entrypoint for other scripts ----------
 
-def build_prompts_for_program(
+def iter_prompts_for_program(
     prog: str,
     base_dir: Path,
     modes: List[str],
-) -> None:
-    br_rep_dir = base_dir / "BR_REP"
-    reps = load_br_reps(br_rep_dir)
-    if not reps:
-        print(f"[WARN] No BR_REP JSON files for program {prog} in {br_rep_dir}")
-        return
-
+    prompts_dir: Optional[Path] = None,
+) -> Iterator[PromptRecord]:
+    """
+    Stream prompts straight from BR_REP, one BR_REP at a time.
+
+    For every BR_REP JSON we yield one PromptRecord per mode, so a consumer
+    (e.g. the LLM dispatcher) can start working on the first prompt before
+    the rest exist. If `prompts_dir` is given, each prompt is also written to
+      prompts_dir/<mode>/PROMPT_<prog>_<SAFE_BR_ID>_<mode>.txt
+    (the layout build_prompts_for_program has always produced).
+    """
     for mode in modes:
         if mode not in MOCKTAIL_VIEWS:
             raise KeyError(f"Unknown mocktail mode: {mode}")
 
-        mode_out_dir = base_dir / "BR_PROMPTS" / mode
-        mode_out_dir.mkdir(parents=True, exist_ok=True)
+    reps = iter_br_reps(base_dir / "BR_REP")
 
+    def _gen() -> Iterator[PromptRecord]:
+        made_dirs = set()
         for rep in reps:
             br_id = rep.get("br_id", "UNKNOWN")
-            safe_id = _safe_br_id(br_id)
-            prompt = build_prompt_for_br(rep, mode)
+            fragments = PromptFragments(rep)
+            for mode in modes:
+                record = PromptRecord(prog, br_id, mode, build_prompt_for_br(rep, mode, fragments))
+
+                if prompts_dir is not None:
+                    mode_out_dir = prompts_dir / mode
+                    if mode not in made_dirs:
+                        mode_out_dir.mkdir(parents=True, exist_ok=True)
+                        made_dirs.add(mode)
+                    out_path = mode_out_dir / f"PROMPT_{prog}_{record.safe_id}_{mode}.txt"
+                    with out_path.open("w", encoding="utf-8") as f:
+                        f.write(record.prompt)
+
+                yield record
+
+    return _gen()
+
+
+def build_prompts_for_program(
+    prog: str,
+    base_dir: Path,
+    modes: List[str],
+) -> None:
+    prompts_dir = base_dir / "BR_PROMPTS"
+    counts = {mode: 0 for mode in modes}
 
-            out_name = f"PROMPT_{prog}_{safe_id}_{mode}.txt"
-            out_path = mode_out_dir / out_name
-            with out_path.open("w", encoding="utf-8") as f:
-                f.write(prompt)
+    with span("prompts", prog=prog) as sp:
+        for record in iter_prompts_for_program(prog, base_dir, modes, prompts_dir=prompts_dir):
+            counts[record.mode] += 1
+        sp.count(prompts=sum(counts.values()))
 
-        print(f"[PROMPTS] {prog} mode={mode} -> {mode_out_dir}")
+    if not any(counts.values()):
+        print(f"[WARN] No BR_REP JSON files for program {prog} in {base_dir / 'BR_REP'}")
+        return
+
+    for mode in modes:
+        print(f"[PROMPTS] {prog} mode={mode} -> {prompts_dir / mode}")
 
 
 def _cli(argv: List[str] | None = None) -> None:
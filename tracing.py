@@ -0,0 +1,321 @@
+#!/usr/bin/env python
+"""
+Nested timing spans for the static and LLM pipeline stages.
+
+    from tracing import span
+
+    with span("program", prog="ATM"):
+        with span("rbb") as sp:
+            ...
+            sp.count(nodes=len(nodes), edges=len(edges))
+
+Tracing is off unless COBREX_TRACE names a file. Then span() returns a
+shared no-op object, so an instrumented stage costs one environment lookup
+per span. Like COBREX_RENDER (graph_render.py), the setting is inherited by
+extractor.py / build_dfg.py / build_pdg.py / summarizer subprocesses. A
+span started by a driver passes its id to subprocesses through sp.env(), so
+their top-level spans nest under it.
+
+Each finished span is appended to the trace file as one line with a single
+write, so several processes can share one file:
+
+  COBREX_TRACE_FORMAT=jsonl   (default) one JSON object per span:
+                              name, id, parent, pid, tid, ts/dur (µs),
+                              outcome ("ok" / "error" / "failed"), error,
+                              attrs, counts
+  COBREX_TRACE_FORMAT=chrome  Chrome trace-event "X" events in an open JSON
+                              array; loads in chrome://tracing and Perfetto
+
+Usage:
+
+    python run_all_projects_static.py --trace output/trace.jsonl
+    python tracing.py summary output/trace.jsonl          # slowest programs / stages
+    python tracing.py to-chrome output/trace.jsonl output/trace.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+TRACE_FORMATS = ("jsonl", "chrome")
+DEFAULT_TRACE_FORMAT = "jsonl"
+
+_ids = itertools.count(1)
+_local = threading.local()
+
+
+def trace_path() -> Optional[str]:
+    return os.environ.get("COBREX_TRACE") or None
+
+
+def trace_format() -> str:
+    fmt = os.environ.get("COBREX_TRACE_FORMAT", DEFAULT_TRACE_FORMAT).strip().lower()
+    return fmt if fmt in TRACE_FORMATS else DEFAULT_TRACE_FORMAT
+
+
+def enable_tracing(path, fmt: str = DEFAULT_TRACE_FORMAT) -> None:
+    """Trace this process and every subprocess it starts into `path`."""
+    if fmt not in TRACE_FORMATS:
+        raise ValueError(f"trace format must be one of {TRACE_FORMATS}, got {fmt!r}")
+    path = Path(path).resolve()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if fmt == "chrome":
+        # before any subprocess can write an event
+        _open_chrome_trace(str(path))
+    os.environ["COBREX_TRACE"] = str(path)
+    os.environ["COBREX_TRACE_FORMAT"] = fmt
+
+
+def _stack() -> List["Span"]:
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+def _open_chrome_trace(path: str) -> None:
+    """
+    Create `path` holding the "[" that opens the event array (viewers accept
+    it unterminated), unless it exists. The file is written under a temp
+    name and hard-linked into place, so no process sees it without the "[".
+    """
+    if os.path.exists(path):
+        return
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(b"[\n")
+    try:
+        os.link(tmp, path)
+    except FileExistsError:
+        pass
+    finally:
+        os.unlink(tmp)
+
+
+def _write(path: str, record: dict) -> None:
+    if trace_format() == "chrome":
+        line = json.dumps(_to_chrome(record)) + ",\n"
+        _open_chrome_trace(path)
+    else:
+        line = json.dumps(record) + "\n"
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, line.encode("utf-8"))
+    finally:
+        os.close(fd)
+
+
+def _to_chrome(record: dict) -> dict:
+    args = dict(record.get("attrs") or {})
+    args.update(record.get("counts") or {})
+    args["outcome"] = record.get("outcome")
+    if record.get("error"):
+        args["error"] = record["error"]
+    return {
+        "name": record["name"],
+        "cat": "cobrex",
+        "ph": "X",
+        "ts": record["ts"],
+        "dur": record["dur"],
+        "pid": record["pid"],
+        "tid": record["tid"],
+        "args": args,
+    }
+
+
+class _NullSpan:
+    """What span() returns while tracing is off: every method is a no-op."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs):
+        return self
+
+    def count(self, **counts):
+        return self
+
+    def fail(self, reason: str = ""):
+        return self
+
+    def env(self):
+        return None
+
+
+NULL_SPAN = _NullSpan()
+
+
+class Span:
+    __slots__ = ("name", "attrs", "counts", "id", "parent", "path",
+                 "_ts", "_t0", "_failed")
+
+    def __init__(self, name: str, path: str, attrs: dict):
+        self.name = name
+        self.path = path
+        self.attrs = attrs
+        self.counts: Dict[str, float] = {}
+        self.id = f"{os.getpid()}.{next(_ids)}"
+        self.parent = None
+        self._failed = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+        return self
+
+    def count(self, **counts):
+        """Add to named counters (nodes, edges, rules, prompts, tokens, ...)."""
+        for k, v in counts.items():
+            self.counts[k] = self.counts.get(k, 0) + v
+        return self
+
+    def fail(self, reason: str = ""):
+        """Mark the span failed without an exception (e.g. a stage returning None)."""
+        self._failed = reason or "failed"
+        return self
+
+    def env(self) -> Dict[str, str]:
+        """Environment for a subprocess whose top-level spans nest under this one."""
+        env = dict(os.environ)
+        env["COBREX_TRACE_PARENT"] = self.id
+        return env
+
+    def __enter__(self):
+        stack = _stack()
+        self.parent = stack[-1].id if stack else os.environ.get("COBREX_TRACE_PARENT")
+        stack.append(self)
+        self._ts = time.time_ns() // 1000
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        dur = int((time.perf_counter() - self._t0) * 1e6)
+        stack = _stack()
+        if stack and stack[-1] is self:
+            stack.pop()
+
+        if exc_type is not None and not (exc_type is SystemExit and exc.code in (None, 0)):
+            outcome, error = "error", f"{exc_type.__name__}: {exc}"
+        elif self._failed is not None:
+            outcome, error = "failed", self._failed
+        else:
+            outcome, error = "ok", None
+
+        _write(self.path, {
+            "name": self.name,
+            "id": self.id,
+            "parent": self.parent,
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+            "ts": self._ts,
+            "dur": dur,
+            "outcome": outcome,
+            "error": error,
+            "attrs": self.attrs,
+            "counts": self.counts,
+        })
+        return False
+
+
+def span(name: str, **attrs):
+    """A timing span; a no-op unless COBREX_TRACE is set."""
+    path = os.environ.get("COBREX_TRACE")
+    if not path:
+        return NULL_SPAN
+    return Span(name, path, attrs)
+
+
+# ---------------------------------------------------------------------------
+# Reading traces
+# ---------------------------------------------------------------------------
+
+def read_trace(path: Path) -> Iterator[dict]:
+    """Span records from a jsonl or chrome trace (chrome events are mapped back)."""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip().rstrip(",")
+            if not line or line in ("[", "]"):
+                continue
+            rec = json.loads(line)
+            if rec.get("ph") == "X":
+                args = dict(rec.get("args") or {})
+                rec = {
+                    "name": rec["name"], "id": None, "parent": None,
+                    "pid": rec["pid"], "tid": rec["tid"],
+                    "ts": rec["ts"], "dur": rec["dur"],
+                    "outcome": args.pop("outcome", None),
+                    "error": args.pop("error", None),
+                    "attrs": args, "counts": {},
+                }
+            yield rec
+
+
+def summarise(records: List[dict], top: int = 10) -> None:
+    stages: Dict[str, list] = defaultdict(list)
+    programs = []
+    for rec in records:
+        stages[rec["name"]].append(rec)
+        if rec["name"] == "program":
+            programs.append(rec)
+
+    print(f"{'span':<28} {'n':>6} {'total s':>10} {'mean s':>9} {'max s':>9} {'errors':>7}")
+    by_total = sorted(stages.items(), key=lambda kv: -sum(r["dur"] for r in kv[1]))
+    for name, recs in by_total:
+        total = sum(r["dur"] for r in recs) / 1e6
+        worst = max(r["dur"] for r in recs) / 1e6
+        errors = sum(1 for r in recs if r.get("outcome") != "ok")
+        print(f"{name:<28} {len(recs):>6} {total:>10.3f} {total / len(recs):>9.3f} "
+              f"{worst:>9.3f} {errors:>7}")
+
+    if programs:
+        print()
+        print(f"Slowest {min(top, len(programs))} programs:")
+        for rec in sorted(programs, key=lambda r: -r["dur"])[:top]:
+            prog = (rec.get("attrs") or {}).get("prog", "?")
+            print(f"  {rec['dur'] / 1e6:>10.3f}s  {prog:<30} {rec.get('outcome')}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Inspect COBREX trace files.")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p_sum = sub.add_parser("summary", help="Per-span totals and the slowest programs")
+    p_sum.add_argument("trace", type=Path)
+    p_sum.add_argument("--top", type=int, default=10)
+
+    p_conv = sub.add_parser("to-chrome", help="Convert a jsonl trace to a Chrome trace")
+    p_conv.add_argument("trace", type=Path)
+    p_conv.add_argument("out", type=Path)
+
+    args = parser.parse_args(argv)
+    records = list(read_trace(args.trace))
+    if not records:
+        print(f"[TRACE] No spans in {args.trace}")
+        return 1
+
+    if args.cmd == "summary":
+        summarise(records, args.top)
+    else:
+        args.out.write_text(json.dumps({
+            "traceEvents": [_to_chrome(r) for r in records],
+            "displayTimeUnit": "ms",
+        }))
+        print(f"[TRACE] {len(records)} spans -> {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())